@@ -0,0 +1,140 @@
+# Copyright (c) 2022 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import json
+import sys
+import time
+from dataclasses import asdict, dataclass
+from typing import Callable, Iterable
+
+from common.codec import codec_for, encode
+
+
+@dataclass(frozen=True)
+class CellObject:
+    type: int
+    id: int
+    number: int
+    owner: int
+    build_timestamp: int
+    x: int
+    y: int
+    z: int
+    yaw: int
+    tilt: int
+    roll: int
+    model: str
+    description: str
+    action: str
+
+
+@dataclass
+class ObjectLoad:
+    owner: int = None
+    build_timestamp: int = None
+    type: int = None
+    x: int = None
+    y: int = None
+    z: int = None
+    yaw: int = None
+    tilt: int = None
+    roll: int = None
+    model: str = None
+    description: str = None
+    action: str = None
+    data: bytes = None
+    callback_reference: str = None
+
+
+def synthetic_objects(count: int) -> list[CellObject]:
+    """
+    Creates objects shaped like the ones a world query returns.
+
+    Args:
+        count (int): The number of objects to create.
+
+    Returns:
+        list[CellObject]: The objects.
+    """
+    return [
+        CellObject(
+            type=1, id=index, number=index, owner=index % 50, build_timestamp=1650000000 + index,
+            x=index * 37 % 200000 - 100000, y=index % 300, z=index * 91 % 200000 - 100000,
+            yaw=index % 3600, tilt=0, roll=0, model=f'wall{index % 40:02}.rwx',
+            description=f'sign {index % 7}', action='create solid off; activate url www.example.com'
+        )
+        for index in range(count)
+    ]
+
+def measure(name: str, func: Callable, items: Iterable) -> float:
+    """
+    Measures the throughput of a function applied to every item.
+
+    Args:
+        name (str): The name to report.
+        func (Callable): The function to measure.
+        items (Iterable): The items to apply the function to.
+
+    Returns:
+        float: The records per second.
+    """
+    start = time.perf_counter()
+    for each in items:
+        func(each)
+    rate = len(items) / (time.perf_counter() - start)
+
+    print(f'{name:<32}{rate:>14,.0f} records/sec')
+
+    return rate
+
+def _legacy_encode(record: CellObject) -> str:
+    return json.dumps(asdict(record), skipkeys=True, default=str)
+
+def _legacy_decode(line: str) -> ObjectLoad:
+    data = json.loads(line)
+    data.pop('id', None)
+    data.pop('number', None)
+
+    return ObjectLoad(**data)
+
+def main(count: int = 100_000) -> dict:
+    """
+    Compares the asdict + json round trip of a backup record with the
+    compiled codec. Run with: python -m benchmarks.codec [records]
+
+    Args:
+        count (int): The number of records to encode and decode.
+
+    Returns:
+        dict: The records per second of every variant.
+    """
+    records = synthetic_objects(count)
+    lines = [encode(each) for each in records]
+    codec = codec_for(ObjectLoad)
+
+    return {
+        'encode_asdict_json': measure('encode asdict + json.dumps', _legacy_encode, records),
+        'encode_codec': measure('encode compiled codec', encode, records),
+        'decode_kwargs': measure('decode json.loads + **kwargs', _legacy_decode, lines),
+        'decode_codec': measure('decode compiled codec', codec.loads, lines),
+    }
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:2]))
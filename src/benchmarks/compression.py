@@ -0,0 +1,73 @@
+# Copyright (c) 2022 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import os
+import sys
+import tempfile
+import time
+
+from common.codec import encode
+from common.file import RecordWriter, load
+
+from benchmarks.codec import synthetic_objects
+
+CODECS = (None, 'gzip', 'bz2', 'lzma')
+
+
+def main(count: int = 100_000) -> dict:
+    """
+    Compares the size and write/read throughput of a json lines backup
+    with every compression codec. Run with: python -m benchmarks.compression [records]
+
+    Args:
+        count (int): The number of records to write and read.
+
+    Returns:
+        dict: The size, write and read records per second of every codec.
+    """
+    lines = [encode(each) for each in synthetic_objects(count)]
+    results = dict()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for codec in CODECS:
+            file = os.path.join(directory, f'backup-{codec}.json')
+
+            start = time.perf_counter()
+            with RecordWriter(file, compression=codec) as writer:
+                for line in lines:
+                    writer.write(line)
+            written = count / (time.perf_counter() - start)
+
+            start = time.perf_counter()
+            for _ in load(file):
+                pass
+            read = count / (time.perf_counter() - start)
+
+            size = os.path.getsize(file)
+            results[codec or 'none'] = {'bytes': size, 'write': written, 'read': read}
+            print(
+                f'{codec or "none":<8}{size:>14,} bytes'
+                f'{written:>14,.0f} written/sec{read:>14,.0f} read/sec'
+            )
+
+    return results
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:2]))
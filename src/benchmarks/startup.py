@@ -0,0 +1,120 @@
+# Copyright (c) 2022 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+CLI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'run_cli.py')
+
+# Commands that must start without the SDK or a world connection.
+COMMANDS: dict[str, list[str]] = {
+    'help': ['--help'],
+    'reindex': ['reindex', '{backup}'],
+}
+FORBIDDEN = ('korth_spirit', 'management.instance', 'management.simulator')
+DEFAULT_RUNS = 10
+
+
+def _command(arguments: list[str], backup: str) -> list[str]:
+    return [sys.executable, CLI, *(each.format(backup=backup) for each in arguments)]
+
+def imported_modules(arguments: list[str], backup: str) -> dict[str, int]:
+    """
+    Lists the modules a command imports, from python -X importtime.
+
+    Args:
+        arguments (list[str]): The arguments of the command.
+        backup (str): The backup the command may work on.
+
+    Returns:
+        dict[str, int]: The cumulative import time of every module, in microseconds.
+    """
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', *_command(arguments, backup)[1:]],
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    modules = dict()
+
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+
+        _, cumulative, name = line.split('|')
+        modules[name.strip()] = int(cumulative)
+
+    return modules
+
+def measure(arguments: list[str], backup: str, runs: int = DEFAULT_RUNS) -> dict:
+    """
+    Times a command from process start to exit.
+
+    Args:
+        arguments (list[str]): The arguments of the command.
+        backup (str): The backup the command may work on.
+        runs (int): The number of runs, the median of which is kept.
+
+    Returns:
+        dict: The seconds, the number of imported modules and the forbidden ones among them.
+    """
+    seconds = list()
+
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(_command(arguments, backup), capture_output=True, check=True)
+        seconds.append(time.perf_counter() - start)
+
+    modules = imported_modules(arguments, backup)
+
+    return {
+        'seconds': statistics.median(seconds),
+        'modules': len(modules),
+        'forbidden': [name for name in modules if name.split('.')[0] in FORBIDDEN or name in FORBIDDEN],
+    }
+
+def run(runs: int = DEFAULT_RUNS) -> dict:
+    """
+    Times the start of every command that works without a world.
+
+    Args:
+        runs (int): The number of runs of every command.
+
+    Returns:
+        dict: The results, keyed by command.
+    """
+    results = dict()
+
+    with tempfile.TemporaryDirectory() as directory:
+        backup = os.path.join(directory, 'backup.json')
+
+        with open(backup, 'w') as f:
+            f.write('{"x": 0, "z": 0, "model": "wall01.rwx"}\n')
+
+        for name, arguments in COMMANDS.items():
+            results[name] = result = measure(arguments, backup, runs)
+            forbidden = f'  imports {", ".join(result["forbidden"])}' if result['forbidden'] else ''
+            print(f'startup {name:<16}{result["seconds"] * 1000:>10,.1f} ms{result["modules"]:>6} modules{forbidden}')
+
+    return results
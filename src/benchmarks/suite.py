@@ -0,0 +1,229 @@
+# Copyright (c) 2022 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import gc
+import json
+import os
+import platform
+import tempfile
+import time
+import tracemalloc
+from typing import Callable
+
+import management.commands as C
+from common.codec import encode
+from common.file import RecordWriter, append_to, load
+from common.func import every_x
+from management import sdk
+from management.simulator import SimulatedInstance, Simulator, synthetic_object
+
+# Every command runs against a simulated world without latency.
+world = Simulator()
+sdk.use(world)
+
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000)
+
+# A case prepares its input in a directory and returns the work to measure,
+# which returns the number of records it processed.
+Case = Callable[[str, int], Callable[[], int]]
+
+
+def _write_objects(file: str, count: int) -> None:
+    with RecordWriter(file) as writer:
+        for index in range(count):
+            writer.write(encode(synthetic_object(index)))
+
+def save(file_format: str) -> Case:
+    # The whole world is queried at once, so the pipeline only overlaps encoding with writing here.
+    def _case(directory: str, count: int) -> Callable[[], int]:
+        world.objects = count
+        command = C.Save(SimulatedInstance(world), 'objects', os.path.join(directory, 'save'), file_format=file_format)
+
+        return lambda: command.execute() or count
+
+    return _case
+
+def load_objects(directory: str, count: int) -> Callable[[], int]:
+    file = os.path.join(directory, 'load')
+    _write_objects(file, count)
+    command = C.Load(SimulatedInstance(world), 'objects', file)
+
+    return lambda: command.execute() or count
+
+def aggregate(directory: str, count: int) -> Callable[[], int]:
+    world.objects = count // 2
+    world.terrain = count - count // 2
+    command = C.Aggregate(*(
+        C.Save(SimulatedInstance(world), query_type, os.path.join(directory, query_type))
+        for query_type in ('attributes', 'objects', 'terrain')
+    ))
+
+    return lambda: command.execute() or count + world.attributes
+
+def file_load(directory: str, count: int) -> Callable[[], int]:
+    file = os.path.join(directory, 'file')
+    _write_objects(file, count)
+
+    return lambda: sum(1 for _ in load(file))
+
+def file_append_to(directory: str, count: int) -> Callable[[], int]:
+    file = os.path.join(directory, 'append')
+    line = encode(synthetic_object(0))
+
+    def _run() -> int:
+        for _ in range(count):
+            append_to(file, line)
+        return count
+
+    return _run
+
+def func_every_x(directory: str, count: int) -> Callable[[], int]:
+    return lambda: sum(every_x(len, range(count), 1000))
+
+
+CASES: dict[str, Case] = {
+    'save_json': save('json'),
+    'save_columnar': save('columnar'),
+    'load': load_objects,
+    'aggregate_save': aggregate,
+    'file_load': file_load,
+    'file_append_to': file_append_to,
+    'func_every_x': func_every_x,
+}
+
+
+def measure(case: Case, count: int, trace_memory: bool = True) -> dict:
+    """
+    Runs a case once for its throughput, then once more under tracemalloc
+    for its peak memory, so tracing does not skew the timing.
+
+    Args:
+        case (Case): The case.
+        count (int): The number of records.
+        trace_memory (bool): Whether to measure the peak memory.
+
+    Returns:
+        dict: The records, seconds, records per second and peak bytes.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        run = case(directory, count)
+        gc.collect()
+        start = time.perf_counter()
+        records = run()
+        seconds = time.perf_counter() - start
+
+    peak = None
+    if trace_memory:
+        with tempfile.TemporaryDirectory() as directory:
+            run = case(directory, count)
+            gc.collect()
+            tracemalloc.start()
+            try:
+                run()
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+    return {
+        'records': records,
+        'seconds': seconds,
+        'records_per_sec': records / seconds if seconds else None,
+        'peak_bytes': peak,
+    }
+
+def run(sizes: tuple[int] = DEFAULT_SIZES, names: list[str] = None, trace_memory: bool = True) -> dict:
+    """
+    Runs every case at every size.
+
+    Args:
+        sizes (tuple[int]): The numbers of records.
+        names (list[str]): The cases to run. Defaults to all of them.
+        trace_memory (bool): Whether to measure the peak memory.
+
+    Returns:
+        dict: The report, with the results keyed by case and size.
+    """
+    results = dict()
+
+    for name in names or CASES:
+        for count in sizes:
+            result = measure(CASES[name], count, trace_memory)
+            results[f'{name}[{count}]'] = result
+
+            peak = f'{result["peak_bytes"] / 2 ** 10:>12,.0f} KiB peak' if result['peak_bytes'] is not None else ''
+            print(f'{name:<16}{count:>10,}{result["records_per_sec"]:>14,.0f} records/sec{peak}')
+
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': time.time(),
+        'results': results,
+    }
+
+def regressions(report: dict, baseline: dict, tolerance: float = 0.2) -> list[str]:
+    """
+    Compares a report with an earlier one.
+
+    Args:
+        report (dict): The report.
+        baseline (dict): The earlier report.
+        tolerance (float): The fraction of throughput that may be lost, or memory or startup time gained.
+
+    Returns:
+        list[str]: A description of every regression.
+    """
+    found = list()
+
+    for key, result in report.get('startup', dict()).items():
+        if result['forbidden']:
+            found.append(f'startup {key}: imports {", ".join(result["forbidden"])}')
+
+        if (before := baseline.get('startup', dict()).get(key)) is None:
+            continue
+
+        if result['seconds'] > before['seconds'] * (1 + tolerance):
+            found.append(f'startup {key}: {result["seconds"] * 1000:,.1f} ms, was {before["seconds"] * 1000:,.1f}')
+
+    for key, result in report['results'].items():
+        if (before := baseline['results'].get(key)) is None:
+            continue
+
+        if result['records_per_sec'] < before['records_per_sec'] * (1 - tolerance):
+            found.append(
+                f'{key}: {result["records_per_sec"]:,.0f} records/sec, '
+                f'was {before["records_per_sec"]:,.0f}'
+            )
+
+        if None not in (result['peak_bytes'], before['peak_bytes']) \
+                and result['peak_bytes'] > before['peak_bytes'] * (1 + tolerance):
+            found.append(f'{key}: {result["peak_bytes"]:,} bytes peak, was {before["peak_bytes"]:,}')
+
+    return found
+
+def write_report(report: dict, file: str) -> None:
+    """
+    Writes a report as JSON.
+
+    Args:
+        report (dict): The report.
+        file (str): The name of the file.
+    """
+    with open(file, 'w') as f:
+        json.dump(report, f, indent=2)
@@ -21,8 +21,39 @@
 import argparse
 import logging
 
-from management.instance import ReceiverInstance
-from management.invoker import LocalInvoker
+# Everything is imported once the arguments are parsed, so --help and
+# commands working on files alone neither wait for nor need the SDK.
+
+
+def _rectangle(value: str):
+    from common.region import parse_rectangle
+
+    return parse_rectangle(value)
+
+def _circle(value: str):
+    from common.region import parse_circle
+
+    return parse_circle(value)
+
+def _condition(value: str):
+    from common.summary import parse_condition
+
+    return parse_condition(value)
+
+def _translation(value: str):
+    from common.transform import parse_translation
+
+    return parse_translation(value)
+
+def _point(value: str):
+    from common.transform import parse_point
+
+    return parse_point(value)
+
+def _rename(value: str):
+    from common.transform import parse_rename
+
+    return parse_rename(value)
 
 
 def main() -> None:
@@ -46,6 +77,42 @@ def main() -> None:
         type=str,
         choices=["all", "terrain", "objects", "attributes"]
     )
+    parser.add_argument(
+        '-p', '--parallel',
+        help="If specified, the parts of an all query run at the same time, each on its own connection",
+        default=False,
+        action="store_true"
+    )
+    parser.add_argument(
+        '--report',
+        help="JSON file to write the time, records, bytes and failures of every command to",
+        default=None,
+        type=str
+    )
+    parser.add_argument(
+        '--prometheus',
+        help="Textfile to export the metrics of every command to, for the node exporter",
+        default=None,
+        type=str
+    )
+    parser.add_argument(
+        '--profile',
+        help="File to write the command's hotspots to, from cProfile, across its threads. Worker processes are not profiled",
+        default=None,
+        type=str
+    )
+    parser.add_argument(
+        '--sample-interval',
+        help="Samples the stacks every this many seconds instead of profiling every call, for long runs. Requires --profile",
+        default=None,
+        type=float
+    )
+    parser.add_argument(
+        '--trace-memory',
+        help="File to write the command's peak memory and top allocation sites to, from tracemalloc",
+        default=None,
+        type=str
+    )
     parser.add_argument(
         '-v', '--verbose',
         help="If specified, debug logging will be enabled",
@@ -53,13 +120,65 @@ def main() -> None:
         action="store_true"
     )
 
-    file_arg_parser = argparse.ArgumentParser(add_help=False)
+    region_arg_parser = argparse.ArgumentParser(add_help=False)
+    region_group = region_arg_parser.add_mutually_exclusive_group()
+    region_group.add_argument(
+        '--region',
+        help="Restricts objects to a rectangle of cells: --region=x1,z1,x2,z2",
+        default=None,
+        dest='region',
+        type=_rectangle
+    )
+    region_group.add_argument(
+        '--around',
+        help="Restricts objects to the cells within r cells of a cell: --around=x,z,r",
+        default=None,
+        dest='region',
+        type=_circle
+    )
+
+    file_arg_parser = argparse.ArgumentParser(add_help=False, parents=[region_arg_parser])
     file_arg_parser.add_argument(
         '-b', '--binary',
         help="If specified, files will be written in binary mode",
         default=False,
         action="store_true"
     )
+    file_arg_parser.add_argument(
+        '-f', '--format',
+        help="Backup format to save in. Attributes are always stored as json. Tiles store terrain as dense pages "
+             "and everything else as columnar. Loads detect the format backups were saved in",
+        default="json",
+        type=str,
+        choices=["json", "columnar", "tiles"]
+    )
+    file_arg_parser.add_argument(
+        '--rate',
+        help="SDK calls per second to start at, per connection, 1000 by default. The rate grows until "
+             "the server throttles and halves when it does. 0 sends calls unpaced",
+        default=None,
+        type=float
+    )
+    file_arg_parser.add_argument(
+        '--max-rate',
+        help="Most SDK calls per second, per connection, 10000 by default",
+        default=None,
+        type=float
+    )
+    file_arg_parser.add_argument(
+        '--retries',
+        help="Number of retries of a throttled or transiently failing SDK call, with jittered backoff, 5 by default. "
+             "Object loads are only retried when throttled, see --retry-object-loads",
+        default=None,
+        type=int
+    )
+    file_arg_parser.add_argument(
+        '--retry-object-loads',
+        help="If specified, object loads failing transiently, such as timing out, are retried too. "
+             "A load that timed out may still have reached the server, its retry then duplicates the object",
+        default=False,
+        action="store_true"
+    )
     file_arg_parser.add_argument(
         'file',
         help="File to use",
@@ -68,30 +187,312 @@ def main() -> None:
 
     subparsers = parser.add_subparsers(dest='command', required=True)
     subparsers.required = True
-    subparsers.add_parser(
+    load_parser = subparsers.add_parser(
         'load',
         help="Loads a world information from a file",
         parents=[file_arg_parser]
     )
-    subparsers.add_parser(
+    load_parser.add_argument(
+        '-w', '--workers',
+        help="Number of connections loading concurrently",
+        default=1,
+        type=int
+    )
+    load_parser.add_argument(
+        '--checkpoint-dir',
+        help="Directory to checkpoint the load to, so an interrupted load can be resumed. "
+             "The checkpoints of a finished load are removed",
+        default=None,
+        type=str
+    )
+    load_parser.add_argument(
+        '--resume',
+        help="If specified, continues from the last checkpoint in --checkpoint-dir of an interrupted load, "
+             "skipping the parts already loaded",
+        default=False,
+        action="store_true"
+    )
+    load_parser.add_argument(
+        '--checkpoint-every',
+        help="Number of loaded records between two checkpoints, 1000 by default",
+        default=None,
+        type=int
+    )
+    load_parser.add_argument(
+        '--max-pending',
+        help="Most batches in flight when loading concurrently, twice the workers by default. The batches in flight "
+             "start at one per worker, grow while they go through and halve when the server throttles",
+        default=None,
+        type=int
+    )
+    load_parser.add_argument(
+        '--batch-size',
+        help="Number of records decoded and sent at once, and handed to a worker at once, 256 by default",
+        default=None,
+        type=int
+    )
+    save_parser = subparsers.add_parser(
         'save',
         help="Saves a world information to a file",
         parents=[file_arg_parser]
     )
+    save_parser.add_argument(
+        '--buffer-size',
+        help="Number of bytes to buffer before writing to disk, 1 MiB by default",
+        default=None,
+        type=int
+    )
+    save_parser.add_argument(
+        '-z', '--compress',
+        help="Compresses the backup in independent frames, which standard tools such as gzip cannot read. "
+             "Defaults to gzip for .kwmz files",
+        default=None,
+        type=str,
+        choices=["gzip", "bz2", "lzma"]
+    )
+    save_parser.add_argument(
+        '--checksum',
+        help="Algorithm checksumming every block in a .sum sidecar, crc32 by default, none to skip it",
+        default=None,
+        type=str,
+        choices=["crc32", "blake2b", "none"]
+    )
+    save_parser.add_argument(
+        '--base',
+        help="Full backup to save only the added, changed and deleted records against",
+        default=None,
+        type=str
+    )
+    save_parser.add_argument(
+        '--serializers',
+        help="Number of threads encoding records while the world is queried and the file written",
+        default=1,
+        type=int
+    )
+    save_parser.add_argument(
+        '--flush-every',
+        help="Number of records to buffer before writing to disk",
+        default=None,
+        type=int
+    )
+    sync_parser = subparsers.add_parser(
+        'sync',
+        help="Changes a world to match a file, sending only the differences",
+        parents=[file_arg_parser]
+    )
+    sync_parser.add_argument(
+        '--dry-run',
+        help="If specified, only reports what would be deleted and loaded",
+        default=False,
+        action="store_true"
+    )
     subparsers.add_parser(
         'delete',
          help='Deletes / resets a world\'s information'
     )
+    reindex_parser = subparsers.add_parser(
+        'reindex',
+        help="Rebuilds the index sidecar of a backup, without connecting to a world"
+    )
+    reindex_parser.add_argument(
+        '--stride',
+        help="Number of records between two offsets of the index, 1024 by default",
+        default=None,
+        type=int
+    )
+    reindex_parser.add_argument(
+        'file',
+        help="File to use",
+        type=str,
+    )
+    reindex_parser.set_defaults(offline=True)
+    inspect_parser = subparsers.add_parser(
+        'inspect',
+        help="Summarizes, filters and extracts the records of a backup, without connecting to a world",
+        parents=[region_arg_parser]
+    )
+    inspect_parser.add_argument(
+        '--where',
+        help="Only keeps the records whose field has a value, repeatable: --where owner=5",
+        default=[],
+        action="append",
+        type=_condition
+    )
+    inspect_parser.add_argument(
+        '--histogram',
+        help="Fields to count the values of, model and owner by default. "
+             "Without any, an indexed backup is summarized from its index alone",
+        default=None,
+        nargs='*',
+        dest='histograms'
+    )
+    inspect_parser.add_argument(
+        '--top',
+        help="Number of cells and values to report, 10 by default, 0 for all of them",
+        default=None,
+        type=int
+    )
+    inspect_parser.add_argument(
+        '--head',
+        help="Number of matching records to stop after",
+        default=None,
+        type=int
+    )
+    inspect_parser.add_argument(
+        '--extract',
+        help="File to write the matching records to as json lines, - for stdout",
+        default=None,
+        type=str
+    )
+    inspect_parser.add_argument(
+        '--json',
+        help="If specified, the summary is printed as json",
+        default=False,
+        action="store_true"
+    )
+    inspect_parser.add_argument(
+        'file',
+        help="File to use",
+        type=str,
+    )
+    inspect_parser.set_defaults(offline=True)
+    transform_parser = subparsers.add_parser(
+        'transform',
+        help="Clips, renames the models of, rotates and translates the objects of a backup into a new backup, "
+             "without connecting to a world. The region clips the source backup",
+        parents=[region_arg_parser]
+    )
+    transform_parser.add_argument(
+        '--translate',
+        help="Adds to the coordinates of every object: --translate=dx,dy,dz",
+        default=None,
+        type=_translation
+    )
+    transform_parser.add_argument(
+        '--rotate',
+        help="Degrees to rotate every object by about the pivot, in the direction yaw grows in",
+        default=None,
+        type=float
+    )
+    transform_parser.add_argument(
+        '--pivot',
+        help="Coordinates to rotate about, 0,0 by default: --pivot=x,z",
+        default=None,
+        type=_point
+    )
+    transform_parser.add_argument(
+        '--rename',
+        help="Renames a model, repeatable: --rename old.rwx=new.rwx",
+        default=[],
+        action="append",
+        type=_rename
+    )
+    transform_parser.add_argument(
+        '-f', '--format',
+        help="Format of the new backup",
+        default="json",
+        type=str,
+        choices=["json", "columnar"]
+    )
+    transform_parser.add_argument(
+        '-b', '--binary',
+        help="If specified, the new backup will be written in binary mode",
+        default=False,
+        action="store_true"
+    )
+    transform_parser.add_argument(
+        '-z', '--compress',
+        help="Compresses the new backup in independent frames, which standard tools such as gzip cannot read. "
+             "Defaults to gzip for .kwmz files",
+        default=None,
+        type=str,
+        choices=["gzip", "bz2", "lzma"]
+    )
+    transform_parser.add_argument(
+        '--checksum',
+        help="Algorithm checksumming every block in a .sum sidecar, crc32 by default, none to skip it",
+        default=None,
+        type=str,
+        choices=["crc32", "blake2b", "none"]
+    )
+    transform_parser.add_argument(
+        'file',
+        help="File to transform",
+        type=str,
+    )
+    transform_parser.add_argument(
+        'output',
+        help="File to write the transformed backup to",
+        type=str,
+    )
+    transform_parser.set_defaults(offline=True)
+    verify_parser = subparsers.add_parser(
+        'verify',
+        help="Checks the checksums and records of a backup in parallel, without connecting to a world"
+    )
+    verify_parser.add_argument(
+        '-w', '--workers',
+        help="Number of processes verifying ranges of the backup, one per core by default",
+        default=None,
+        type=int
+    )
+    verify_parser.add_argument(
+        '--range-size',
+        help="Number of bytes verified by a process at a time, 32 MiB by default",
+        default=None,
+        type=int
+    )
+    verify_parser.add_argument(
+        'file',
+        help="File to use",
+        type=str,
+    )
+    verify_parser.set_defaults(offline=True)
 
     arguments = parser.parse_args()
 
+    if arguments.sample_interval is not None and not arguments.profile:
+        parser.error("--sample-interval requires --profile")
+
+    if getattr(arguments, 'resume', False) and not arguments.checkpoint_dir:
+        parser.error("--resume requires --checkpoint-dir")
+
     if arguments.verbose:
         logging.basicConfig(level=logging.DEBUG)
 
+    if getattr(arguments, 'offline', False):
+        from management.invoker import LocalInvoker
+
+        invoke(LocalInvoker.create_offline(arguments), arguments.command.upper(), arguments)
+        return
+
+    from management.instance import ReceiverInstance
+    from management.invoker import LocalInvoker
+
     with ReceiverInstance(arguments.config) as instance:
-        actor = LocalInvoker.create_loaded(instance, arguments)
+        invoke(
+            LocalInvoker.create_loaded(instance, arguments),
+            f"{arguments.command.upper()} {arguments.type.upper()}",
+            arguments
+        )
+
+def invoke(actor, name: str, arguments) -> None:
+    """
+    Invokes a command, reporting and profiling it as asked.
+
+    Args:
+        actor (Invoker): The invoker the command is registered with.
+        name (str): The name of the command.
+        arguments (Namespace): The arguments.
+    """
+    from common.metrics import JsonReport, PrometheusTextfile
+    from common.profiling import profiled
+
+    if arguments.report:
+        actor.add_sink(JsonReport(arguments.report))
 
-        action = 'LOAD' if arguments.load else 'SAVE'
-        action = 'DELETE' if arguments.delete else action
+    if arguments.prometheus:
+        actor.add_sink(PrometheusTextfile(arguments.prometheus))
 
-        actor.invoke(f"{action} {arguments.type.upper()}")
+    with profiled(arguments.profile, arguments.trace_memory, arguments.sample_interval):
+        actor.invoke(name)
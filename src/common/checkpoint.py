@@ -0,0 +1,181 @@
+# Copyright (c) 2022 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import json
+import logging
+import os
+from dataclasses import asdict, dataclass
+from hashlib import blake2b
+
+from common.index import Position
+
+SUFFIX = '.checkpoint'
+DEFAULT_EVERY = 1000
+
+
+@dataclass
+class Checkpoint:
+    """
+    Remembers how far a backup was loaded.
+
+    Attributes:
+        size (int): The size of the backup, to tell it was not changed since.
+        offset (int): The offset of the first record left to load, see common.index.Position.
+        skip (int): The number of records to skip from the offset.
+        records (int): The number of records loaded so far.
+        complete (bool): Whether the whole backup was loaded.
+    """
+    size: int
+    offset: int
+    skip: int
+    records: int
+    complete: bool = False
+
+    @property
+    def position(self) -> Position:
+        return self.offset, self.skip
+
+    def write(self, file: str) -> None:
+        """
+        Writes the checkpoint as json, at once so a crash never leaves half of it.
+
+        Args:
+            file (str): The name of the checkpoint file.
+        """
+        with open(file + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(asdict(self), f)
+
+        os.replace(file + '.tmp', file)
+
+    @staticmethod
+    def read(file: str) -> "Checkpoint":
+        """
+        Reads a checkpoint written by Checkpoint.write.
+
+        Args:
+            file (str): The name of the checkpoint file.
+
+        Returns:
+            Checkpoint: The checkpoint.
+        """
+        with open(file, encoding='utf-8') as f:
+            return Checkpoint(**json.load(f))
+
+
+def checkpoint_file(backup: str, directory: str) -> str:
+    """
+    Names the checkpoint of a backup within a state directory, so backups
+    can be loaded from read only places. Backups of the same name in
+    different directories get checkpoints of their own.
+
+    Args:
+        backup (str): The name of the backup.
+        directory (str): The directory holding checkpoints.
+
+    Returns:
+        str: The name of the checkpoint file.
+    """
+    path = os.path.abspath(backup)
+    digest = blake2b(path.encode('utf-8'), digest_size=4).hexdigest()
+
+    return os.path.join(directory, f'{os.path.basename(path)}.{digest}{SUFFIX}')
+
+
+class Checkpointer:
+    def __init__(self, backup: str, directory: str, every: int = DEFAULT_EVERY, resume: bool = False):
+        """
+        Initializes the checkpoints of loading a backup, kept in a state directory.
+        A finished load can be marked complete, so resuming a set of backups,
+        such as the parts of LOAD ALL, skips the ones already loaded.
+        Resuming a backup without a checkpoint loads it from the start, as it was never started.
+
+        Args:
+            backup (str): The name of the backup.
+            directory (str): The directory holding checkpoints, created as needed.
+            every (int): The number of records between two checkpoints.
+            resume (bool): Whether to continue from the last checkpoint.
+
+        Raises:
+            ValueError: If the backup changed since the checkpoint was written.
+        """
+        os.makedirs(directory, exist_ok=True)
+        self._file = checkpoint_file(backup, directory)
+        self._every = every
+        self._size = os.path.getsize(backup)
+        self.position: Position = None
+        self.records = 0
+        self.complete = False
+
+        if not resume:
+            # A checkpoint left by an earlier load no longer applies.
+            self.clear()
+            return
+
+        if not os.path.exists(self._file):
+            logging.warning(f'No checkpoint for {backup}, loading it from the start')
+            return
+
+        checkpoint = Checkpoint.read(self._file)
+
+        if checkpoint.size != self._size:
+            raise ValueError(f'{backup} changed since {self._file} was written')
+
+        self.records = checkpoint.records
+        self.complete = checkpoint.complete
+
+        if self.complete:
+            logging.info(f'Skipping {backup}, all {self.records} records were loaded')
+        else:
+            self.position = checkpoint.position
+            logging.info(f'Resuming {backup} after {self.records} records')
+
+    def acknowledge(self, position: Position) -> None:
+        """
+        Marks the record at a position as loaded, every earlier one included.
+
+        Args:
+            position (Position): The position of the record.
+        """
+        self.position = (position[0], position[1] + 1)
+        self.records += 1
+
+        if self.records % self._every == 0:
+            self.save()
+
+    def save(self) -> None:
+        """
+        Writes the last acknowledged position, if any.
+        """
+        if self.position is not None:
+            Checkpoint(self._size, *self.position, self.records).write(self._file)
+
+    def finish(self) -> None:
+        """
+        Marks the whole backup loaded.
+        """
+        self.complete = True
+        Checkpoint(self._size, self._size, 0, self.records, complete=True).write(self._file)
+
+    def clear(self) -> None:
+        """
+        Removes the checkpoint.
+        """
+        if os.path.exists(self._file):
+            os.remove(self._file)
@@ -0,0 +1,144 @@
+# Copyright (c) 2022 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import hashlib
+import json
+import os
+import zlib
+
+SUFFIX = '.sum'
+VERSION = 1
+DEFAULT_ALGORITHM = 'crc32'
+ALGORITHMS = ('crc32', 'blake2b')
+
+Checksum = tuple[int, int, str]
+
+
+def digest(algorithm: str, data: bytes) -> str:
+    """
+    Computes the checksum of a block.
+
+    Args:
+        algorithm (str): The algorithm. { "crc32", "blake2b" }
+        data (bytes): The block.
+
+    Returns:
+        str: The checksum, as hex.
+    """
+    if algorithm == 'crc32':
+        return f'{zlib.crc32(data):08x}'
+
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+class ChecksumLog:
+    def __init__(self, file: str, algorithm: str = DEFAULT_ALGORITHM):
+        """
+        Initializes the checksum sidecar of a backup, appended to with every
+        block, compressed frame or flushed run of lines written to the backup.
+        Every block is written whole, so it always ends on a record boundary.
+
+        Args:
+            file (str): The name of the backup.
+            algorithm (str): The algorithm. { "crc32", "blake2b" }
+
+        Raises:
+            ValueError: If the algorithm is unknown.
+        """
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"Unknown checksum algorithm {algorithm}.")
+
+        self._file = file + SUFFIX
+        self.algorithm = algorithm
+        self._handle = None
+
+    def open(self) -> "ChecksumLog":
+        """
+        Opens the sidecar in append mode, writing the header of new sidecars.
+        The sidecar of a new or empty backup is started over.
+
+        Raises:
+            ValueError: If the sidecar holds checksums of another algorithm.
+
+        Returns:
+            ChecksumLog: The current instance.
+        """
+        if self._handle is None:
+            backup = self._file.removesuffix(SUFFIX)
+            appending = os.path.exists(backup) and os.path.getsize(backup) > 0
+            exists = appending and os.path.exists(self._file) and os.path.getsize(self._file) > 0
+
+            if exists:
+                algorithm, _ = read_checksums(backup, entries=False)
+
+                if algorithm != self.algorithm:
+                    raise ValueError(f"{self._file} holds {algorithm} checksums, not {self.algorithm}.")
+
+            self._handle = open(self._file, 'a' if exists else 'w', encoding='utf-8')
+
+            if not exists:
+                self._handle.write(json.dumps({'version': VERSION, 'algorithm': self.algorithm}) + '\n')
+
+        return self
+
+    def add(self, offset: int, data: bytes) -> None:
+        """
+        Records the checksum of a block.
+
+        Args:
+            offset (int): The offset of the block in the backup.
+            data (bytes): The block, as written to the backup.
+        """
+        self.open()
+        self._handle.write(f'[{offset},{len(data)},"{digest(self.algorithm, data)}"]\n')
+
+    def close(self) -> None:
+        """
+        Closes the sidecar. Safe to call more than once.
+        """
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+
+def read_checksums(file: str, entries: bool = True) -> tuple[str, list[Checksum]]:
+    """
+    Reads the checksum sidecar of a backup.
+
+    Args:
+        file (str): The name of the backup.
+        entries (bool): Whether to read the checksums, or only the algorithm.
+
+    Raises:
+        ValueError: If the sidecar was written by a newer version.
+
+    Returns:
+        tuple[str, list[Checksum]]: The algorithm and the offset, size and checksum of every block.
+    """
+    with open(file + SUFFIX, encoding='utf-8') as f:
+        header = json.loads(f.readline())
+
+        if header['version'] > VERSION:
+            raise ValueError(f"Checksums {file + SUFFIX} are newer than version {VERSION}.")
+
+        if not entries:
+            return header['algorithm'], list()
+
+        return header['algorithm'], [tuple(json.loads(line)) for line in f]
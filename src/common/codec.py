@@ -0,0 +1,197 @@
+# Copyright (c) 2022 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import json
+from dataclasses import MISSING, asdict, fields, is_dataclass
+from json.encoder import encode_basestring_ascii
+from typing import Any, Callable
+
+_codecs: dict[type, "RecordCodec"] = dict()
+
+
+def _default(value: Any) -> Any:
+    """
+    Serializes values json does not understand, mirroring asdict + default=str.
+
+    Args:
+        value (Any): The value to serialize.
+
+    Returns:
+        Any: A json serializable representation of the value.
+    """
+    if is_dataclass(value) and not isinstance(value, type):
+        return asdict(value)
+
+    return str(value)
+
+dumps = json.JSONEncoder(skipkeys=True, default=_default).encode
+
+
+def _encode_int(value: Any) -> str:
+    return str(value) if type(value) is int else dumps(value)
+
+def _encode_str(value: Any) -> str:
+    return encode_basestring_ascii(value) if type(value) is str else dumps(value)
+
+_ENCODERS: dict[Any, Callable[[Any], str]] = {
+    int: _encode_int,
+    'int': _encode_int,
+    str: _encode_str,
+    'str': _encode_str,
+}
+
+
+class RecordCodec:
+    def __init__(self, cls: type):
+        """
+        Compiles a json lines encoder and decoder for a data class.
+        The data class is inspected once; every record afterwards goes through
+        generated code without asdict's deep copy or an intermediate dict.
+
+        Args:
+            cls (type): The data class to compile the codec for.
+        """
+        self.cls = cls
+        self.fields = tuple(each for each in fields(cls))
+        self.encode, self.encode_many = self._compile_encoder()
+        self.decode, self.decode_many = self._compile_decoder()
+
+    def _compile_encoder(self) -> tuple[Callable[[Any], str], Callable[[list], list[str]]]:
+        """
+        Generates functions producing the same text as
+        json.dumps(asdict(record), skipkeys=True, default=str),
+        for a single record and for a whole batch of them.
+
+        Returns:
+            tuple[Callable[[Any], str], Callable[[list], list[str]]]: The encoders.
+        """
+        namespace: dict = dict()
+        parts: list[str] = list()
+
+        for index, field in enumerate(self.fields):
+            namespace[f'_e{index}'] = _ENCODERS.get(field.type, dumps)
+            separator = '' if index == 0 else ', '
+            key = encode_basestring_ascii(field.name).replace('{', '{{').replace('}', '}}')
+            parts.append(f'{separator}{key}: {{_e{index}(record.{field.name})}}')
+
+        expression = f"f'{{{{{''.join(parts)}}}}}'"
+        source = "def encode(record):\n"
+        source += f"    return {expression}\n"
+        source += "def encode_many(records):\n"
+        source += f"    return [{expression} for record in records]\n"
+        exec(source, namespace)
+
+        return namespace['encode'], namespace['encode_many']
+
+    def _compile_decoder(self) -> tuple[Callable[[dict], Any], Callable[[list], list]]:
+        """
+        Generates functions building the data class straight from parsed lines,
+        for a single line and for a whole batch of them.
+        Keys that are not fields of the data class are ignored.
+
+        Returns:
+            tuple[Callable[[dict], Any], Callable[[list], list]]: The decoders.
+        """
+        namespace: dict = {'_cls': self.cls}
+        arguments: list[str] = list()
+
+        for index, field in enumerate(self.fields):
+            if not field.init:
+                continue
+
+            if field.default is not MISSING:
+                namespace[f'_d{index}'] = field.default
+                value = f"data.get({field.name!r}, _d{index})"
+            elif field.default_factory is not MISSING:
+                namespace[f'_f{index}'] = field.default_factory
+                value = f"data[{field.name!r}] if {field.name!r} in data else _f{index}()"
+            else:
+                value = f"data[{field.name!r}]"
+
+            arguments.append(f"{field.name}={value}")
+
+        expression = f"_cls({', '.join(arguments)})"
+        source = "def decode(data):\n"
+        source += f"    return {expression}\n"
+        source += "def decode_many(batch):\n"
+        source += f"    return [{expression} for data in batch]\n"
+        exec(source, namespace)
+
+        return namespace['decode'], namespace['decode_many']
+
+    def loads(self, line: str | bytes) -> Any:
+        """
+        Parses a json line into the data class.
+
+        Args:
+            line (str or bytes): The line to parse.
+
+        Returns:
+            Any: The data class instance.
+        """
+        return self.decode(json.loads(line))
+
+
+def codec_for(cls: type) -> RecordCodec:
+    """
+    Gets the compiled codec of a data class, compiling it on first use.
+
+    Args:
+        cls (type): The data class.
+
+    Returns:
+        RecordCodec: The codec.
+    """
+    codec = _codecs.get(cls)
+
+    if codec is None:
+        codec = _codecs[cls] = RecordCodec(cls)
+
+    return codec
+
+def encode(record: Any) -> str:
+    """
+    Encodes a data class instance as a single json line.
+
+    Args:
+        record (Any): The data class instance.
+
+    Returns:
+        str: The json line, without a trailing newline.
+    """
+    return codec_for(type(record)).encode(record)
+
+def encode_many(records: list) -> list[str]:
+    """
+    Encodes a batch of data class instances as json lines.
+    A batch of a single data class goes through its compiled batch encoder.
+
+    Args:
+        records (list): The data class instances.
+
+    Returns:
+        list[str]: The json lines, without trailing newlines.
+    """
+    types = {type(record) for record in records}
+
+    if len(types) == 1:
+        return codec_for(types.pop()).encode_many(records)
+
+    return [encode(record) for record in records]
@@ -0,0 +1,597 @@
+# Copyright (c) 2022 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import io
+import os
+import struct
+import sys
+from array import array
+from dataclasses import dataclass
+from itertools import accumulate
+from typing import Any, BinaryIO, Generator
+
+from common.checksum import ChecksumLog
+from common.compression import FrameReader, FrameWriter, is_compressed
+
+MAGIC = b'KWMC'
+VERSION = 3
+BLOCK_MAGIC = b'KWCB'
+DEFAULT_BLOCK_SIZE = 4096
+
+# Set on the kind of blocks whose strings are references into a per-block string table,
+# written from version 2 on.
+DICTIONARY = 0x80
+DICTIONARY_VERSION = 2
+
+# The kind of blocks holding a terrain page as dense tiles, written from version 3 on.
+TILES = 3
+TILES_VERSION = 3
+
+INT_NULL = -2 ** 31
+STR_NULL = 2 ** 32 - 1
+
+_FILE_HEADER = struct.Struct('<4sB')
+_BLOCK_HEADER = struct.Struct('<4sBII')
+_INT32 = 'i' if array('i').itemsize == 4 else 'l'
+_UINT32 = 'I' if array('I').itemsize == 4 else 'L'
+_SWAP = sys.byteorder != 'little'
+
+
+@dataclass(frozen=True)
+class Layout:
+    """
+    Describes how the fields of a record kind are split into columns.
+
+    Attributes:
+        kind (int): The identifier written in every block header.
+        numbers (tuple[str]): Fields stored as fixed width int32 columns.
+        strings (tuple[str]): Fields stored in the string table, as is or dictionary encoded.
+        lists (tuple[str]): Fields holding variable length lists of integers.
+    """
+    kind: int
+    numbers: tuple[str, ...] = ()
+    strings: tuple[str, ...] = ()
+    lists: tuple[str, ...] = ()
+
+    @property
+    def fields(self) -> tuple[str, ...]:
+        return self.numbers + self.strings + self.lists
+
+
+OBJECTS = Layout(
+    kind=1,
+    numbers=(
+        'type', 'id', 'number', 'owner', 'build_timestamp',
+        'x', 'y', 'z', 'yaw', 'tilt', 'roll'
+    ),
+    strings=('model', 'description', 'action'),
+)
+TERRAIN = Layout(
+    kind=2,
+    numbers=('page_x', 'page_z', 'node_x', 'node_z', 'node_size'),
+    lists=('heights', 'textures'),
+)
+LAYOUTS: dict[int, Layout] = {each.kind: each for each in (OBJECTS, TERRAIN)}
+
+
+def _to_bytes(values: array) -> bytes:
+    if _SWAP:
+        values = array(values.typecode, values)
+        values.byteswap()
+
+    return values.tobytes()
+
+def _from_bytes(typecode: str, payload: memoryview, offset: int, count: int) -> tuple[array, int]:
+    values = array(typecode)
+    end = offset + count * values.itemsize
+    values.frombytes(payload[offset:end])
+
+    if _SWAP:
+        values.byteswap()
+
+    return values, end
+
+def _string_columns(layout: Layout, records: list[dict]) -> list[list[bytes | None]]:
+    return [
+        [None if each[name] is None else each[name].encode('utf-8') for each in records]
+        for name in layout.strings
+    ]
+
+def _plain_strings(columns: list[list[bytes | None]]) -> bytes:
+    parts: list[bytes] = list()
+
+    for encoded in columns:
+        parts.append(_to_bytes(array(_UINT32, [
+            STR_NULL if each is None else len(each)
+            for each in encoded
+        ])))
+        parts.append(b''.join(each for each in encoded if each))
+
+    return b''.join(parts)
+
+def _dictionary_strings(columns: list[list[bytes | None]]) -> bytes:
+    table: dict[bytes, int] = dict()
+    references = [
+        _to_bytes(array(_UINT32, [
+            STR_NULL if each is None else table.setdefault(each, len(table))
+            for each in encoded
+        ]))
+        for encoded in columns
+    ]
+
+    return b''.join([
+        _to_bytes(array(_UINT32, [len(table)])),
+        _to_bytes(array(_UINT32, map(len, table))),
+        b''.join(table),
+        *references
+    ])
+
+def check_records(layout: Layout, records: list[dict]) -> None:
+    """
+    Checks that records can be encoded, raising the error encode_block would raise
+    without building the block, so writers can refuse them before buffering any.
+
+    Args:
+        layout (Layout): The layout of the records.
+        records (list[dict]): The records, as mappings of field name to value.
+
+    Raises:
+        KeyError: If a record misses a field.
+        TypeError: If a value has the wrong type.
+        OverflowError: If a number does not fit in 32 bits.
+    """
+    for name in layout.numbers:
+        array(_INT32, [INT_NULL if each[name] is None else each[name] for each in records])
+
+    for name in layout.lists:
+        array(_INT32, [value for each in records for value in each[name] or ()])
+
+    for name in layout.strings:
+        for each in records:
+            if (value := each[name]) is not None and not isinstance(value, str):
+                raise TypeError(f'{name} must be a string, not {type(value).__name__}')
+
+def encode_block(layout: Layout, records: list[dict], dictionary: bool = True) -> bytes:
+    """
+    Encodes records into a single block.
+    With dictionary encoding, every distinct string of the block is stored once
+    in a string table and the string columns hold references into it, unless
+    the strings repeat too little for the table to be smaller.
+
+    Args:
+        layout (Layout): The layout of the records.
+        records (list[dict]): The records, as mappings of field name to value.
+        dictionary (bool): Whether strings may be dictionary encoded.
+
+    Returns:
+        bytes: The block, including its header.
+    """
+    parts: list[bytes] = list()
+    kind = layout.kind
+
+    for name in layout.numbers:
+        parts.append(_to_bytes(array(_INT32, [
+            INT_NULL if each[name] is None else each[name]
+            for each in records
+        ])))
+
+    for name in layout.lists:
+        values = [each[name] or () for each in records]
+        parts.append(_to_bytes(array(_UINT32, map(len, values))))
+        parts.append(_to_bytes(array(_INT32, [
+            value for each in values for value in each
+        ])))
+
+    if layout.strings:
+        columns = _string_columns(layout, records)
+        strings = _plain_strings(columns)
+
+        if dictionary:
+            encoded = _dictionary_strings(columns)
+
+            if len(encoded) < len(strings):
+                strings, kind = encoded, kind | DICTIONARY
+
+        parts.append(strings)
+
+    return pack_block(kind, len(records), b''.join(parts))
+
+def pack_block(kind: int, count: int, payload: bytes) -> bytes:
+    """
+    Prefixes a block payload with its header.
+
+    Args:
+        kind (int): The kind of the block.
+        count (int): The number of records in the block.
+        payload (bytes): The payload.
+
+    Returns:
+        bytes: The block.
+    """
+    return _BLOCK_HEADER.pack(BLOCK_MAGIC, kind, count, len(payload)) + payload
+
+def decode_block(kind: int, count: int, payload: bytes, strings: dict[str, str] = None) -> list[dict]:
+    """
+    Decodes the payload of a block back into records.
+    Every string is decoded once per block, so records share the strings they repeat;
+    a table shared across blocks also shares them between blocks.
+
+    Args:
+        kind (int): The record kind from the block header.
+        count (int): The number of records in the block.
+        payload (bytes): The block payload.
+        strings (dict[str, str]): The strings decoded so far, to intern strings with.
+
+    Returns:
+        list[dict]: The records.
+    """
+    if kind == TILES:
+        # Tiles build on this module, so they are imported on first use.
+        from common.tiles import decode_page
+
+        return decode_page(count, payload)
+
+    layout = LAYOUTS[kind & ~DICTIONARY]
+    view = memoryview(payload)
+    offset = 0
+    columns: list[list] = list()
+    # Columns are stored in this order, which differs from the order of Layout.fields.
+    names = layout.numbers + layout.lists + layout.strings
+
+    for _ in layout.numbers:
+        values, offset = _from_bytes(_INT32, view, offset, count)
+        columns.append([None if each == INT_NULL else each for each in values])
+
+    for _ in layout.lists:
+        lengths, offset = _from_bytes(_UINT32, view, offset, count)
+        values, offset = _from_bytes(_INT32, view, offset, sum(lengths))
+        values = values.tolist()
+        columns.append([
+            values[end - length:end]
+            for length, end in zip(lengths, accumulate(lengths))
+        ])
+
+    if kind & DICTIONARY:
+        size, offset = _from_bytes(_UINT32, view, offset, 1)
+        lengths, offset = _from_bytes(_UINT32, view, offset, size[0])
+        table: list[str] = list()
+
+        for length in lengths:
+            value = str(view[offset:offset + length], 'utf-8')
+            table.append(value if strings is None else strings.setdefault(value, value))
+            offset += length
+
+        for _ in layout.strings:
+            references, offset = _from_bytes(_UINT32, view, offset, count)
+            columns.append([None if each == STR_NULL else table[each] for each in references])
+
+        return [dict(zip(names, values)) for values in zip(*columns)]
+
+    for _ in layout.strings:
+        lengths, offset = _from_bytes(_UINT32, view, offset, count)
+        column: list = list()
+
+        for length in lengths:
+            if length == STR_NULL:
+                column.append(None)
+                continue
+
+            value = str(view[offset:offset + length], 'utf-8')
+            column.append(value if strings is None else strings.setdefault(value, value))
+            offset += length
+        columns.append(column)
+
+    return [dict(zip(names, values)) for values in zip(*columns)]
+
+def write_header(stream: BinaryIO) -> None:
+    """
+    Writes the file header if the stream is positioned at the start of the file.
+
+    Args:
+        stream (BinaryIO): The stream to write to.
+    """
+    if stream.tell() == 0:
+        stream.write(_FILE_HEADER.pack(MAGIC, VERSION))
+
+def read_header(stream: BinaryIO) -> int:
+    """
+    Reads and validates the file header.
+
+    Args:
+        stream (BinaryIO): The stream to read from.
+
+    Raises:
+        ValueError: If the stream is not a columnar backup.
+
+    Returns:
+        int: The format version.
+    """
+    magic, version = _FILE_HEADER.unpack(stream.read(_FILE_HEADER.size))
+
+    if magic != MAGIC or version > VERSION:
+        raise ValueError(f"Not a columnar backup (version {VERSION} or lower).")
+
+    return version
+
+def file_version(file: str) -> int:
+    """
+    Reads the format version of a backup appended to, the current one for new backups.
+
+    Args:
+        file (str): The name of the backup.
+
+    Raises:
+        ValueError: If the backup is not a columnar backup.
+
+    Returns:
+        int: The format version.
+    """
+    if not os.path.exists(file) or os.path.getsize(file) == 0:
+        return VERSION
+
+    with io.BufferedReader(FrameReader(file)) if is_compressed(file) else open(file, 'rb') as f:
+        return read_header(f)
+
+def read_blocks(stream: BinaryIO) -> Generator[tuple[int, int, bytes], None, None]:
+    """
+    Reads blocks one at a time, so only a single block is held in memory.
+
+    Args:
+        stream (BinaryIO): The stream positioned after the file header.
+
+    Raises:
+        ValueError: If a block is truncated or corrupt.
+
+    Yields:
+        tuple[int, int, bytes]: The kind, record count and payload of each block.
+    """
+    while header := stream.read(_BLOCK_HEADER.size):
+        if len(header) != _BLOCK_HEADER.size:
+            raise ValueError("Truncated block header.")
+
+        magic, kind, count, size = _BLOCK_HEADER.unpack(header)
+        if magic != BLOCK_MAGIC:
+            raise ValueError(f"Bad block magic at offset {stream.tell() - len(header)}.")
+
+        payload = stream.read(size)
+        if len(payload) != size:
+            raise ValueError("Truncated block payload.")
+
+        yield kind, count, payload
+
+def block_offsets(stream: BinaryIO) -> Generator[tuple[int, int], None, None]:
+    """
+    Lists the blocks of a file from their headers, seeking past their payloads.
+
+    Args:
+        stream (BinaryIO): The seekable stream positioned after the file header.
+
+    Raises:
+        ValueError: If a block header is truncated or corrupt.
+
+    Yields:
+        tuple[int, int]: The offset and size, header included, of every block.
+    """
+    while header := stream.read(_BLOCK_HEADER.size):
+        offset = stream.tell() - len(header)
+
+        if len(header) != _BLOCK_HEADER.size:
+            raise ValueError(f"Truncated block header at offset {offset}.")
+
+        magic, _, _, size = _BLOCK_HEADER.unpack(header)
+        if magic != BLOCK_MAGIC:
+            raise ValueError(f"Bad block magic at offset {offset}.")
+
+        yield offset, _BLOCK_HEADER.size + size
+        stream.seek(size, os.SEEK_CUR)
+
+
+class ColumnarWriter:
+    def __init__(
+        self,
+        file: str,
+        layout: Layout,
+        block_size: int = DEFAULT_BLOCK_SIZE,
+        compression: str = None,
+        checksum: str = None
+    ):
+        """
+        Initializes a writer grouping records into columnar blocks.
+
+        Args:
+            file (str): The name of the file to append to.
+            layout (Layout): The layout of the records.
+            block_size (int): The number of records per block.
+            compression (str): The codec to compress with. { "gzip", "bz2", "lzma" }
+            checksum (str): The algorithm to checksum every block or frame with. { "crc32", "blake2b" }
+        """
+        self._file = file
+        self._checksums = ChecksumLog(file, checksum) if checksum else None
+        self._compression = compression
+        self._layout = layout
+        self._block_size = block_size
+        self._pending: list[dict] = list()
+        self._handle = None
+        self._dictionary = True
+        self.offset = None
+        self.records_written = 0
+
+    def __enter__(self) -> "ColumnarWriter":
+        return self.open()
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def open(self) -> "ColumnarWriter":
+        """
+        Opens the underlying file in append mode, writing the header of new files.
+        Blocks appended to a backup of an older version are written as that version reads them.
+
+        Returns:
+            ColumnarWriter: The current instance.
+        """
+        if self._handle is None:
+            self._dictionary = file_version(self._file) >= DICTIONARY_VERSION
+
+            if self._compression:
+                self._handle = FrameWriter(self._file, self._compression, checksums=self._checksums)
+            else:
+                self._handle = open(self._file, 'ab')
+            write_header(self._handle)
+            self.offset = self._handle.tell()
+
+        return self
+
+    def write(self, record: Any) -> tuple[int, int]:
+        """
+        Buffers a record, writing a block once enough records are buffered.
+
+        Args:
+            record (Any): A data class instance or mapping holding the layout's fields.
+
+        Returns:
+            tuple[int, int]: The offset of the record's block and its index in the block.
+        """
+        if self._handle is None:
+            self.open()
+
+        if not isinstance(record, dict):
+            record = {name: getattr(record, name, None) for name in self._layout.fields}
+
+        check_records(self._layout, [record])
+        position = (self.offset, len(self._pending))
+        self._pending.append(record)
+        self.records_written += 1
+
+        if len(self._pending) >= self._block_size:
+            self.flush()
+
+        return position
+
+    def write_many(self, records: list) -> list[tuple[int, int]]:
+        """
+        Buffers a batch of records, writing blocks as they fill up.
+        The batch is checked first, so a batch holding a record that cannot be
+        encoded is refused as a whole, leaving the writer as it was.
+
+        Args:
+            records (list): Data class instances or mappings holding the layout's fields.
+
+        Raises:
+            KeyError: If a record misses a field.
+            TypeError: If a value has the wrong type.
+            OverflowError: If a number does not fit in 32 bits.
+
+        Returns:
+            list[tuple[int, int]]: The offset of every record's block and its index in the block.
+        """
+        if self._handle is None:
+            self.open()
+
+        names = self._layout.fields
+        rows = [
+            record if isinstance(record, dict) else {name: getattr(record, name, None) for name in names}
+            for record in records
+        ]
+        check_records(self._layout, rows)
+        positions: list[tuple[int, int]] = list()
+        start = 0
+
+        while start < len(rows):
+            first = len(self._pending)
+            chunk = rows[start:start + self._block_size - first]
+            positions.extend((self.offset, index) for index in range(first, first + len(chunk)))
+            self._pending.extend(chunk)
+            self.records_written += len(chunk)
+            start += len(chunk)
+
+            if len(self._pending) >= self._block_size:
+                self.flush()
+
+        return positions
+
+    def _encode(self, records: list[dict]) -> bytes:
+        """
+        Encodes buffered records as a block.
+
+        Args:
+            records (list[dict]): The records.
+
+        Returns:
+            bytes: The block, including its header.
+        """
+        return encode_block(self._layout, records, self._dictionary)
+
+    def flush(self) -> None:
+        """
+        Writes all buffered records as a block.
+        The block is encoded before anything is written; if that fails,
+        the buffered records are dropped so they do not fail every later flush.
+        """
+        if not self._pending:
+            return
+
+        self.open()
+
+        try:
+            block = self._encode(self._pending)
+        except Exception as e:
+            self.records_written -= len(self._pending)
+            self._pending.clear()
+            raise e
+
+        if self._checksums is not None and not self._compression:
+            self._checksums.add(self.offset, block)
+
+        self._handle.write(block)
+        self._handle.flush()
+        self.offset += len(block)
+        self._pending.clear()
+
+    def close(self) -> None:
+        """
+        Writes the last partial block and closes the file.
+        Safe to call more than once.
+        """
+        try:
+            self.flush()
+        finally:
+            if self._handle is not None:
+                self._handle.close()
+                self._handle = None
+
+            if self._checksums is not None:
+                self._checksums.close()
+
+
+def layout_for(query_type: str) -> Layout:
+    """
+    Finds the layout of a query type.
+
+    Args:
+        query_type (str): The query type. { "objects", "terrain" }
+
+    Raises:
+        KeyError: If the query type has no columnar layout.
+
+    Returns:
+        Layout: The layout.
+    """
+    return {'OBJECT': OBJECTS, 'TERRAIN': TERRAIN}[query_type.upper().removesuffix('S')]
@@ -0,0 +1,361 @@
+# Copyright (c) 2022 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import bz2
+import gzip
+import io
+import lzma
+import os
+import struct
+from typing import BinaryIO, Callable, Generator
+
+from common.checksum import ChecksumLog
+
+MAGIC = b'KWMZ'
+VERSION = 1
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+_FILE_HEADER = struct.Struct('<4sBB')
+_FRAME_HEADER = struct.Struct('<II')
+
+# Codec name: (identifier, compress, decompress)
+CODECS: dict[str, tuple[int, Callable[[bytes], bytes], Callable[[bytes], bytes]]] = {
+    'gzip': (1, lambda data: gzip.compress(data, compresslevel=6, mtime=0), gzip.decompress),
+    'bz2': (2, bz2.compress, bz2.decompress),
+    'lzma': (3, lzma.compress, lzma.decompress),
+}
+# Framed files are not gzip, bzip2 or xz streams, so they have an extension of their own.
+# The codec is kept in the file's header, the extension only picks one when none is asked for.
+EXTENSIONS: dict[str, str] = {
+    '.kwmz': 'gzip',
+}
+STANDARD_EXTENSIONS = ('.gz', '.bz2', '.xz', '.lzma')
+_BY_IDENTIFIER = {identifier: name for name, (identifier, _, _) in CODECS.items()}
+
+
+def codec_for(file: str, codec: str = None) -> str | None:
+    """
+    Chooses the codec of a file to write, from an explicit choice or the file's extension.
+    Files named like standard compressed files are refused, as tools such as
+    gzip or xz cannot read backups, whether framed or not.
+
+    Args:
+        file (str): The name of the file.
+        codec (str): The codec asked for, if any. { "gzip", "bz2", "lzma" }
+
+    Raises:
+        ValueError: If the file has the extension of a standard compressed file.
+
+    Returns:
+        str | None: The codec, or None for uncompressed files.
+    """
+    extension = os.path.splitext(file)[1].lower()
+
+    if extension in STANDARD_EXTENSIONS:
+        raise ValueError(f'{file} would not be a {extension} file, name compressed backups .kwmz instead')
+
+    if codec is not None:
+        return codec
+
+    return EXTENSIONS.get(extension)
+
+def is_compressed(file: str) -> bool:
+    """
+    Checks whether a file was written by a FrameWriter.
+
+    Args:
+        file (str): The name of the file.
+
+    Returns:
+        bool: Whether the file starts with the framed compression header.
+    """
+    with open(file, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+def _read_header(stream: BinaryIO) -> str:
+    magic, version, identifier = _FILE_HEADER.unpack(stream.read(_FILE_HEADER.size))
+
+    if magic != MAGIC or version > VERSION or identifier not in _BY_IDENTIFIER:
+        raise ValueError("Not a framed compressed file.")
+
+    return _BY_IDENTIFIER[identifier]
+
+
+class FrameWriter(io.RawIOBase):
+    def __init__(
+        self,
+        file: str,
+        codec: str,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        checksums: ChecksumLog = None
+    ):
+        """
+        Initializes a binary stream compressing its data into independent frames.
+        A frame is only cut between two write calls, so callers writing whole
+        records or blocks at a time never have one split across frames.
+
+        Args:
+            file (str): The name of the file to append to.
+            codec (str): The codec to compress with. { "gzip", "bz2", "lzma" }
+            chunk_size (int): The number of uncompressed bytes per frame.
+            checksums (ChecksumLog): Records the checksum of every frame, as written.
+        """
+        super().__init__()
+
+        self._identifier, self._compress, _ = CODECS[codec]
+        self._chunk_size = chunk_size
+        self._pending: list[bytes] = list()
+        self._pending_size = 0
+        self._checksums = checksums
+        self._handle = open(file, 'ab')
+
+        if self._handle.tell() == 0:
+            self._handle.write(_FILE_HEADER.pack(MAGIC, VERSION, self._identifier))
+            self._written = 0
+        else:
+            with open(file, 'rb') as f:
+                if _read_header(f) != codec:
+                    raise ValueError(f"{file} is not compressed with {codec}.")
+            self._written = self._handle.tell()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: bytes) -> int:
+        """
+        Buffers data, compressing a frame once a chunk worth is buffered.
+
+        Args:
+            data (bytes): The data.
+
+        Returns:
+            int: The number of bytes written.
+        """
+        self._pending.append(bytes(data))
+        self._pending_size += len(data)
+        self._written += len(data)
+
+        if self._pending_size >= self._chunk_size:
+            self._write_frame()
+
+        return len(data)
+
+    def tell(self) -> int:
+        """
+        Gets the number of bytes written, counting the existing file when appending.
+
+        Returns:
+            int: The position.
+        """
+        return self._written
+
+    def _write_frame(self) -> None:
+        if not self._pending:
+            return
+
+        raw = b''.join(self._pending)
+        compressed = self._compress(raw)
+        frame = _FRAME_HEADER.pack(len(raw), len(compressed)) + compressed
+
+        if self._checksums is not None:
+            self._checksums.add(self._handle.tell(), frame)
+
+        self._handle.write(frame)
+        self._pending.clear()
+        self._pending_size = 0
+
+    def close(self) -> None:
+        """
+        Compresses the last partial frame and closes the file.
+        """
+        if not self.closed:
+            try:
+                self._write_frame()
+            finally:
+                self._handle.close()
+
+        super().close()
+
+
+class FrameReader(io.RawIOBase):
+    def __init__(self, file: str, offset: int = None):
+        """
+        Initializes a binary stream decompressing a framed file one frame at a time.
+
+        Args:
+            file (str): The name of the file.
+            offset (int): The offset of the frame to start at. Defaults to the first frame.
+        """
+        super().__init__()
+
+        self._handle = open(file, 'rb')
+        self.codec = _read_header(self._handle)
+        self._decompress = CODECS[self.codec][2]
+        self._frame = memoryview(b'')
+        self._position = 0
+        self._consumed = 0
+
+        if offset is not None:
+            self._handle.seek(offset)
+
+        self.frame_offset = self._handle.tell()
+
+    def readable(self) -> bool:
+        return True
+
+    def next_frame(self) -> bytes | None:
+        """
+        Reads and decompresses the next frame, discarding what is left of the current one.
+
+        Raises:
+            ValueError: If the frame is truncated or corrupt.
+
+        Returns:
+            bytes | None: The decompressed frame, or None at the end of the file.
+        """
+        offset = self._handle.tell()
+        header = self._handle.read(_FRAME_HEADER.size)
+
+        if not header:
+            return None
+
+        if len(header) != _FRAME_HEADER.size:
+            raise ValueError(f"Truncated frame header at offset {offset}.")
+
+        raw_size, size = _FRAME_HEADER.unpack(header)
+        compressed = self._handle.read(size)
+
+        if len(compressed) != size:
+            raise ValueError(f"Truncated frame at offset {offset}.")
+
+        raw = self._decompress(compressed)
+        if len(raw) != raw_size:
+            raise ValueError(f"Frame at offset {offset} holds {len(raw)} bytes, expected {raw_size}.")
+
+        self.frame_offset = offset
+        self._frame = memoryview(raw)
+        self._position = len(raw)
+
+        return raw
+
+    def readinto(self, buffer) -> int:
+        """
+        Fills a buffer with decompressed data, moving to the next frame when needed.
+
+        Args:
+            buffer: The buffer to fill.
+
+        Returns:
+            int: The number of bytes read, 0 at the end of the file.
+        """
+        if self._position >= len(self._frame):
+            if self.next_frame() is None:
+                return 0
+            self._position = 0
+
+        size = min(len(buffer), len(self._frame) - self._position)
+        buffer[:size] = self._frame[self._position:self._position + size]
+        self._position += size
+        self._consumed += size
+
+        return size
+
+    def tell(self) -> int:
+        """
+        Gets the number of decompressed bytes read so far.
+
+        Returns:
+            int: The position.
+        """
+        return self._consumed
+
+    def frames(self) -> Generator[tuple[int, bytes], None, None]:
+        """
+        Iterates over the remaining frames, each decompressed on its own.
+
+        Yields:
+            tuple[int, bytes]: The offset of every frame and its decompressed data.
+        """
+        while (raw := self.next_frame()) is not None:
+            yield self.frame_offset, raw
+
+    def close(self) -> None:
+        if not self.closed:
+            self._handle.close()
+
+        super().close()
+
+
+def frame_offsets(file: str) -> Generator[tuple[int, int], None, None]:
+    """
+    Lists the frames of a file from their headers, without decompressing them.
+    Frames are independent, so each can be handed to a different worker.
+
+    Args:
+        file (str): The name of the file.
+
+    Yields:
+        tuple[int, int]: The offset and uncompressed size of every frame.
+    """
+    with open(file, 'rb') as f:
+        _read_header(f)
+
+        while header := f.read(_FRAME_HEADER.size):
+            if len(header) != _FRAME_HEADER.size:
+                raise ValueError(f"Truncated frame header at offset {f.tell() - len(header)}.")
+
+            raw_size, size = _FRAME_HEADER.unpack(header)
+            yield f.tell() - _FRAME_HEADER.size, raw_size
+            f.seek(size, os.SEEK_CUR)
+
+def decode_frames(data: bytes, codec: str) -> Generator[bytes, None, None]:
+    """
+    Decompresses consecutive whole frames read from a file, such as a range handed to a worker.
+
+    Args:
+        data (bytes): The frames, headers included.
+        codec (str): The codec of the file. { "gzip", "bz2", "lzma" }
+
+    Raises:
+        ValueError: If a frame is truncated or corrupt.
+
+    Yields:
+        bytes: The decompressed data of every frame.
+    """
+    decompress = CODECS[codec][2]
+    view = memoryview(data)
+    offset = 0
+
+    while offset < len(view):
+        if len(view) - offset < _FRAME_HEADER.size:
+            raise ValueError(f"Truncated frame header at offset {offset}.")
+
+        raw_size, size = _FRAME_HEADER.unpack_from(view, offset)
+        offset += _FRAME_HEADER.size
+
+        if len(view) - offset < size:
+            raise ValueError(f"Truncated frame at offset {offset - _FRAME_HEADER.size}.")
+
+        raw = decompress(view[offset:offset + size])
+        if len(raw) != raw_size:
+            raise ValueError(f"Frame holds {len(raw)} bytes, expected {raw_size}.")
+
+        offset += size
+        yield raw
@@ -0,0 +1,330 @@
+# Copyright (c) 2022 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import json
+import os
+import time
+from hashlib import blake2b
+from typing import Any, Callable, Generator, Iterable
+
+from common.codec import dumps, encode
+from common.index import cell_of
+
+VERSION = 1
+MANIFEST_SUFFIX = '.manifest.json'
+
+ADD = 'add'
+CHANGE = 'change'
+DELETE = 'delete'
+
+# Fields identifying a record across snapshots, and the fields compared to detect a change.
+IDENTITY: dict[str, tuple[str, ...]] = {
+    'objects': ('x', 'y', 'z', 'model', 'owner', 'build_timestamp'),
+    'terrain': ('page_x', 'page_z', 'node_x', 'node_z', 'node_size'),
+    'attributes': ('name',),
+}
+CONTENT: dict[str, tuple[str, ...]] = {
+    'objects': ('type', 'yaw', 'tilt', 'roll', 'description', 'action'),
+    'terrain': ('heights', 'textures'),
+    'attributes': ('value',),
+}
+
+
+def _digest(values: list) -> int:
+    return int.from_bytes(blake2b(dumps(values).encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+class Differ:
+    def __init__(self, query_type: str):
+        """
+        Initializes a differ hashing records of a query type by identity and content.
+        Records may be data class instances or the mappings read from a backup.
+
+        Args:
+            query_type (str): The query type. { "attributes", "objects", "terrain" }
+        """
+        self.query_type = query_type.lower()
+        self._identity = IDENTITY[self.query_type]
+        self._content = CONTENT[self.query_type]
+        self._with_cell = self.query_type == 'objects'
+
+    def _values(self, record: Any, names: tuple[str, ...]) -> list:
+        if isinstance(record, dict):
+            return [record.get(name) for name in names]
+
+        return [getattr(record, name, None) for name in names]
+
+    def identity(self, record: Any) -> int:
+        """
+        Hashes the stable identity of a record.
+
+        Args:
+            record (Any): The record.
+
+        Returns:
+            int: The identity hash.
+        """
+        values = self._values(record, self._identity)
+
+        if self._with_cell:
+            located = values[0] is not None and values[2] is not None
+            values.append(cell_of(values[0], values[2]) if located else None)
+
+        return _digest(values)
+
+    def content(self, record: Any) -> int:
+        """
+        Hashes the mutable content of a record.
+
+        Args:
+            record (Any): The record.
+
+        Returns:
+            int: The content hash.
+        """
+        return _digest(self._values(record, self._content))
+
+    def hash_index(self, records: Iterable[Any]) -> dict[int, list[int]]:
+        """
+        Builds the identity to content hash index of a snapshot.
+        Records sharing an identity, such as stacked copies of an object, are all kept.
+
+        Args:
+            records (Iterable[Any]): The snapshot's records.
+
+        Returns:
+            dict[int, list[int]]: The content hash of every record, per identity.
+        """
+        index: dict[int, list[int]] = dict()
+
+        for record in records:
+            index.setdefault(self.identity(record), list()).append(self.content(record))
+
+        return index
+
+    def match(self, index: dict[int, list[int]], live: Iterable[Any]) -> Generator[tuple[str, Any], None, None]:
+        """
+        Matches live records against the hash index of a base snapshot, as multisets:
+        every live record consumes one base record of the same identity and content.
+        A live record left unmatched is a change only when its identity has a single
+        base record, which is left unmatched too; otherwise it is an addition.
+        The base records left unmatched stay in the index, they are the deleted ones.
+
+        Live records whose identity is in the base but whose content is not are held
+        until the live records are exhausted, as a later record may still match.
+
+        Args:
+            index (dict[int, list[int]]): The base snapshot's hash index, consumed as records match.
+            live (Iterable[Any]): The live records.
+
+        Yields:
+            tuple[str, Any]: The addition or change and the live record it applies to.
+        """
+        unmatched: dict[int, list] = dict()
+        shared: set[int] = set()
+
+        for record in live:
+            identity = self.identity(record)
+            contents = index.get(identity)
+
+            if contents is None:
+                yield ADD, record
+                continue
+
+            content = self.content(record)
+            if content not in contents:
+                unmatched.setdefault(identity, list()).append(record)
+                continue
+
+            contents.remove(content)
+            if contents:
+                # The identity has other base records, so which one changed would be ambiguous.
+                shared.add(identity)
+            else:
+                del index[identity]
+
+        for identity, records in unmatched.items():
+            contents = index.get(identity)
+
+            if contents is not None and len(contents) == 1 and identity not in shared:
+                del index[identity]
+                yield CHANGE, records.pop(0)
+
+            for record in records:
+                yield ADD, record
+
+    def diff(
+        self,
+        base: Callable[[], Iterable[Any]],
+        live: Iterable[Any]
+    ) -> Generator[tuple[str, Any], None, None]:
+        """
+        Compares live records against a base snapshot, see match.
+        The base is read once to build its hash index and, only if records
+        were deleted, a second time to emit the deleted records.
+
+        Args:
+            base (Callable[[], Iterable[Any]]): Opens the base snapshot's records.
+            live (Iterable[Any]): The live records.
+
+        Yields:
+            tuple[str, Any]: The operation and the record it applies to.
+        """
+        remaining = self.hash_index(base())
+        yield from self.match(remaining, live)
+
+        if not remaining:
+            return
+
+        for record in base():
+            contents = remaining.get(self.identity(record))
+
+            if contents and (content := self.content(record)) in contents:
+                contents.remove(content)
+                yield DELETE, record
+
+
+def encode_operation(operation: str, record: Any) -> str:
+    """
+    Encodes an operation as a delta json line.
+
+    Args:
+        operation (str): The operation. { "add", "change", "delete" }
+        record (Any): The record.
+
+    Returns:
+        str: The json line, without a trailing newline.
+    """
+    data = dumps(record) if isinstance(record, dict) else encode(record)
+
+    return f'{{"op": "{operation}", "record": {data}}}'
+
+def write_manifest(
+    file: str,
+    base: str,
+    base_format: str,
+    query_type: str,
+    counts: dict[str, int]
+) -> None:
+    """
+    Writes the manifest pointing a delta at its base snapshot.
+
+    Args:
+        file (str): The name of the delta.
+        base (str): The name of the base snapshot.
+        base_format (str): The format of the base snapshot.
+        query_type (str): The query type of the snapshot.
+        counts (dict[str, int]): The number of records per operation.
+    """
+    base_path = os.path.relpath(os.path.abspath(base), os.path.dirname(os.path.abspath(file)))
+
+    with open(file + MANIFEST_SUFFIX, 'w', encoding='utf-8') as f:
+        json.dump({
+            'version': VERSION,
+            'base': base_path,
+            'base_format': base_format,
+            'base_size': os.path.getsize(base),
+            'query_type': query_type,
+            'created': int(time.time()),
+            'counts': counts,
+        }, f, indent=4)
+
+def read_manifest(file: str) -> dict:
+    """
+    Reads the manifest of a delta, resolving the base relative to the delta.
+
+    Args:
+        file (str): The name of the delta.
+
+    Raises:
+        ValueError: If the base changed size since the delta was taken.
+
+    Returns:
+        dict: The manifest.
+    """
+    with open(file + MANIFEST_SUFFIX, encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    manifest['base'] = os.path.join(os.path.dirname(os.path.abspath(file)), manifest['base'])
+
+    if os.path.getsize(manifest['base']) != manifest['base_size']:
+        raise ValueError(f"Base {manifest['base']} changed since {file} was taken.")
+
+    return manifest
+
+def is_delta(file: str) -> bool:
+    """
+    Checks whether a backup is a delta.
+
+    Args:
+        file (str): The name of the backup.
+
+    Returns:
+        bool: Whether the backup has a delta manifest.
+    """
+    return os.path.exists(file + MANIFEST_SUFFIX)
+
+def materialize(
+    base: Iterable[dict],
+    operations: Iterable[dict],
+    query_type: str
+) -> Generator[dict, None, None]:
+    """
+    Rebuilds a full snapshot from a base snapshot and a delta.
+    Only the identities touched by the delta are held in memory.
+    A change replaces the base record of its identity, and a deletion
+    removes one base record of the same identity and content.
+
+    Args:
+        base (Iterable[dict]): The base snapshot's records.
+        operations (Iterable[dict]): The delta's decoded json lines.
+        query_type (str): The query type of the snapshot.
+
+    Yields:
+        dict: The records of the snapshot the delta was taken from.
+    """
+    differ = Differ(query_type)
+    changed: set[int] = set()
+    deleted: dict[int, list[int]] = dict()
+    upserts: list[dict] = list()
+
+    for operation in operations:
+        record = operation['record']
+
+        if operation['op'] == CHANGE:
+            changed.add(differ.identity(record))
+        elif operation['op'] == DELETE:
+            deleted.setdefault(differ.identity(record), list()).append(differ.content(record))
+        if operation['op'] in (ADD, CHANGE):
+            upserts.append(record)
+
+    for record in base:
+        identity = differ.identity(record)
+
+        # A change replaces the only base record of its identity, a deletion one record of equal content.
+        if identity in changed:
+            continue
+        if (contents := deleted.get(identity)) and (content := differ.content(record)) in contents:
+            contents.remove(content)
+            continue
+
+        yield record
+
+    yield from upserts
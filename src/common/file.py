@@ -19,8 +19,193 @@
 # OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
 # WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
+import io
 import json
 import logging
+import mmap
+import os
+from itertools import islice
+from typing import BinaryIO, Generator, Iterable
+
+from common import columnar, compression
+from common.checksum import ChecksumLog
+from common.index import Cell, Index, Position, read_sidecar
+
+DEFAULT_BUFFER_SIZE = 1024 * 1024
+DEFAULT_PARSE_BATCH = 1024
+INTERN_LIMIT = 64 * 1024
+
+
+class RecordWriter:
+    def __init__(
+        self,
+        file: str,
+        binary_mode: bool = False,
+        buffer_size: int = DEFAULT_BUFFER_SIZE,
+        flush_every: int = None,
+        compression: str = None,
+        checksum: str = None
+    ):
+        """
+        Initializes a streaming, newline delimited record writer.
+        The file is opened once and records are buffered in memory
+        until either the buffer size or the record count is reached.
+
+        Args:
+            file (str): The name of the file to append to.
+            binary_mode (bool): Whether to open the file in binary mode.
+            buffer_size (int): The number of bytes to buffer before flushing.
+            flush_every (int): The number of records to buffer before flushing.
+            compression (str): The codec to compress with. { "gzip", "bz2", "lzma" }
+            checksum (str): The algorithm to checksum every flush or frame with. { "crc32", "blake2b" }
+        """
+        self._file = file
+        self._binary_mode = binary_mode
+        self._checksums = ChecksumLog(file, checksum) if checksum else None
+        self._compression = compression
+        self._buffer_size = buffer_size
+        self._flush_every = flush_every
+        self._newline = b"\n" if binary_mode else "\n"
+        self._pending: list = list()
+        self._pending_size = 0
+        self._handle = None
+        self.offset = None
+        self.records_written = 0
+
+    def __enter__(self) -> "RecordWriter":
+        return self.open()
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def open(self) -> "RecordWriter":
+        """
+        Opens the underlying file in append mode.
+        Newlines are never translated, so record offsets are exact byte offsets.
+
+        Returns:
+            RecordWriter: The current instance.
+        """
+        if self._handle is None:
+            if self._compression:
+                self._handle = compression.FrameWriter(
+                    self._file,
+                    self._compression,
+                    self._buffer_size,
+                    self._checksums
+                )
+                self.offset = self._handle.tell()
+                return self
+
+            # Text is encoded on flush, so what is checksummed is exactly what is written.
+            self._handle = open(self._file, "ab")
+            self.offset = os.fstat(self._handle.fileno()).st_size
+
+        return self
+
+    def write(self, data: str | bytes) -> tuple[int, int]:
+        """
+        Buffers a single record, flushing when a threshold is reached.
+
+        Args:
+            data (str or bytes): The record to write, without a trailing newline.
+
+        Returns:
+            tuple[int, int]: The byte offset of the record and the records to skip there.
+        """
+        if self._handle is None:
+            self.open()
+
+        position = (self.offset, 0)
+        size = len(data) if self._binary_mode or data.isascii() else len(data.encode("utf-8"))
+
+        self._pending.append(data)
+        self._pending.append(self._newline)
+        self._pending_size += size + 1
+        self.offset += size + 1
+        self.records_written += 1
+
+        if self._pending_size >= self._buffer_size:
+            self.flush()
+        elif self._flush_every and self.records_written % self._flush_every == 0:
+            self.flush()
+
+        return position
+
+    def write_many(self, data: list[str | bytes]) -> list[tuple[int, int]]:
+        """
+        Buffers a batch of records as a single joined chunk, flushing when a threshold is reached.
+
+        Args:
+            data (list[str or bytes]): The records to write, without trailing newlines.
+
+        Returns:
+            list[tuple[int, int]]: The byte offset of every record and the records to skip there.
+        """
+        if not data:
+            return list()
+
+        if self._handle is None:
+            self.open()
+
+        positions: list[tuple[int, int]] = list()
+        offset = self.offset
+
+        for each in data:
+            positions.append((offset, 0))
+            offset += (len(each) if self._binary_mode or each.isascii() else len(each.encode("utf-8"))) + 1
+
+        written = self.records_written
+        self._pending.append(self._newline.join(data))
+        self._pending.append(self._newline)
+        self._pending_size += offset - self.offset
+        self.offset = offset
+        self.records_written += len(data)
+
+        if self._pending_size >= self._buffer_size:
+            self.flush()
+        elif self._flush_every and written // self._flush_every != self.records_written // self._flush_every:
+            self.flush()
+
+        return positions
+
+    def flush(self) -> None:
+        """
+        Writes all buffered records to the file.
+        """
+        if not self._pending:
+            return
+
+        self.open()
+        logging.debug(f"Flushing {self._pending_size} bytes to {self._file}")
+        start = self.offset - self._pending_size
+        data = self._newline[:0].join(self._pending)
+
+        if not self._binary_mode:
+            data = data.encode("utf-8")
+
+        if self._checksums is not None and not self._compression:
+            self._checksums.add(start, data)
+
+        self._handle.write(data)
+        self._handle.flush()
+        self._pending.clear()
+        self._pending_size = 0
+
+    def close(self) -> None:
+        """
+        Flushes any complete records and closes the file.
+        Safe to call more than once.
+        """
+        try:
+            self.flush()
+        finally:
+            if self._handle is not None:
+                self._handle.close()
+                self._handle = None
+
+            if self._checksums is not None:
+                self._checksums.close()
 
 
 def append_to(file: str, data: str | bytes) -> None:
@@ -43,21 +228,346 @@ def append_to(file: str, data: str | bytes) -> None:
         else:
             f.write("\n")
 
-def load(file: str, binary_mode: bool = False) -> dict:
+def detect_format(file: str) -> str:
+    """
+    Detects the format of a backup from its first bytes.
+
+    Args:
+        file (str): The name of the backup.
+
+    Returns:
+        str: The format of the backup. { "json", "columnar" }
+    """
+    with open_stream(file) as f:
+        return "columnar" if f.read(len(columnar.MAGIC)) == columnar.MAGIC else "json"
+
+def open_stream(file: str) -> BinaryIO:
+    """
+    Opens a backup for reading, decompressing it if it was written compressed.
+
+    Args:
+        file (str): The name of the backup.
+
+    Returns:
+        BinaryIO: The binary stream.
+    """
+    if compression.is_compressed(file):
+        return io.BufferedReader(compression.FrameReader(file))
+
+    return open(file, "rb")
+
+def interning(strings: dict[str, str]) -> dict[str, str]:
+    """
+    Bounds a table of interned strings, starting it over once it holds too many,
+    so unique strings such as descriptions do not pile up while streaming.
+
+    Args:
+        strings (dict[str, str]): The strings decoded so far.
+
+    Returns:
+        dict[str, str]: The table.
+    """
+    if len(strings) > INTERN_LIMIT:
+        strings.clear()
+
+    return strings
+
+def parse_lines(lines: list[bytes], strings: dict[str, str] = None) -> list[dict]:
+    """
+    Parses a batch of json lines with a single call, so the records share their keys.
+    Json lines never hold raw newlines, so the batch parses as an array.
+    If it does not, the lines are parsed one at a time to raise on the bad one.
+
+    Args:
+        lines (list[bytes]): The lines.
+        strings (dict[str, str]): The strings decoded so far, to intern string values with.
+
+    Returns:
+        list[dict]: The records.
+    """
+    try:
+        records = json.loads(b"[" + b",".join(lines) + b"]")
+    except ValueError:
+        records = None
+
+    if records is None or len(records) != len(lines):
+        records = [json.loads(line) for line in lines]
+
+    if strings is not None and records and type(records[0]) is dict:
+        intern = interning(strings).setdefault
+
+        # Records of a backup share their fields, so the string fields are taken from the first.
+        for key in [key for key, value in records[0].items() if type(value) is str]:
+            for record in records:
+                if type(value := record.get(key)) is str:
+                    record[key] = intern(value, value)
+
+    return records
+
+def _check_json(file: str, head: bytes) -> None:
+    """
+    Refuses to parse a columnar backup as json lines, which would fail deep in the parser.
+
+    Args:
+        file (str): The name of the backup.
+        head (bytes): The first bytes of the backup, decompressed.
+
+    Raises:
+        ValueError: If the backup is columnar.
+    """
+    if head.startswith(columnar.MAGIC):
+        raise ValueError(f'{file} is a columnar backup, read it as columnar (-f columnar)')
+
+def load(file: str, binary_mode: bool = False, file_format: str = "json") -> dict:
     """
     Loads the file.
+    Compressed files are recognised from their header and decompressed while streaming.
+    Repeated strings, such as model names and actions, are shared between the records.
 
     Args:
         file (str): The name of the file to load.
-        binary (bool): Whether to open the file in binary mode.
+        binary (bool): Whether the file was written in binary mode. Both modes hold UTF-8 lines.
+        file_format (str): The format of the file. { "json", "columnar" }
+
+    Raises:
+        ValueError: If a columnar file is loaded as json.
 
     Returns:
         dict: The data loaded from the file.
     """
-    mode = "rb" if binary_mode else "r"
+    strings: dict[str, str] = dict()
 
-    with open(file, mode) as f:
-        for line in f:
-            if binary_mode:
-                line = line.decode("utf-8")
-            yield json.loads(line)
+    with open_stream(file) as f:
+        if file_format == "columnar":
+            columnar.read_header(f)
+
+            for kind, count, payload in columnar.read_blocks(f):
+                yield from columnar.decode_block(kind, count, payload, interning(strings))
+            return
+
+        _check_json(file, f.peek(len(columnar.MAGIC)))
+
+        while lines := list(islice(f, DEFAULT_PARSE_BATCH)):
+            yield from parse_lines(lines, strings)
+
+
+def frame_records(raw: bytes, file_format: str, strings: dict[str, str] = None) -> Generator[dict, None, None]:
+    """
+    Parses the records of a single decompressed frame.
+
+    Args:
+        raw (bytes): The frame, holding whole records.
+        file_format (str): The format of the file. { "json", "columnar" }
+        strings (dict[str, str]): The strings decoded so far, to intern strings with.
+
+    Yields:
+        dict: The records.
+    """
+    if file_format == "columnar":
+        stream = io.BytesIO(raw)
+
+        if raw.startswith(columnar.MAGIC):
+            columnar.read_header(stream)
+
+        for kind, count, payload in columnar.read_blocks(stream):
+            yield from columnar.decode_block(
+                kind,
+                count,
+                payload,
+                None if strings is None else interning(strings)
+            )
+        return
+
+    yield from parse_lines(raw.splitlines(), strings)
+
+def load_from(
+    file: str,
+    file_format: str = "json",
+    position: Position = None
+) -> Generator[tuple[Position, dict], None, None]:
+    """
+    Loads the file along with the position of every record, optionally
+    starting at a position taken from an earlier pass.
+    A position is the offset of the record's line, columnar block or
+    compressed frame, and the number of records before it from there.
+
+    Args:
+        file (str): The name of the file to load.
+        file_format (str): The format of the file. { "json", "columnar" }
+        position (Position): The position to start at. Defaults to the first record.
+
+    Raises:
+        ValueError: If a columnar file is loaded as json.
+
+    Yields:
+        tuple[Position, dict]: The position of every record and the record.
+    """
+    offset, skip = position or (None, 0)
+    strings: dict[str, str] = dict()
+
+    if compression.is_compressed(file):
+        checked = file_format == "columnar" or offset is not None
+
+        with compression.FrameReader(file, offset) as reader:
+            for frame_offset, raw in reader.frames():
+                if not checked:
+                    _check_json(file, raw)
+                    checked = True
+
+                for index, record in enumerate(frame_records(raw, file_format, strings)):
+                    if index >= skip:
+                        yield (frame_offset, index), record
+                skip = 0
+        return
+
+    with open(file, "rb") as f:
+        if offset is None:
+            if file_format == "columnar":
+                columnar.read_header(f)
+            else:
+                _check_json(file, f.peek(len(columnar.MAGIC)))
+            offset = f.tell()
+
+        f.seek(offset)
+
+        if file_format == "columnar":
+            blocks = columnar.read_blocks(f)
+
+            # Blocks are read lazily, so the offset before each read is the block's.
+            while (block := next(blocks, None)) is not None:
+                for index, record in enumerate(columnar.decode_block(*block, interning(strings))):
+                    if index >= skip:
+                        yield (offset, index), record
+                offset, skip = f.tell(), 0
+            return
+
+        while lines := list(islice(f, DEFAULT_PARSE_BATCH)):
+            for line, record in zip(lines, parse_lines(lines, strings)):
+                if skip:
+                    skip -= 1
+                else:
+                    yield (offset, 0), record
+                offset += len(line)
+
+
+class IndexedReader:
+    def __init__(self, file: str, index: Index = None):
+        """
+        Initializes a random access reader over a memory mapped backup.
+        Only the records asked for are parsed.
+
+        Args:
+            file (str): The name of the backup.
+            index (Index): The index of the backup. Defaults to the backup's sidecar.
+
+        Raises:
+            ValueError: If the backup has no index, or changed since it was indexed.
+        """
+        self._file = file
+        self.index = index or read_sidecar(file)
+
+        if self.index is None:
+            raise ValueError(f'{file} has no up to date index, reindex it first')
+
+        self._handle = None
+        self._map = None
+
+    def __enter__(self) -> "IndexedReader":
+        return self.open()
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self.index.records
+
+    def open(self) -> "IndexedReader":
+        """
+        Maps the backup into memory.
+
+        Returns:
+            IndexedReader: The current instance.
+        """
+        if self._map is None:
+            self._handle = open(self._file, "rb")
+            self._map = mmap.mmap(self._handle.fileno(), 0, access=mmap.ACCESS_READ)
+
+        return self
+
+    def close(self) -> None:
+        """
+        Unmaps and closes the backup.
+        """
+        if self._map is not None:
+            self._map.close()
+            self._handle.close()
+            self._map = self._handle = None
+
+    def _iter_from(self, offset: int, skip: int = 0) -> Generator[dict, None, None]:
+        """
+        Parses records sequentially, starting at a position.
+
+        Args:
+            offset (int): The byte offset of a line or block.
+            skip (int): The number of records to skip from there.
+
+        Yields:
+            dict: The records.
+        """
+        self.open()
+
+        if self.index.file_format == "columnar":
+            self._map.seek(offset)
+
+            for kind, count, payload in columnar.read_blocks(self._map):
+                if skip >= count:
+                    skip -= count
+                    continue
+
+                yield from columnar.decode_block(kind, count, payload)[skip:]
+                skip = 0
+            return
+
+        size = len(self._map)
+        while offset < size:
+            end = self._map.find(b"\n", offset)
+            end = size if end == -1 else end
+
+            if skip:
+                skip -= 1
+            else:
+                yield json.loads(self._map[offset:end])
+            offset = end + 1
+
+    def records(self, start: int = 0, stop: int = None) -> Generator[dict, None, None]:
+        """
+        Reads a range of records, seeking straight to the first one.
+
+        Args:
+            start (int): The number of the first record.
+            stop (int): The number of the record to stop before. Defaults to the end.
+
+        Yields:
+            dict: The records.
+        """
+        stop = len(self) if stop is None else min(stop, len(self))
+
+        if start >= stop:
+            return
+
+        (offset, skip), remaining = self.index.position_of(start)
+
+        yield from islice(self._iter_from(offset, skip + remaining), stop - start)
+
+    def cells(self, cells: Iterable[Cell]) -> Generator[dict, None, None]:
+        """
+        Reads the records of a set of cells, in file order.
+
+        Args:
+            cells (Iterable[Cell]): The cells, as (x, z) pairs.
+
+        Yields:
+            dict: The records.
+        """
+        for offset, skip, count in self.index.spans(cells):
+            yield from islice(self._iter_from(offset, skip), count)
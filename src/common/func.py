@@ -18,7 +18,26 @@
 # LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
 # OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
 # WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
-from typing import Callable, Generator, Iterable, Tuple
+import logging
+from collections import deque
+from concurrent.futures import Executor
+from typing import Any, Callable, Generator, Iterable, Tuple
+
+
+class OrderedErrors(Exception):
+    def __init__(self, errors: list[Tuple[int, Exception]]):
+        """
+        Raised when one or more concurrently executed callbacks failed.
+
+        Args:
+            errors (list[Tuple[int, Exception]]): The failures, ordered by item index.
+        """
+        self.errors = sorted(errors, key=lambda error: error[0])
+        index, first = self.errors[0]
+
+        super().__init__(
+            f"{len(self.errors)} item(s) failed, first at index {index}: {first}"
+        )
 
 
 def on_each(iterable: Iterable[Tuple], callback: Callable, ignore_exceptions: bool = False) -> None:
@@ -37,6 +56,70 @@ def on_each(iterable: Iterable[Tuple], callback: Callable, ignore_exceptions: bo
             if not ignore_exceptions:
                 raise e
 
+def on_each_concurrently(
+    iterable: Iterable[Tuple],
+    callback: Callable,
+    executor: Executor,
+    max_pending: int | Callable[[], int] = 16,
+    ignore_exceptions: bool = False,
+    on_settled: Callable[[int, Exception, Any], None] = None
+) -> int:
+    """
+    Passes every item of an iterable to a callback running on an executor.
+    At most max_pending items are in flight; the iterable is only advanced
+    when a slot frees up, so lazily produced items are never read ahead
+    further than that. Failures are collected and reported in item order.
+    The limit may be a function, read before every submission, so it can adapt
+    to how the callbacks fare.
+
+    Args:
+        iterable (Iterable[Tuple]): A list of parameter for the callback.
+        callback (Callable): The callback to call for each parameter.
+        executor (Executor): The executor to submit the callbacks to.
+        max_pending (int | Callable[[], int]): The maximum number of in flight callbacks.
+        ignore_exceptions (bool): Whether to keep going after a failure.
+        on_settled (Callable[[int, Exception, Any], None]): Called with the index, the
+            failure, if any, and the result of every item once it finished, in item order.
+
+    Raises:
+        OrderedErrors: If a callback failed and exceptions are not ignored.
+
+    Returns:
+        int: The number of items that were submitted.
+    """
+    errors: list[Tuple[int, Exception]] = list()
+    pending: deque = deque()
+    submitted = 0
+    limit = max_pending if callable(max_pending) else lambda: max_pending
+
+    def _settle() -> None:
+        index, future = pending.popleft()
+
+        if (exception := future.exception()) is not None:
+            logging.error(f"Item {index} failed: {exception}")
+            errors.append((index, exception))
+
+        if on_settled:
+            on_settled(index, exception, None if exception is not None else future.result())
+
+    for index, each in enumerate(iterable):
+        if errors and not ignore_exceptions:
+            break
+
+        while pending and len(pending) >= max(1, limit()):
+            _settle()
+
+        pending.append((index, executor.submit(callback, each)))
+        submitted += 1
+
+    while pending:
+        _settle()
+
+    if errors and not ignore_exceptions:
+        raise OrderedErrors(errors)
+
+    return submitted
+
 def and_do(funcs: Iterable[Callable], *args: Tuple, **kwargs: Tuple) -> None:
     """
     Creates a function that calls all the functions in the iterable.
@@ -0,0 +1,258 @@
+# Copyright (c) 2022 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import json
+import logging
+import os
+from dataclasses import dataclass, field
+from typing import Any, Iterable
+
+VERSION = 1
+SUFFIX = '.idx'
+CELL_SIZE = 1000
+DEFAULT_STRIDE = 1024
+
+Cell = tuple[int, int]
+Position = tuple[int, int]
+
+
+def cell_of(x: int, z: int) -> Cell:
+    """
+    Gets the cell a coordinate lies in.
+
+    Args:
+        x (int): The x coordinate.
+        z (int): The z coordinate.
+
+    Returns:
+        Cell: The cell's x and z.
+    """
+    return x // CELL_SIZE, z // CELL_SIZE
+
+def coordinates_of(record: Any) -> tuple[int, int]:
+    """
+    Gets the x and z coordinates of a record.
+
+    Args:
+        record (Any): A data class instance or mapping.
+
+    Returns:
+        tuple[int, int]: The coordinates, or None for records without any.
+    """
+    if isinstance(record, dict):
+        return record.get('x'), record.get('z')
+
+    return getattr(record, 'x', None), getattr(record, 'z', None)
+
+def _grow(bounds: list, x: int, z: int) -> list:
+    # Bounds are grown in place, as this runs for every record written.
+    if bounds is None:
+        return [x, z, x, z]
+
+    if x < bounds[0]:
+        bounds[0] = x
+    elif x > bounds[2]:
+        bounds[2] = x
+
+    if z < bounds[1]:
+        bounds[1] = z
+    elif z > bounds[3]:
+        bounds[3] = z
+
+    return bounds
+
+
+@dataclass
+class Index:
+    """
+    Locates records inside a backup without reading the backup.
+    Positions are (offset, skip) pairs: the byte offset of a line, or of a
+    block, and the number of records to skip from there.
+
+    Attributes:
+        file_format (str): The format of the indexed backup.
+        records (int): The number of records in the backup.
+        stride (int): The number of records between two offsets.
+        offsets (list[Position]): The position of every stride-th record.
+        cells (dict[Cell, list]): Runs of consecutive records per cell, as [offset, skip, count].
+        bounds (list[int]): The bounding box of all records, as [min_x, min_z, max_x, max_z].
+        stride_bounds (list[list[int]]): The bounding box of every stride of records.
+        size (int): The size of the backup when it was indexed, to tell it was not changed since.
+    """
+    file_format: str = 'json'
+    records: int = 0
+    stride: int = DEFAULT_STRIDE
+    offsets: list[Position] = field(default_factory=list)
+    cells: dict[Cell, list] = field(default_factory=dict)
+    bounds: list[int] = None
+    stride_bounds: list[list[int]] = field(default_factory=list)
+    size: int = None
+
+    def position_of(self, record: int) -> tuple[Position, int]:
+        """
+        Finds the closest indexed position at or before a record.
+
+        Args:
+            record (int): The record number.
+
+        Returns:
+            tuple[Position, int]: The position and the records left to skip after it.
+        """
+        stride = record // self.stride
+
+        return tuple(self.offsets[stride]), record - stride * self.stride
+
+    def spans(self, cells: Iterable[Cell]) -> list[tuple[int, int, int]]:
+        """
+        Gets the runs of records of a set of cells, in file order.
+
+        Args:
+            cells (Iterable[Cell]): The cells.
+
+        Returns:
+            list[tuple[int, int, int]]: The offset, skip and count of every run.
+        """
+        return sorted(
+            tuple(span)
+            for cell in set(cells)
+            for span in self.cells.get(tuple(cell), ())
+        )
+
+    def write(self, file: str) -> None:
+        """
+        Writes the index as json.
+
+        Args:
+            file (str): The name of the index file.
+        """
+        with open(file, 'w', encoding='utf-8') as f:
+            json.dump({
+                'version': VERSION,
+                'file_format': self.file_format,
+                'records': self.records,
+                'stride': self.stride,
+                'offsets': self.offsets,
+                'cells': [[*cell, spans] for cell, spans in self.cells.items()],
+                'bounds': self.bounds,
+                'stride_bounds': self.stride_bounds,
+                'size': self.size,
+            }, f, separators=(',', ':'))
+
+    def write_sidecar(self, backup: str) -> None:
+        """
+        Writes the index next to its backup, along with the backup's size.
+
+        Args:
+            backup (str): The name of the indexed backup.
+        """
+        self.size = os.path.getsize(backup)
+        self.write(backup + SUFFIX)
+
+    @staticmethod
+    def read(file: str) -> "Index":
+        """
+        Reads an index written by Index.write.
+
+        Args:
+            file (str): The name of the index file.
+
+        Raises:
+            ValueError: If the index was written by a newer version.
+
+        Returns:
+            Index: The index.
+        """
+        with open(file, encoding='utf-8') as f:
+            data = json.load(f)
+
+        if data.pop('version') > VERSION:
+            raise ValueError(f"Index {file} is newer than version {VERSION}.")
+
+        data['cells'] = {(x, z): spans for x, z, spans in data['cells']}
+
+        return Index(**data)
+
+
+def read_sidecar(backup: str) -> Index | None:
+    """
+    Reads the index next to a backup, if the backup was not changed since it was indexed.
+    A backup appended to after being indexed holds records its index does not know of,
+    so a warning is logged and the backup should be read in full instead.
+
+    Args:
+        backup (str): The name of the backup.
+
+    Returns:
+        Index | None: The index, or None if there is none or it is out of date.
+    """
+    if not os.path.exists(backup + SUFFIX):
+        return None
+
+    index = Index.read(backup + SUFFIX)
+
+    if index.size != os.path.getsize(backup):
+        logging.warning(f'{backup} changed since it was indexed, ignoring its index until it is reindexed')
+        return None
+
+    return index
+
+
+class IndexBuilder:
+    def __init__(self, file_format: str = 'json', stride: int = DEFAULT_STRIDE):
+        """
+        Initializes an index builder fed with every record as it is written.
+
+        Args:
+            file_format (str): The format of the backup being written.
+            stride (int): The number of records between two offsets.
+        """
+        self.index = Index(file_format=file_format, stride=stride)
+        self._last_cell: Cell = None
+
+    def add(self, position: Position, record: Any) -> None:
+        """
+        Adds the next record of the backup.
+
+        Args:
+            position (Position): The position the writer stored the record at.
+            record (Any): The record.
+        """
+        index = self.index
+
+        if index.records % index.stride == 0:
+            index.offsets.append(list(position))
+            index.stride_bounds.append(None)
+
+        index.records += 1
+        x, z = coordinates_of(record)
+
+        if x is None or z is None:
+            self._last_cell = None
+            return
+
+        cell = cell_of(x, z)
+        if cell == self._last_cell:
+            index.cells[cell][-1][2] += 1
+        else:
+            index.cells.setdefault(cell, []).append([*position, 1])
+            self._last_cell = cell
+
+        index.bounds = _grow(index.bounds, x, z)
+        index.stride_bounds[-1] = _grow(index.stride_bounds[-1], x, z)
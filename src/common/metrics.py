@@ -0,0 +1,241 @@
+# Copyright (c) 2022 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import json
+import os
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any, Generator
+
+PROMETHEUS_PREFIX = 'world_management'
+
+
+@dataclass
+class Metrics:
+    name: str = None
+    wall_time: float = 0.0
+    cpu_time: float = 0.0
+    records: int = 0
+    bytes: int = 0
+    failures: int = 0
+    error: str = None
+    children: list["Metrics"] = field(default_factory=list)
+
+    @property
+    def rate(self) -> float:
+        """
+        Gets the records per second of wall time.
+
+        Returns:
+            float: The records per second.
+        """
+        return self.records / self.wall_time if self.wall_time else 0.0
+
+    @contextmanager
+    def measure(self) -> Generator["Metrics", None, None]:
+        """
+        Measures the wall and CPU time of a block, and the error that ended it.
+        CPU time is that of the current process; worker processes report their own.
+
+        Yields:
+            Metrics: The current instance.
+        """
+        wall, cpu = time.perf_counter(), time.process_time()
+
+        try:
+            yield self
+        except BaseException as e:
+            self.error = f'{type(e).__name__}: {e}'
+            raise
+        finally:
+            self.wall_time += time.perf_counter() - wall
+            self.cpu_time += time.process_time() - cpu
+
+    def collect(self, command: Any) -> "Metrics":
+        """
+        Adds the counters a command kept in its own metrics, if it has any.
+
+        Args:
+            command (Any): The command.
+
+        Returns:
+            Metrics: The current instance.
+        """
+        source = getattr(command, 'metrics', None)
+
+        if isinstance(source, Metrics):
+            self.name = self.name or source.name
+            self.records += source.records
+            self.bytes += source.bytes
+            self.failures += source.failures
+            self.children.extend(source.children)
+
+        return self
+
+    def walk(self, parent: str = None) -> Generator[tuple[str, "Metrics"], None, None]:
+        """
+        Iterates over these metrics and those of every nested command.
+
+        Args:
+            parent (str): The name of the parent command.
+
+        Yields:
+            tuple[str, Metrics]: The name of the parent, if any, and the metrics.
+        """
+        yield parent, self
+
+        for child in self.children:
+            yield from child.walk(self.name)
+
+    def as_dict(self) -> dict:
+        """
+        Converts the metrics, with their throughput, to a dictionary.
+
+        Returns:
+            dict: The metrics.
+        """
+        data = asdict(self)
+        data['rate'] = self.rate
+        data['children'] = [child.as_dict() for child in self.children]
+
+        return data
+
+
+def execute_measured(command: Any, name: str = None) -> tuple[Metrics, Exception | None]:
+    """
+    Executes a command, measuring it and collecting its own counters.
+    Failures are returned rather than raised, so their metrics are never lost.
+
+    Args:
+        command (Any): The command.
+        name (str): The name to report. Defaults to the name the command gives itself.
+
+    Returns:
+        tuple[Metrics, Exception | None]: The metrics and the failure, if any.
+    """
+    own = getattr(command, 'metrics', None)
+    metrics = Metrics(name or getattr(own, 'name', None) or type(command).__name__)
+    error = None
+
+    try:
+        with metrics.measure():
+            command.execute()
+    except Exception as e:
+        error = e
+
+    return metrics.collect(command), error
+
+def _replace(file: str, data: str) -> None:
+    """
+    Writes a file at once, so readers never see it half written.
+
+    Args:
+        file (str): The name of the file.
+        data (str): The contents.
+    """
+    with open(file + '.tmp', 'w', encoding='utf-8') as f:
+        f.write(data)
+
+    os.replace(file + '.tmp', file)
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class JsonReport:
+    def __init__(self, file: str):
+        """
+        Initializes a sink writing every invocation of a run to a JSON report.
+
+        Args:
+            file (str): The name of the report.
+        """
+        self._file = file
+        self._started = time.time()
+
+    def write(self, metrics: list[Metrics]) -> None:
+        """
+        Rewrites the report with the metrics of every invocation so far.
+
+        Args:
+            metrics (list[Metrics]): The metrics.
+        """
+        _replace(self._file, json.dumps({
+            'started': self._started,
+            'updated': time.time(),
+            'commands': [each.as_dict() for each in metrics],
+        }, indent=2))
+
+
+class PrometheusTextfile:
+    _GAUGES = (
+        ('wall_seconds', 'wall_time', 'Wall clock time of the command.'),
+        ('cpu_seconds', 'cpu_time', 'CPU time of the command in the process that ran it.'),
+        ('records', 'records', 'Records the command processed.'),
+        ('bytes', 'bytes', 'Bytes the command read or wrote.'),
+        ('failures', 'failures', 'Records or parts of the command that failed.'),
+        ('records_per_second', 'rate', 'Records processed per second of wall time.'),
+    )
+
+    def __init__(self, file: str, prefix: str = PROMETHEUS_PREFIX):
+        """
+        Initializes a sink writing a textfile for the node exporter's textfile collector.
+
+        Args:
+            file (str): The name of the textfile, ending in .prom.
+            prefix (str): The prefix of every metric name.
+        """
+        self._file = file
+        self._prefix = prefix
+
+    @staticmethod
+    def _labels(parent: str, metrics: Metrics) -> str:
+        labels = {'command': metrics.name or ''}
+
+        if parent:
+            labels['parent'] = parent
+
+        return ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items())
+
+    def write(self, metrics: list[Metrics]) -> None:
+        """
+        Rewrites the textfile with the latest invocation of every command.
+
+        Args:
+            metrics (list[Metrics]): The metrics.
+        """
+        latest = {each.name: each for each in metrics}
+        series = [pair for each in latest.values() for pair in each.walk()]
+        lines = list()
+
+        for name, attribute, description in self._GAUGES:
+            lines.append(f'# HELP {self._prefix}_{name} {description}')
+            lines.append(f'# TYPE {self._prefix}_{name} gauge')
+
+            for parent, each in series:
+                lines.append(f'{self._prefix}_{name}{{{self._labels(parent, each)}}} {getattr(each, attribute)}')
+
+        lines.append(f'# HELP {self._prefix}_success Whether the command finished without an error.')
+        lines.append(f'# TYPE {self._prefix}_success gauge')
+        for parent, each in series:
+            lines.append(f'{self._prefix}_success{{{self._labels(parent, each)}}} {int(each.error is None)}')
+
+        _replace(self._file, '\n'.join(lines) + '\n')
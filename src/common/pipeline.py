@@ -0,0 +1,345 @@
+# Copyright (c) 2022 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable
+
+DEFAULT_BATCH_SIZE = 256
+DEFAULT_MAX_PENDING = 16
+
+_DONE = object()
+
+
+@dataclass
+class StageStats:
+    name: str
+    items: int = 0
+    busy: float = 0.0
+    blocked: float = 0.0
+    failures: int = 0
+
+    @property
+    def rate(self) -> float:
+        """
+        Gets the items per second the stage handles while busy.
+        The slowest stage bounds the pipeline.
+
+        Returns:
+            float: The items per second.
+        """
+        return self.items / self.busy if self.busy else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f'{self.name}: {self.items} items, {self.rate:,.0f}/s busy, '
+            f'{self.busy:.2f}s busy, {self.blocked:.2f}s blocked, {self.failures} failed'
+        )
+
+
+class _Stopped(Exception):
+    pass
+
+
+def _put(target: queue.Queue, item: Any, stop: threading.Event, stats: StageStats) -> None:
+    """
+    Puts an item on a bounded queue, waiting for room unless the pipeline stopped.
+
+    Args:
+        target (queue.Queue): The queue.
+        item (Any): The item.
+        stop (threading.Event): Set once the pipeline stopped.
+        stats (StageStats): The statistics of the waiting stage.
+
+    Raises:
+        _Stopped: If the pipeline stopped while waiting.
+    """
+    start = time.perf_counter()
+
+    while True:
+        if stop.is_set():
+            raise _Stopped()
+
+        try:
+            target.put(item, timeout=0.1)
+            break
+        except queue.Full:
+            continue
+
+    stats.blocked += time.perf_counter() - start
+
+def _get(source: queue.Queue, stop: threading.Event, stats: StageStats) -> Any:
+    """
+    Gets an item from a queue, waiting for one unless the pipeline stopped.
+
+    Args:
+        source (queue.Queue): The queue.
+        stop (threading.Event): Set once the pipeline stopped.
+        stats (StageStats): The statistics of the waiting stage.
+
+    Raises:
+        _Stopped: If the pipeline stopped while waiting.
+
+    Returns:
+        Any: The item.
+    """
+    start = time.perf_counter()
+
+    while True:
+        if stop.is_set():
+            raise _Stopped()
+
+        try:
+            item = source.get(timeout=0.1)
+            break
+        except queue.Empty:
+            continue
+
+    stats.blocked += time.perf_counter() - start
+
+    return item
+
+
+def _transform_batch(
+    transform: Callable,
+    batch: list,
+    batched: bool,
+    ignore_exceptions: bool,
+    stats: StageStats
+) -> list[tuple[Any, Any]]:
+    """
+    Transforms a batch, pairing every item with its value.
+    When a batched transform fails and exceptions are ignored, the batch
+    is transformed again one item at a time to only skip the failing items.
+
+    Args:
+        transform (Callable): The transform, of an item or of a list of them.
+        batch (list): The items.
+        batched (bool): Whether the transform takes a list of items.
+        ignore_exceptions (bool): Whether to skip the items the transform fails on.
+        stats (StageStats): The statistics of the stage.
+
+    Returns:
+        list[tuple[Any, Any]]: The items and their values.
+    """
+    single = transform
+
+    if batched:
+        try:
+            return list(zip(batch, transform(batch)))
+        except Exception as e:
+            if not ignore_exceptions:
+                raise e
+            single = lambda each: transform([each])[0]
+
+    results = list()
+
+    for each in batch:
+        try:
+            results.append((each, single(each)))
+        except Exception as e:
+            if not ignore_exceptions:
+                raise e
+            stats.failures += 1
+            logging.warning(f'Skipping {each}: {e}')
+
+    return results
+
+def _sink_batch(
+    sink: Callable,
+    results: list[tuple[Any, Any]],
+    batched: bool,
+    ignore_exceptions: bool,
+    stats: StageStats
+) -> None:
+    """
+    Passes the items of a batch and their values to the sink.
+    When a batched sink fails and exceptions are ignored, the batch
+    is sunk again one item at a time to only skip the failing items.
+
+    Args:
+        sink (Callable): The sink, of an item and its value or of lists of them.
+        results (list[tuple[Any, Any]]): The items and their values.
+        batched (bool): Whether the sink takes lists of items and values.
+        ignore_exceptions (bool): Whether to skip the items the sink fails on.
+        stats (StageStats): The statistics of the stage.
+    """
+    single = sink
+
+    if batched:
+        try:
+            sink([each for each, _ in results], [value for _, value in results])
+            stats.items += len(results)
+            return
+        except Exception as e:
+            if not ignore_exceptions:
+                raise e
+            single = lambda each, value: sink([each], [value])
+
+    for each, value in results:
+        try:
+            single(each, value)
+            stats.items += 1
+        except Exception as e:
+            if not ignore_exceptions:
+                raise e
+            stats.failures += 1
+            logging.warning(f'Skipping {each}: {e}')
+
+
+def pipeline(
+    iterable: Iterable,
+    transform: Callable[[Any], Any],
+    sink: Callable[[Any, Any], None],
+    workers: int = 1,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    max_pending: int = DEFAULT_MAX_PENDING,
+    ignore_exceptions: bool = False,
+    names: tuple[str, str, str] = ('produce', 'transform', 'sink'),
+    batched: bool = False
+) -> list[StageStats]:
+    """
+    Passes every item of an iterable through a transform and into a sink,
+    with each stage on its own thread(s) so slow producers, such as network
+    queries, overlap with the transform and the sink.
+    Stages are joined by queues holding at most max_pending batches, so a
+    slow stage holds back the ones before it instead of buffering everything.
+    The sink runs on the calling thread and sees the items in their original order.
+
+    Args:
+        iterable (Iterable): The items, read on the producer thread.
+        transform (Callable[[Any], Any]): Transforms an item, on a worker thread.
+        sink (Callable[[Any, Any], None]): Receives every item with its transformed value.
+        workers (int): The number of transform threads.
+        batch_size (int): The number of items handed between stages at once.
+        max_pending (int): The number of batches queued between two stages.
+        ignore_exceptions (bool): Whether to skip the items a transform or sink fails on.
+        names (tuple[str, str, str]): The names of the stages, for reporting.
+        batched (bool): Whether the transform maps a list of items to a list of values
+            and the sink receives the lists of items and values, a batch at a time.
+
+    Returns:
+        list[StageStats]: The statistics of every stage.
+    """
+    produced: queue.Queue = queue.Queue(max_pending)
+    transformed: queue.Queue = queue.Queue(max_pending)
+    stop = threading.Event()
+    errors: list[BaseException] = list()
+    producer_stats = StageStats(names[0])
+    worker_stats = [StageStats(names[1]) for _ in range(workers)]
+    sink_stats = StageStats(names[2])
+
+    def _produce() -> None:
+        iterator = iter(iterable)
+        sequence = 0
+
+        try:
+            while True:
+                start = time.perf_counter()
+                batch = [each for _, each in zip(range(batch_size), iterator)]
+                producer_stats.busy += time.perf_counter() - start
+
+                if not batch:
+                    break
+
+                producer_stats.items += len(batch)
+                _put(produced, (sequence, batch), stop, producer_stats)
+                sequence += 1
+        except _Stopped:
+            return
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            for _ in range(workers):
+                try:
+                    _put(produced, _DONE, stop, producer_stats)
+                except _Stopped:
+                    break
+
+    def _transform(stats: StageStats) -> None:
+        try:
+            while (item := _get(produced, stop, stats)) is not _DONE:
+                sequence, batch = item
+                start = time.perf_counter()
+                results = _transform_batch(transform, batch, batched, ignore_exceptions, stats)
+                stats.items += len(batch)
+                stats.busy += time.perf_counter() - start
+                _put(transformed, (sequence, results), stop, stats)
+        except _Stopped:
+            return
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            try:
+                _put(transformed, _DONE, stop, stats)
+            except _Stopped:
+                pass
+
+    threads = [threading.Thread(target=_produce, name=names[0], daemon=True)]
+    threads += [
+        threading.Thread(target=_transform, args=(stats,), name=names[1], daemon=True)
+        for stats in worker_stats
+    ]
+
+    for thread in threads:
+        thread.start()
+
+    # Workers finish batches out of order, they are held back until their turn.
+    waiting: dict[int, list] = dict()
+    expected = 0
+    remaining = workers
+
+    try:
+        while remaining:
+            item = _get(transformed, stop, sink_stats)
+
+            if item is _DONE:
+                remaining -= 1
+                continue
+
+            waiting[item[0]] = item[1]
+
+            while expected in waiting:
+                start = time.perf_counter()
+                _sink_batch(sink, waiting.pop(expected), batched, ignore_exceptions, sink_stats)
+                sink_stats.busy += time.perf_counter() - start
+                expected += 1
+    except _Stopped:
+        pass
+    finally:
+        # Releases the stages still waiting on a queue after a failure.
+        stop.set()
+
+        for thread in threads:
+            thread.join()
+
+    if errors:
+        raise errors[0]
+
+    stats = [producer_stats, *worker_stats, sink_stats]
+    for each in stats:
+        logging.info(str(each))
+
+    return stats
@@ -0,0 +1,268 @@
+# Copyright (c) 2022 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import cProfile
+import io
+import linecache
+import logging
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from typing import Generator
+
+DEFAULT_INTERVAL = 0.01
+DEFAULT_LIMIT = 50
+
+
+class Profiler:
+    def __init__(self, file: str, limit: int = DEFAULT_LIMIT):
+        """
+        Initializes a deterministic profiler using cProfile, of the current thread
+        and of every thread started while profiling, such as the stages of a pipeline.
+        Every Python call is counted, which costs a few percent on commands
+        waiting on the network and more on CPU bound ones.
+
+        Args:
+            file (str): The report to write. The raw statistics go next to it, in .prof.
+            limit (int): The number of functions to report.
+        """
+        self._file = file
+        self._limit = limit
+        self._profile = cProfile.Profile()
+        self._threads: list[cProfile.Profile] = list()
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> "Profiler":
+        threading.setprofile(self._profile_thread)
+        self._profile.enable()
+
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        threading.setprofile(None)
+        self._profile.disable()
+        self.write()
+
+    def _profile_thread(self, frame, event, arg) -> None:
+        # Called on the first event of every new thread, which then gets a profile of its own.
+        sys.setprofile(None)
+        profile = cProfile.Profile()
+
+        try:
+            profile.enable()
+        except ValueError:
+            # Interpreters profiling through sys.monitoring see every thread from the first profile.
+            return
+
+        with self._lock:
+            self._threads.append(profile)
+
+    def write(self) -> None:
+        """
+        Writes the hotspots of every profiled thread merged together,
+        sorted by their own and by their cumulative time.
+        """
+        report = io.StringIO()
+        stats = pstats.Stats(self._profile, stream=report)
+
+        with self._lock:
+            for profile in self._threads:
+                stats.add(profile)
+
+        stats.dump_stats(self._file + '.prof')
+
+        for key in ('tottime', 'cumulative'):
+            report.write(f'Sorted by {key}\n')
+            stats.sort_stats(key).print_stats(self._limit)
+
+        with open(self._file, 'w', encoding='utf-8') as f:
+            f.write(report.getvalue())
+
+        logging.info(f'Wrote the profile to {self._file}')
+
+
+class SamplingProfiler:
+    def __init__(self, file: str, interval: float = DEFAULT_INTERVAL, limit: int = DEFAULT_LIMIT):
+        """
+        Initializes a statistical profiler, sampling the stack of every thread
+        from a background thread. Its cost depends on the interval only, so it
+        can be left on for hours.
+
+        Args:
+            file (str): The report to write.
+            interval (float): The seconds between two samples.
+            limit (int): The number of functions to report.
+        """
+        self._file = file
+        self._interval = interval
+        self._limit = limit
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='sampler', daemon=True)
+        self.samples = 0
+        self.own: Counter = Counter()
+        self.cumulative: Counter = Counter()
+
+    def __enter__(self) -> "SamplingProfiler":
+        self._thread.start()
+
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.write()
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+
+        while not self._stop.wait(self._interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+
+                self.samples += 1
+                self.own[self._site(frame)] += 1
+                seen = set()
+
+                while frame is not None:
+                    if (site := self._site(frame)) not in seen:
+                        seen.add(site)
+                        self.cumulative[site] += 1
+                    frame = frame.f_back
+
+    @staticmethod
+    def _site(frame) -> tuple[str, int, str]:
+        code = frame.f_code
+
+        return code.co_filename, code.co_firstlineno, code.co_name
+
+    def write(self) -> None:
+        """
+        Writes the functions seen most, by their own and by their cumulative samples.
+        """
+        lines = [f'{self.samples} samples every {self._interval}s']
+
+        for title, counter in (('own', self.own), ('cumulative', self.cumulative)):
+            lines.append(f'\nSorted by {title} samples')
+
+            for (file, line, name), count in counter.most_common(self._limit):
+                lines.append(f'{count:>10}{count / max(self.samples, 1):>8.1%}  {name} ({file}:{line})')
+
+        with open(self._file, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+
+        logging.info(f'Wrote the sampled profile to {self._file}')
+
+
+class MemoryTracer:
+    def __init__(self, file: str, frames: int = 1, limit: int = DEFAULT_LIMIT):
+        """
+        Initializes a tracer of memory allocations, using tracemalloc.
+        Keeping a single frame per allocation keeps the overhead low.
+
+        Args:
+            file (str): The report to write.
+            frames (int): The number of frames kept per allocation.
+            limit (int): The number of allocation sites to report.
+        """
+        self._file = file
+        self._frames = frames
+        self._limit = limit
+        self._started = None
+
+    def __enter__(self) -> "MemoryTracer":
+        tracemalloc.start(self._frames)
+        self._started = time.monotonic()
+
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        try:
+            self.write()
+        finally:
+            tracemalloc.stop()
+
+    def write(self) -> None:
+        """
+        Writes the peak traced memory and the allocation sites holding the most memory.
+        """
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        ))
+        lines = [
+            f'Traced for {time.monotonic() - self._started:.1f}s',
+            f'Current {current / 2 ** 20:.1f} MiB, peak {peak / 2 ** 20:.1f} MiB',
+            '',
+            f'Top {self._limit} allocation sites',
+        ]
+
+        key = 'traceback' if self._frames > 1 else 'lineno'
+        for stat in snapshot.statistics(key)[:self._limit]:
+            frame = stat.traceback[0]
+            lines.append(
+                f'{stat.size / 2 ** 10:>12,.1f} KiB{stat.count:>10} blocks  {frame.filename}:{frame.lineno}'
+            )
+            if source := linecache.getline(frame.filename, frame.lineno).strip():
+                lines.append(f'{"":>34}{source}')
+
+        with open(self._file, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+
+        logging.info(f'Wrote the allocation sites to {self._file}')
+
+
+@contextmanager
+def profiled(
+    profile: str = None,
+    trace_memory: str = None,
+    interval: float = None
+) -> Generator[None, None, None]:
+    """
+    Profiles a block, writing the reports once it ends, even when it fails.
+    Only the current process is profiled, worker processes are not.
+
+    Args:
+        profile (str): The file to write the hotspots to, if any.
+        trace_memory (str): The file to write the allocation sites to, if any.
+        interval (float): Samples the stacks at this interval instead of profiling every call.
+
+    Raises:
+        ValueError: If an interval is given without a profile to write.
+    """
+    if interval and not profile:
+        raise ValueError('Sampling requires a profile to write.')
+
+    with ExitStack() as stack:
+        if profile and interval:
+            stack.enter_context(SamplingProfiler(profile, interval))
+        elif profile:
+            stack.enter_context(Profiler(profile))
+
+        # Entered last so it stops first, and the profile reports are not traced.
+        if trace_memory:
+            stack.enter_context(MemoryTracer(trace_memory))
+
+        yield
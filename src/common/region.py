@@ -0,0 +1,158 @@
+# Copyright (c) 2022 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import argparse
+from dataclasses import dataclass
+from typing import Any, Generator, Iterable, Protocol
+
+from common.index import Cell, cell_of, coordinates_of
+
+
+class Region(Protocol):
+    def cells(self) -> Generator[Cell, None, None]:
+        """
+        Iterates over every cell of the region.
+        """
+        ...
+
+    def contains_cell(self, cell: Cell) -> bool:
+        """
+        Checks whether a cell is part of the region.
+
+        Args:
+            cell (Cell): The cell's x and z.
+        """
+        ...
+
+
+@dataclass(frozen=True)
+class Rectangle:
+    """
+    A rectangle of cells, bounds included.
+    """
+    x1: int
+    z1: int
+    x2: int
+    z2: int
+
+    def __post_init__(self):
+        x1, x2 = sorted((self.x1, self.x2))
+        z1, z2 = sorted((self.z1, self.z2))
+
+        object.__setattr__(self, 'x1', x1)
+        object.__setattr__(self, 'x2', x2)
+        object.__setattr__(self, 'z1', z1)
+        object.__setattr__(self, 'z2', z2)
+
+    def cells(self) -> Generator[Cell, None, None]:
+        for x in range(self.x1, self.x2 + 1):
+            for z in range(self.z1, self.z2 + 1):
+                yield x, z
+
+    def contains_cell(self, cell: Cell) -> bool:
+        return self.x1 <= cell[0] <= self.x2 and self.z1 <= cell[1] <= self.z2
+
+
+@dataclass(frozen=True)
+class Circle:
+    """
+    Every cell within a radius, in cells, of a center cell.
+    """
+    x: int
+    z: int
+    radius: int
+
+    def cells(self) -> Generator[Cell, None, None]:
+        for x in range(self.x - self.radius, self.x + self.radius + 1):
+            for z in range(self.z - self.radius, self.z + self.radius + 1):
+                if self.contains_cell((x, z)):
+                    yield x, z
+
+    def contains_cell(self, cell: Cell) -> bool:
+        return (cell[0] - self.x) ** 2 + (cell[1] - self.z) ** 2 <= self.radius ** 2
+
+
+def contains(region: Region, record: Any) -> bool:
+    """
+    Checks whether a record lies in a region.
+
+    Args:
+        region (Region): The region.
+        record (Any): A data class instance or mapping with x and z coordinates.
+
+    Returns:
+        bool: Whether the record's cell is part of the region.
+    """
+    x, z = coordinates_of(record)
+
+    return x is not None and z is not None and region.contains_cell(cell_of(x, z))
+
+def within(region: Region, cells: Iterable[Cell]) -> list[Cell]:
+    """
+    Filters cells down to the ones part of a region.
+
+    Args:
+        region (Region): The region.
+        cells (Iterable[Cell]): The cells to filter.
+
+    Returns:
+        list[Cell]: The cells inside the region.
+    """
+    return [cell for cell in cells if region.contains_cell(cell)]
+
+def _integers(text: str, count: int) -> list[int]:
+    try:
+        values = [int(each) for each in text.split(',')]
+    except ValueError:
+        values = []
+
+    if len(values) != count:
+        raise argparse.ArgumentTypeError(f"Expected {count} comma separated integers, got '{text}'")
+
+    return values
+
+def parse_rectangle(text: str) -> Rectangle:
+    """
+    Parses an x1,z1,x2,z2 rectangle of cells from the command line.
+
+    Args:
+        text (str): The argument.
+
+    Returns:
+        Rectangle: The region.
+    """
+    return Rectangle(*_integers(text, 4))
+
+def parse_circle(text: str) -> Circle:
+    """
+    Parses an x,z,r circle of cells from the command line.
+
+    Args:
+        text (str): The argument.
+
+    Returns:
+        Circle: The region.
+    """
+    x, z, radius = _integers(text, 3)
+
+    if radius < 0:
+        raise argparse.ArgumentTypeError("The radius can not be negative")
+
+    return Circle(x, z, radius)
@@ -0,0 +1,387 @@
+# Copyright (c) 2022 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from array import array
+from itertools import islice
+from typing import Any, Generator, Iterable, Sequence
+
+from common.columnar import INT_NULL, OBJECTS, STR_NULL
+from common.delta import Differ
+from common.file import detect_format, load
+from common.index import CELL_SIZE, Cell
+from common.region import Region
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+NUMBERS = OBJECTS.numbers
+STRINGS = OBJECTS.strings
+FIELDS = OBJECTS.fields
+DEFAULT_BATCH_SIZE = 4096
+
+_INT32 = 'i' if array('i').itemsize == 4 else 'l'
+_UINT32 = 'I' if array('I').itemsize == 4 else 'L'
+_UINT64 = 'Q'
+
+
+def _view(column: array) -> Any:
+    # Columns are shared with NumPy, not copied.
+    return numpy.frombuffer(column, dtype=numpy.dtype(column.typecode))
+
+def _runs(*columns: Any) -> Any:
+    """
+    Finds the runs of equal rows in sorted columns.
+
+    Returns:
+        Any: The index of the first row of every run.
+    """
+    changes = numpy.zeros(len(columns[0]), bool)
+    changes[:1] = True
+
+    for column in columns:
+        changes[1:] |= column[1:] != column[:-1]
+
+    return numpy.flatnonzero(changes)
+
+
+class Snapshot:
+    def __init__(self):
+        """
+        Initializes an empty snapshot of objects, held column by column.
+        Numbers are int32 columns, strings are references into a table holding
+        every distinct string once, and every object keeps the identity and
+        content hashes deltas compare objects by. An object takes about 70 bytes,
+        against more than a kilobyte as a dict or data class.
+
+        The helpers comparing, masking and grouping objects are vectorised
+        with NumPy when it is installed, and fall back to plain loops otherwise.
+        """
+        self.numbers: dict[str, array] = {name: array(_INT32) for name in NUMBERS}
+        self.strings: dict[str, array] = {name: array(_UINT32) for name in STRINGS}
+        self.table: list[str] = list()
+        self.identity = array(_UINT64)
+        self.content = array(_UINT64)
+        self._codes: dict[str, int] = dict()
+        self._differ = Differ('objects')
+
+    def __len__(self) -> int:
+        return len(self.identity)
+
+    def __iter__(self) -> Generator[dict, None, None]:
+        return self.records()
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Gets the memory held by the columns and the string table.
+
+        Returns:
+            int: The number of bytes.
+        """
+        columns = [*self.numbers.values(), *self.strings.values(), self.identity, self.content]
+
+        return sum(len(each) * each.itemsize for each in columns) + sum(len(each) for each in self.table)
+
+    def _code(self, value: str | None) -> int:
+        if value is None:
+            return STR_NULL
+
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.table)
+            self.table.append(value)
+
+        return code
+
+    def add(self, record: Any) -> None:
+        """
+        Adds an object.
+
+        Args:
+            record (Any): A data class instance or mapping, such as those
+                queried from a world or loaded from a backup.
+        """
+        self.extend((record,))
+
+    def extend(self, records: Iterable[Any], batch_size: int = DEFAULT_BATCH_SIZE) -> "Snapshot":
+        """
+        Adds objects a batch at a time, so only the snapshot and a batch are held in memory.
+
+        Args:
+            records (Iterable[Any]): Data class instances or mappings, such as those
+                queried from a world or loaded from a backup.
+            batch_size (int): The number of objects added column by column at once.
+
+        Returns:
+            Snapshot: The current instance.
+        """
+        records = iter(records)
+        code = self._code
+
+        while batch := list(islice(records, batch_size)):
+            batch = [
+                record if isinstance(record, dict) else {name: getattr(record, name, None) for name in FIELDS}
+                for record in batch
+            ]
+
+            for name, column in self.numbers.items():
+                column.extend([INT_NULL if (value := each.get(name)) is None else value for each in batch])
+
+            for name, column in self.strings.items():
+                column.extend([code(each.get(name)) for each in batch])
+
+            self.identity.extend(map(self._differ.identity, batch))
+            self.content.extend(map(self._differ.content, batch))
+
+        return self
+
+    @staticmethod
+    def from_records(records: Iterable[Any]) -> "Snapshot":
+        """
+        Builds a snapshot by streaming objects, such as the results of Instance.query.
+
+        Args:
+            records (Iterable[Any]): The objects.
+
+        Returns:
+            Snapshot: The snapshot.
+        """
+        return Snapshot().extend(records)
+
+    @staticmethod
+    def from_file(file: str) -> "Snapshot":
+        """
+        Builds a snapshot by streaming the objects of a backup, in any format.
+
+        Args:
+            file (str): The name of the backup.
+
+        Returns:
+            Snapshot: The snapshot.
+        """
+        return Snapshot.from_records(load(file, file_format=detect_format(file)))
+
+    def record(self, index: int) -> dict:
+        """
+        Rebuilds an object as the mapping it was read from.
+
+        Args:
+            index (int): The index of the object.
+
+        Returns:
+            dict: The object.
+        """
+        record = {
+            name: None if (value := column[index]) == INT_NULL else value
+            for name, column in self.numbers.items()
+        }
+
+        for name, column in self.strings.items():
+            code = column[index]
+            record[name] = None if code == STR_NULL else self.table[code]
+
+        return record
+
+    def records(self, indices: Iterable[int] = None) -> Generator[dict, None, None]:
+        """
+        Rebuilds objects as mappings.
+
+        Args:
+            indices (Iterable[int]): The indices of the objects. Defaults to every object.
+
+        Yields:
+            dict: The objects.
+        """
+        for index in range(len(self)) if indices is None else indices:
+            yield self.record(int(index))
+
+    def cells(self) -> tuple[Sequence[int], Sequence[int]]:
+        """
+        Gets the cell of every object. Objects without coordinates are placed in cell 0, 0.
+
+        Returns:
+            tuple[Sequence[int], Sequence[int]]: The cell x and z of every object.
+        """
+        if numpy is not None:
+            x, z = _view(self.numbers['x']), _view(self.numbers['z'])
+
+            return (
+                numpy.where(x == INT_NULL, 0, x // CELL_SIZE),
+                numpy.where(z == INT_NULL, 0, z // CELL_SIZE)
+            )
+
+        return tuple(
+            array(_INT32, [0 if value == INT_NULL else value // CELL_SIZE for value in self.numbers[name]])
+            for name in ('x', 'z')
+        )
+
+    def _located(self) -> Sequence[bool]:
+        if numpy is not None:
+            return (_view(self.numbers['x']) != INT_NULL) & (_view(self.numbers['z']) != INT_NULL)
+
+        return [x != INT_NULL and z != INT_NULL for x, z in zip(self.numbers['x'], self.numbers['z'])]
+
+    def _cell_keys(self) -> Any:
+        # Packs every cell into a single int64, so cells are sorted and compared as one column.
+        cell_x, cell_z = self.cells()
+
+        return cell_x.astype(numpy.int64) * 2 ** 32 + (cell_z.astype(numpy.int64) + 2 ** 31)
+
+    @staticmethod
+    def _cell_of_key(key: int) -> Cell:
+        return (key >> 32), (key & 0xffffffff) - 2 ** 31
+
+    def region_mask(self, region: Region) -> Sequence[bool]:
+        """
+        Finds the objects lying in a region.
+        The region is asked about every distinct cell once, not about every object.
+
+        Args:
+            region (Region): The region.
+
+        Returns:
+            Sequence[bool]: Whether every object lies in the region.
+        """
+        if numpy is not None:
+            keys, inverse = numpy.unique(self._cell_keys(), return_inverse=True)
+            inside = numpy.array([region.contains_cell(self._cell_of_key(int(key))) for key in keys], dtype=bool)
+
+            return inside[inverse.reshape(-1)] & self._located()
+
+        inside: dict[Cell, bool] = dict()
+        mask: list[bool] = list()
+
+        for cell, located in zip(zip(*self.cells()), self._located()):
+            if cell not in inside:
+                inside[cell] = region.contains_cell(cell)
+            mask.append(located and inside[cell])
+
+        return mask
+
+    def group_by_cell(self) -> dict[Cell, Sequence[int]]:
+        """
+        Groups the objects with coordinates by cell.
+
+        Returns:
+            dict[Cell, Sequence[int]]: The indices of the objects of every cell, in order.
+        """
+        if numpy is not None:
+            indices = numpy.flatnonzero(self._located())
+            keys = self._cell_keys()[indices]
+            order = numpy.argsort(keys, kind='stable')
+            keys, indices = keys[order], indices[order]
+            starts = numpy.flatnonzero(numpy.diff(keys)) + 1
+
+            return {
+                self._cell_of_key(int(keys[start])): group
+                for start, group in zip([0, *starts.tolist()], numpy.split(indices, starts))
+                if len(group)
+            }
+
+        groups: dict[Cell, array] = dict()
+
+        for index, (cell, located) in enumerate(zip(zip(*self.cells()), self._located())):
+            if located:
+                groups.setdefault(cell, array('q')).append(index)
+
+        return groups
+
+    def diff(self, base: "Snapshot") -> tuple[Sequence[int], Sequence[int], Sequence[int]]:
+        """
+        Compares the snapshot against a base snapshot, the way deltas do, see Differ.match.
+        Objects are matched as multisets by counting the runs of equal identity and content:
+        the first live objects of a run match the last base objects of the same run, and an
+        identity left with a single, unmatched base object changes into its first live object.
+
+        Args:
+            base (Snapshot): The base snapshot.
+
+        Returns:
+            tuple[Sequence[int], Sequence[int], Sequence[int]]: The indices of the objects added
+                and changed in this snapshot, and the indices of the objects deleted from the base.
+        """
+        if numpy is not None:
+            if not len(self) + len(base):
+                return numpy.zeros(0, numpy.int64), numpy.zeros(0, numpy.int64), numpy.zeros(0, numpy.int64)
+
+            identity = numpy.concatenate([_view(base.identity), _view(self.identity)])
+            content = numpy.concatenate([_view(base.content), _view(self.content)])
+            live = numpy.repeat([False, True], [len(base), len(self)])
+            source = numpy.concatenate([numpy.arange(len(base)), numpy.arange(len(self))])
+
+            # Sorted stably, every run of equal identity and content holds its base objects, then its live ones.
+            order = numpy.lexsort((live, content, identity))
+            identity, content, live, source = identity[order], content[order], live[order], source[order]
+
+            starts = _runs(identity, content)
+            run = numpy.repeat(numpy.arange(len(starts)), numpy.diff(starts, append=len(order)))
+            bases = numpy.add.reduceat(~live, starts)
+            matched = numpy.minimum(bases, numpy.add.reduceat(live, starts))
+            rank = numpy.arange(len(order)) - starts[run] - numpy.where(live, bases[run], 0)
+            unmatched = numpy.where(live, rank >= matched[run], rank < (bases - matched)[run])
+
+            starts = _runs(identity)
+            group = numpy.repeat(numpy.arange(len(starts)), numpy.diff(starts, append=len(order)))
+            added = live & unmatched
+            first = numpy.minimum.reduceat(numpy.where(added, source, len(self)), starts)
+            changes = (
+                (numpy.add.reduceat(~live, starts) == 1)
+                & (numpy.add.reduceat(live & ~unmatched, starts) == 0)
+                & (first < len(self))
+            )
+            changed = numpy.sort(first[changes])
+
+            return (
+                numpy.setdiff1d(source[added], changed),
+                changed,
+                numpy.sort(source[~live & unmatched & ~changes[group]])
+            )
+
+        runs: dict[tuple[int, int], list[int]] = dict()
+        bases: dict[int, int] = dict()
+
+        for index, key in enumerate(zip(base.identity, base.content)):
+            runs.setdefault(key, list()).append(index)
+            bases[key[0]] = bases.get(key[0], 0) + 1
+
+        unmatched: dict[int, list[int]] = dict()
+        matched: set[int] = set()
+
+        for index, key in enumerate(zip(self.identity, self.content)):
+            if indices := runs.get(key):
+                indices.pop()
+                matched.add(key[0])
+            else:
+                unmatched.setdefault(key[0], list()).append(index)
+
+        added, changed, kept = list(), list(), set()
+
+        for identity, indices in unmatched.items():
+            if bases.get(identity) == 1 and identity not in matched:
+                changed.append(indices.pop(0))
+                kept.add(identity)
+
+            added.extend(indices)
+
+        deleted = [index for (identity, _), indices in runs.items() if identity not in kept for index in indices]
+
+        return array('q', sorted(added)), array('q', sorted(changed)), array('q', sorted(deleted))
@@ -0,0 +1,175 @@
+# Copyright (c) 2022 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import argparse
+from collections import Counter
+from typing import Iterable
+
+from common.index import Index, cell_of, coordinates_of
+
+DEFAULT_HISTOGRAMS = ('model', 'owner')
+DEFAULT_TOP = 10
+
+Condition = tuple[str, str]
+
+
+class Summary:
+    def __init__(self, histograms: Iterable[str] = DEFAULT_HISTOGRAMS):
+        """
+        Initializes a summary of records, fed one record at a time.
+        Only counters are kept, so memory grows with the number of distinct
+        cells and values rather than with the number of records.
+
+        Args:
+            histograms (Iterable[str]): The fields to count the values of.
+        """
+        self.records = 0
+        self.bounds: list[int] = None
+        self.cells: Counter = Counter()
+        self.histograms: dict[str, Counter] = {name: Counter() for name in histograms}
+
+    def add(self, record: dict) -> None:
+        """
+        Counts a record.
+
+        Args:
+            record (dict): The record.
+        """
+        self.records += 1
+        x, z = coordinates_of(record)
+
+        if x is not None and z is not None:
+            bounds = self.bounds
+
+            if bounds is None:
+                self.bounds = [x, z, x, z]
+            else:
+                self.bounds = [min(bounds[0], x), min(bounds[1], z), max(bounds[2], x), max(bounds[3], z)]
+
+            self.cells[cell_of(x, z)] += 1
+
+        for name, counter in self.histograms.items():
+            if (value := record.get(name)) is not None:
+                counter[value] += 1
+
+    @staticmethod
+    def from_index(index: Index) -> "Summary":
+        """
+        Summarizes a backup from its index sidecar alone, without histograms.
+
+        Args:
+            index (Index): The index.
+
+        Returns:
+            Summary: The summary.
+        """
+        summary = Summary(histograms=())
+        summary.records = index.records
+        summary.bounds = index.bounds
+        summary.cells.update({
+            cell: sum(count for _, _, count in spans)
+            for cell, spans in index.cells.items()
+        })
+
+        return summary
+
+    def as_dict(self, top: int = DEFAULT_TOP) -> dict:
+        """
+        Reports the summary, with the most common cells and values first.
+
+        Args:
+            top (int): The number of cells and values to report. Defaults to all of them.
+
+        Returns:
+            dict: The report.
+        """
+        top = top or None
+
+        return {
+            'records': self.records,
+            'bounds': self.bounds,
+            'cells': len(self.cells),
+            'top_cells': [[*cell, count] for cell, count in self.cells.most_common(top)],
+            'histograms': {
+                name: [[value, count] for value, count in counter.most_common(top)]
+                for name, counter in self.histograms.items()
+            },
+        }
+
+    def format(self, top: int = DEFAULT_TOP) -> str:
+        """
+        Renders the report of the summary as text.
+
+        Args:
+            top (int): The number of cells and values to report. Defaults to all of them.
+
+        Returns:
+            str: The text.
+        """
+        report = self.as_dict(top)
+        lines = [f"records  {report['records']:,}"]
+
+        if report['bounds'] is not None:
+            min_x, min_z, max_x, max_z = report['bounds']
+            lines.append(f"bounds   x {min_x}..{max_x}, z {min_z}..{max_z}")
+
+        lines.append(f"cells    {report['cells']:,}")
+        lines.extend(f"  {x},{z}  {count:,}" for x, z, count in report['top_cells'])
+
+        for name, values in report['histograms'].items():
+            lines.append(f"{name}    {len(self.histograms[name]):,} distinct")
+            lines.extend(f"  {value}  {count:,}" for value, count in values)
+
+        return "\n".join(lines)
+
+
+def matches(record: dict, conditions: Iterable[Condition]) -> bool:
+    """
+    Checks whether a record meets every condition.
+    Values are compared as text, so owner=5 matches the number 5.
+
+    Args:
+        record (dict): The record.
+        conditions (Iterable[Condition]): The field and value pairs.
+
+    Returns:
+        bool: Whether the record matches.
+    """
+    return all(
+        (value := record.get(name)) is not None and str(value) == expected
+        for name, expected in conditions
+    )
+
+def parse_condition(text: str) -> Condition:
+    """
+    Parses a field=value condition from the command line.
+
+    Args:
+        text (str): The argument.
+
+    Returns:
+        Condition: The field and value.
+    """
+    name, separator, value = text.partition('=')
+
+    if not separator or not name:
+        raise argparse.ArgumentTypeError(f"Expected field=value, got '{text}'")
+
+    return name, value
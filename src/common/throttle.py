@@ -0,0 +1,236 @@
+# Copyright (c) 2022 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import logging
+import random
+import time
+from typing import Any, Callable
+
+THROTTLED = 'throttled'
+TRANSIENT = 'transient'
+PERMANENT = 'permanent'
+
+DEFAULT_RATE = 1000.0
+DEFAULT_MAX_RATE = 10_000.0
+DEFAULT_RETRIES = 5
+
+_THROTTLED_WORDS = ('rate limit', 'throttl', 'too many', 'busy')
+_TRANSIENT_WORDS = ('timeout', 'timed out', 'connection', 'temporar', 'unavailable')
+
+
+def classify(exception: Exception) -> str:
+    """
+    Classifies a failed call, to tell whether it is worth retrying.
+    Exceptions can classify themselves through a kind attribute, otherwise
+    network errors are transient and messages are searched for hints.
+
+    Args:
+        exception (Exception): The failure.
+
+    Returns:
+        str: The kind of failure. { "throttled", "transient", "permanent" }
+    """
+    if (kind := getattr(exception, 'kind', None)) in (THROTTLED, TRANSIENT, PERMANENT):
+        return kind
+
+    if isinstance(exception, (TimeoutError, ConnectionError)):
+        return TRANSIENT
+
+    message = str(exception).lower()
+
+    if any(word in message for word in _THROTTLED_WORDS):
+        return THROTTLED
+
+    if any(word in message for word in _TRANSIENT_WORDS):
+        return TRANSIENT
+
+    return PERMANENT
+
+
+class AIMD:
+    def __init__(
+        self,
+        initial: float = DEFAULT_RATE,
+        minimum: float = 1.0,
+        maximum: float = DEFAULT_MAX_RATE,
+        increase: float = 1.0,
+        decrease: float = 0.5,
+        cooldown: float = 1.0
+    ):
+        """
+        Initializes an additive increase, multiplicative decrease limit.
+        Until the first congestion, every success adds one, doubling the limit
+        every limit successes; afterwards they add increase per limit successes.
+        A burst of congestion signals only decreases the limit once per cooldown.
+
+        Args:
+            initial (float): The starting limit.
+            minimum (float): The lowest limit.
+            maximum (float): The highest limit.
+            increase (float): The growth of the limit per limit successes, once congested.
+            decrease (float): The factor applied to the limit on congestion.
+            cooldown (float): The seconds between two decreases.
+        """
+        self.limit = initial
+        self._minimum = minimum
+        self._maximum = maximum
+        self._increase = increase
+        self._decrease = decrease
+        self._cooldown = cooldown
+        self._decreased = None
+
+    def success(self) -> None:
+        """
+        Grows the limit after a success.
+        """
+        step = 1.0 if self._decreased is None else self._increase / self.limit
+        self.limit = min(self._maximum, self.limit + step)
+
+    def congestion(self) -> None:
+        """
+        Shrinks the limit after a congestion signal.
+        """
+        now = time.monotonic()
+
+        if self._decreased is None or now - self._decreased >= self._cooldown:
+            self.limit = max(self._minimum, self.limit * self._decrease)
+            self._decreased = now
+
+
+class RateController:
+    def __init__(
+        self,
+        rate: AIMD = None,
+        retries: int = DEFAULT_RETRIES,
+        base_delay: float = 0.1,
+        max_delay: float = 10.0,
+        classify: Callable[[Exception], str] = classify,
+        seed: int = None,
+        retry_unsafe: bool = False
+    ):
+        """
+        Initializes a controller pacing calls to an adaptive rate, and retrying
+        throttled and transient failures with jittered exponential backoff.
+        A controller is meant for the calls of a single thread.
+
+        A transient failure, such as a timeout, does not tell whether the server
+        applied the call, so calls that are not idempotent are only retried when
+        throttled, which the server rejected, unless retry_unsafe is set.
+
+        Args:
+            rate (AIMD): The calls per second. Defaults to unpaced calls.
+            retries (int): The number of retries of a call.
+            base_delay (float): The seconds of the first backoff.
+            max_delay (float): The most seconds of a backoff.
+            classify (Callable[[Exception], str]): Classifies failures.
+            seed (int): Seeds the jitter.
+            retry_unsafe (bool): Whether to retry transient failures of calls that are not idempotent.
+        """
+        self.rate = rate
+        self._retries = retries
+        self._base_delay = base_delay
+        self._max_delay = max_delay
+        self._classify = classify
+        self._rng = random.Random(seed)
+        self._retry_unsafe = retry_unsafe
+        self._next = 0.0
+        self.calls = 0
+        self.retried = 0
+        self.throttled = 0
+
+    def _pace(self) -> None:
+        """
+        Waits for the next call's turn at the current rate.
+        """
+        if self.rate is None:
+            return
+
+        now = time.monotonic()
+        self._next = max(self._next, now)
+
+        if self._next > now:
+            time.sleep(self._next - now)
+
+        self._next += 1 / self.rate.limit
+
+    def backoff(self, attempt: int) -> float:
+        """
+        Draws the seconds to wait before a retry, with full jitter so retrying
+        callers spread out instead of hitting the server at the same time.
+
+        Args:
+            attempt (int): The number of failed attempts, from 0.
+
+        Returns:
+            float: The seconds.
+        """
+        return self._rng.uniform(0, min(self._max_delay, self._base_delay * 2 ** attempt))
+
+    def call(self, func: Callable, *args, idempotent: bool = True, **kwargs) -> Any:
+        """
+        Calls a function, paced and retried.
+
+        Args:
+            func (Callable): The function.
+            *args: The arguments to pass to it.
+            idempotent (bool): Whether the call can be applied twice without harm.
+            **kwargs: The keyword arguments to pass to it.
+
+        Raises:
+            Exception: The failure, once permanent or out of retries.
+
+        Returns:
+            Any: The function's result.
+        """
+        for attempt in range(self._retries + 1):
+            self._pace()
+            self.calls += 1
+
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                kind = self._classify(e)
+
+                if kind == THROTTLED:
+                    self.throttled += 1
+
+                    if self.rate is not None:
+                        self.rate.congestion()
+
+                unsafe = kind == TRANSIENT and not idempotent and not self._retry_unsafe
+
+                if kind == PERMANENT or unsafe or attempt == self._retries:
+                    raise e
+
+                delay = self.backoff(attempt)
+                logging.debug(f'Retrying {getattr(func, "__name__", func)} in {delay:.2f}s after {kind} failure: {e}')
+                self.retried += 1
+                time.sleep(delay)
+                continue
+
+            if self.rate is not None:
+                self.rate.success()
+
+            return result
+
+    def __str__(self) -> str:
+        rate = f', {self.rate.limit:,.0f} calls/s' if self.rate is not None else ''
+
+        return f'{self.calls} calls, {self.retried} retried, {self.throttled} throttled{rate}'
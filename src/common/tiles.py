@@ -0,0 +1,300 @@
+# Copyright (c) 2022 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import os
+import struct
+from array import array
+from typing import Any, BinaryIO, Generator
+
+from common.columnar import (_BLOCK_HEADER, _INT32, BLOCK_MAGIC, TERRAIN,
+                             TILES, TILES_VERSION, ColumnarWriter,
+                             _from_bytes, _to_bytes, check_records,
+                             encode_block, file_version, pack_block)
+
+# Pages are square, holding this many cells a side.
+PAGE_SIZE = 128
+
+# Set on pages whose cells all share one height and one texture, stored without tiles.
+FLAT = 0x01
+
+_PAGE_HEADER = struct.Struct('<iiBHHHHccii')
+_NODES = 'H'
+
+# The narrowest array type holding every value of a tile, tried in order.
+_TYPECODES = (('B', 0, 2 ** 8 - 1), ('b', -2 ** 7, 2 ** 7 - 1), ('H', 0, 2 ** 16 - 1), ('h', -2 ** 15, 2 ** 15 - 1))
+
+Page = tuple[int, int]
+
+
+def _typecode(values: list[int]) -> str:
+    low, high = min(values), max(values)
+
+    for typecode, minimum, maximum in _TYPECODES:
+        if minimum <= low and high <= maximum:
+            return typecode
+
+    return _INT32
+
+def _bounds(nodes: list[dict]) -> tuple[int, int, int, int] | None:
+    """
+    Finds the cells of a page covered by its nodes, if they can be stored as tiles:
+    every node lies in the page, holds a height and a texture for each of its cells,
+    and no two nodes overlap.
+
+    Returns:
+        tuple[int, int, int, int] | None: The first x and z, the width and the depth.
+    """
+    covered = bytearray(PAGE_SIZE * PAGE_SIZE)
+
+    for node in nodes:
+        x, z, size = node['node_x'], node['node_z'], node['node_size']
+
+        if None in (x, z, size) or size <= 0 or x < 0 or z < 0 or x + size > PAGE_SIZE or z + size > PAGE_SIZE:
+            return None
+
+        if len(node['heights'] or ()) != size * size or len(node['textures'] or ()) != size * size:
+            return None
+
+        for at in range(z * PAGE_SIZE + x, (z + size) * PAGE_SIZE, PAGE_SIZE):
+            if any(covered[at:at + size]):
+                return None
+            covered[at:at + size] = b'\x01' * size
+
+    x0 = min(node['node_x'] for node in nodes)
+    z0 = min(node['node_z'] for node in nodes)
+
+    return (
+        x0,
+        z0,
+        max(node['node_x'] + node['node_size'] for node in nodes) - x0,
+        max(node['node_z'] + node['node_size'] for node in nodes) - z0
+    )
+
+def encode_page(nodes: list[dict]) -> bytes | None:
+    """
+    Encodes the nodes of a page as a block of dense height and texture tiles,
+    spanning the cells the nodes cover. A flat page only keeps its height and texture.
+    Tiles use the narrowest integer type holding their values.
+
+    Args:
+        nodes (list[dict]): The nodes, all of the same page.
+
+    Returns:
+        bytes | None: The block, including its header, or None if the nodes cannot be stored as tiles.
+    """
+    if not nodes or (bounds := _bounds(nodes)) is None:
+        return None
+
+    x0, z0, width, depth = bounds
+    first = nodes[0]
+    height, texture = first['heights'][0], first['textures'][0]
+    flat = all(
+        node['heights'].count(height) == len(node['heights'])
+        and node['textures'].count(texture) == len(node['textures'])
+        for node in nodes
+    )
+    parts = [
+        b'',
+        *(_to_bytes(array(_NODES, [node[name] for node in nodes])) for name in ('node_x', 'node_z', 'node_size'))
+    ]
+
+    if flat:
+        parts[0] = _PAGE_HEADER.pack(
+            first['page_x'], first['page_z'], FLAT, x0, z0, width, depth, b'i', b'i', height, texture
+        )
+
+        return pack_block(TILES, len(nodes), b''.join(parts))
+
+    heights, textures = [0] * (width * depth), [0] * (width * depth)
+
+    # Both tiles start zeroed, and every node's rows are copied in.
+    for node in nodes:
+        size = node['node_size']
+        start = (node['node_z'] - z0) * width + node['node_x'] - x0
+        node_heights, node_textures = node['heights'], node['textures']
+
+        for row in range(size):
+            at = start + row * width
+            heights[at:at + size] = node_heights[row * size:(row + 1) * size]
+            textures[at:at + size] = node_textures[row * size:(row + 1) * size]
+
+    height_type, texture_type = _typecode(heights), _typecode(textures)
+    parts[0] = _PAGE_HEADER.pack(
+        first['page_x'], first['page_z'], 0, x0, z0, width, depth, height_type.encode(), texture_type.encode(), 0, 0
+    )
+    parts.append(_to_bytes(array(height_type, heights)))
+    parts.append(_to_bytes(array(texture_type, textures)))
+
+    return pack_block(TILES, len(nodes), b''.join(parts))
+
+def _read_page(count: int, payload: bytes) -> tuple[tuple, list[array], int]:
+    view = memoryview(payload)
+    header = _PAGE_HEADER.unpack_from(view)
+    offset = _PAGE_HEADER.size
+    nodes: list[array] = list()
+
+    for _ in range(3):
+        values, offset = _from_bytes(_NODES, view, offset, count)
+        nodes.append(values)
+
+    return header, nodes, offset
+
+def decode_page(count: int, payload: bytes) -> list[dict]:
+    """
+    Decodes a block of tiles back into the nodes of its page.
+    The heights and textures of every node are sliced straight out of the tiles.
+
+    Args:
+        count (int): The number of nodes in the block.
+        payload (bytes): The block payload.
+
+    Returns:
+        list[dict]: The nodes.
+    """
+    header, (node_x, node_z, node_size), offset = _read_page(count, payload)
+    page_x, page_z, flags, x0, z0, width, depth, height_type, texture_type, height, texture = header
+
+    if flags & FLAT:
+        return [
+            {
+                'page_x': page_x, 'page_z': page_z, 'node_x': x, 'node_z': z, 'node_size': size,
+                'heights': [height] * (size * size), 'textures': [texture] * (size * size),
+            }
+            for x, z, size in zip(node_x, node_z, node_size)
+        ]
+
+    view = memoryview(payload)
+    heights, offset = _from_bytes(height_type.decode(), view, offset, width * depth)
+    textures, offset = _from_bytes(texture_type.decode(), view, offset, width * depth)
+    heights, textures = heights.tolist(), textures.tolist()
+    nodes: list[dict] = list()
+
+    for x, z, size in zip(node_x, node_z, node_size):
+        starts = range((z - z0) * width + x - x0, (z - z0 + size) * width, width)
+        nodes.append({
+            'page_x': page_x, 'page_z': page_z, 'node_x': x, 'node_z': z, 'node_size': size,
+            'heights': [value for at in starts for value in heights[at:at + size]],
+            'textures': [value for at in starts for value in textures[at:at + size]],
+        })
+
+    return nodes
+
+def pages(stream: BinaryIO) -> Generator[tuple[int, Page, int, bool], None, None]:
+    """
+    Lists the pages of a backup from their block and page headers, seeking past their tiles.
+    This is the page index of a backup: a page can then be read on its own, and flat pages
+    are known without reading anything else.
+
+    Args:
+        stream (BinaryIO): The seekable stream positioned after the file header.
+
+    Raises:
+        ValueError: If a block header is truncated or corrupt.
+
+    Yields:
+        tuple[int, Page, int, bool]: The offset of every page's block, the page,
+            its number of nodes and whether it is flat.
+    """
+    while header := stream.read(_BLOCK_HEADER.size):
+        offset = stream.tell() - len(header)
+
+        if len(header) != _BLOCK_HEADER.size:
+            raise ValueError(f"Truncated block header at offset {offset}.")
+
+        magic, kind, count, size = _BLOCK_HEADER.unpack(header)
+        if magic != BLOCK_MAGIC:
+            raise ValueError(f"Bad block magic at offset {offset}.")
+
+        if kind == TILES:
+            page_x, page_z, flags, *_ = _PAGE_HEADER.unpack(stream.read(_PAGE_HEADER.size))
+            size -= _PAGE_HEADER.size
+            yield offset, (page_x, page_z), count, bool(flags & FLAT)
+
+        stream.seek(size, os.SEEK_CUR)
+
+
+class TileWriter(ColumnarWriter):
+    def __init__(self, file: str, compression: str = None, checksum: str = None):
+        """
+        Initializes a writer storing terrain as one block of tiles per page.
+        Consecutive nodes of a page are written together; pages whose nodes
+        cannot be tiled, such as overlapping nodes, are written as plain terrain blocks.
+
+        Args:
+            file (str): The name of the file to append to.
+            compression (str): The codec to compress with. { "gzip", "bz2", "lzma" }
+            checksum (str): The algorithm to checksum every block or frame with. { "crc32", "blake2b" }
+        """
+        super().__init__(file, TERRAIN, PAGE_SIZE * PAGE_SIZE, compression, checksum)
+
+    def open(self) -> "TileWriter":
+        """
+        Opens the underlying file in append mode, writing the header of new files.
+
+        Raises:
+            ValueError: If the backup was written by a version without tiles.
+
+        Returns:
+            TileWriter: The current instance.
+        """
+        if self._handle is None and file_version(self._file) < TILES_VERSION:
+            raise ValueError(f"{self._file} is older than version {TILES_VERSION} and cannot hold tiles.")
+
+        return super().open()
+
+    def write(self, record: Any) -> tuple[int, int]:
+        """
+        Buffers a node, writing the buffered page once a node of another page comes.
+
+        Args:
+            record (Any): A data class instance or mapping holding the terrain fields.
+
+        Returns:
+            tuple[int, int]: The offset of the node's block and its index in the block.
+        """
+        if not isinstance(record, dict):
+            record = {name: getattr(record, name, None) for name in self._layout.fields}
+
+        if self._pending and (self._pending[0]['page_x'], self._pending[0]['page_z']) != (record['page_x'], record['page_z']):
+            self.flush()
+
+        return super().write(record)
+
+    def write_many(self, records: list) -> list[tuple[int, int]]:
+        """
+        Buffers a batch of nodes, writing pages as they end.
+        The batch is checked first, and refused as a whole if a node cannot be encoded.
+
+        Args:
+            records (list): Data class instances or mappings holding the terrain fields.
+
+        Returns:
+            list[tuple[int, int]]: The offset of every node's block and its index in the block.
+        """
+        rows = [
+            record if isinstance(record, dict) else {name: getattr(record, name, None) for name in self._layout.fields}
+            for record in records
+        ]
+        check_records(self._layout, rows)
+
+        return [self.write(record) for record in rows]
+
+    def _encode(self, records: list[dict]) -> bytes:
+        return encode_page(records) or encode_block(TERRAIN, records)
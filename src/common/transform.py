@@ -0,0 +1,192 @@
+# Copyright (c) 2022 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import argparse
+import math
+from dataclasses import dataclass, field
+
+from common.index import CELL_SIZE, Cell
+from common.region import Region, _integers
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Yaw is stored in tenths of a degree.
+YAW_STEPS = 3600
+
+
+@dataclass(frozen=True)
+class Transformation:
+    """
+    Moves objects for a world migration: clips them to a region of the source world,
+    renames their models, rotates them about a pivot and translates them, in that order.
+
+    Attributes:
+        translate (tuple[int, int, int]): The x, y and z to add to every object.
+        angle (float): The degrees to rotate by about the pivot, in the direction yaw grows in.
+        pivot (tuple[int, int]): The x and z to rotate about.
+        region (Region): The cells of the source world to keep objects from. Defaults to every cell.
+        models (dict[str, str]): The new name of every model to rename.
+    """
+    translate: tuple[int, int, int] = (0, 0, 0)
+    angle: float = 0.0
+    pivot: tuple[int, int] = (0, 0)
+    region: Region = None
+    models: dict[str, str] = field(default_factory=dict)
+
+    def _mask(self, x: list[int], z: list[int]) -> list[bool]:
+        # The region is asked about every distinct cell once, not about every object.
+        if numpy is not None:
+            cells = numpy.stack([numpy.array(x, dtype=numpy.int64), numpy.array(z, dtype=numpy.int64)], axis=1)
+            keys, inverse = numpy.unique(cells // CELL_SIZE, axis=0, return_inverse=True)
+            inside = numpy.array([self.region.contains_cell((int(a), int(b))) for a, b in keys], dtype=bool)
+
+            return inside[inverse.reshape(-1)].tolist()
+
+        inside: dict[Cell, bool] = dict()
+        mask: list[bool] = list()
+
+        for cell in zip(
+            (each // CELL_SIZE for each in x),
+            (each // CELL_SIZE for each in z)
+        ):
+            if cell not in inside:
+                inside[cell] = self.region.contains_cell(cell)
+            mask.append(inside[cell])
+
+        return mask
+
+    def _move(self, x: list[int], y: list[int], z: list[int], yaw: list[int]) -> tuple[list, list, list, list]:
+        dx, dy, dz = self.translate
+        px, pz = self.pivot
+        radians = math.radians(self.angle)
+        cos, sin = math.cos(radians), math.sin(radians)
+        turn = round(self.angle * YAW_STEPS / 360)
+
+        if numpy is not None:
+            x, y, z, yaw = (numpy.array(each, dtype=numpy.int64) for each in (x, y, z, yaw))
+
+            if self.angle:
+                x, z = (
+                    numpy.rint(px + (x - px) * cos + (z - pz) * sin).astype(numpy.int64),
+                    numpy.rint(pz - (x - px) * sin + (z - pz) * cos).astype(numpy.int64)
+                )
+                yaw = (yaw + turn) % YAW_STEPS
+
+            return (x + dx).tolist(), (y + dy).tolist(), (z + dz).tolist(), yaw.tolist()
+
+        if self.angle:
+            x, z = (
+                [round(px + (a - px) * cos + (b - pz) * sin) for a, b in zip(x, z)],
+                [round(pz - (a - px) * sin + (b - pz) * cos) for a, b in zip(x, z)]
+            )
+            yaw = [(each + turn) % YAW_STEPS for each in yaw]
+
+        return [each + dx for each in x], [each + dy for each in y], [each + dz for each in z], yaw
+
+    def apply(self, records: list[dict]) -> list[dict]:
+        """
+        Transforms a block of objects, column by column.
+        Clipping, rotations and translations are vectorised with NumPy when it is installed.
+
+        Args:
+            records (list[dict]): The objects, as loaded from a backup. They are changed in place.
+
+        Raises:
+            ValueError: If the records are not objects.
+
+        Returns:
+            list[dict]: The objects left after clipping, transformed.
+        """
+        if records and any(record.get('x') is None or record.get('z') is None for record in records):
+            raise ValueError('Only objects with coordinates can be transformed')
+
+        if self.region is not None:
+            mask = self._mask([each['x'] for each in records], [each['z'] for each in records])
+            records = [record for record, inside in zip(records, mask) if inside]
+
+        if self.models:
+            for record in records:
+                record['model'] = self.models.get(record.get('model'), record.get('model'))
+
+        if not records or (not self.angle and self.translate == (0, 0, 0)):
+            return records
+
+        columns = self._move(
+            [each['x'] for each in records],
+            [each.get('y') or 0 for each in records],
+            [each['z'] for each in records],
+            [each.get('yaw') or 0 for each in records]
+        )
+
+        # Objects without a y or a yaw are moved without one, rather than given a 0.
+        for record, x, y, z, yaw in zip(records, *columns):
+            record['x'], record['z'] = x, z
+
+            if record.get('y') is not None:
+                record['y'] = y
+            if record.get('yaw') is not None:
+                record['yaw'] = yaw
+
+        return records
+
+
+def parse_translation(text: str) -> tuple[int, int, int]:
+    """
+    Parses a dx,dy,dz translation from the command line.
+
+    Args:
+        text (str): The argument.
+
+    Returns:
+        tuple[int, int, int]: The translation.
+    """
+    return tuple(_integers(text, 3))
+
+def parse_point(text: str) -> tuple[int, int]:
+    """
+    Parses an x,z point from the command line.
+
+    Args:
+        text (str): The argument.
+
+    Returns:
+        tuple[int, int]: The point.
+    """
+    return tuple(_integers(text, 2))
+
+def parse_rename(text: str) -> tuple[str, str]:
+    """
+    Parses an old=new model rename from the command line.
+
+    Args:
+        text (str): The argument.
+
+    Returns:
+        tuple[str, str]: The old and new names.
+    """
+    old, separator, new = text.partition('=')
+
+    if not separator or not old or not new:
+        raise argparse.ArgumentTypeError(f"Expected old=new, got '{text}'")
+
+    return old, new
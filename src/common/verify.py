@@ -0,0 +1,222 @@
+# Copyright (c) 2022 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import io
+import os
+
+from common import columnar, compression
+from common.checksum import Checksum, digest, read_checksums
+from common.checksum import SUFFIX as CHECKSUM_SUFFIX
+from common.file import detect_format, frame_records, parse_lines
+
+DEFAULT_RANGE_SIZE = 32 * 1024 * 1024
+
+
+def data_start(file: str, codec: str | None, file_format: str) -> int:
+    """
+    Finds where the records of a backup start, after its file header.
+
+    Args:
+        file (str): The name of the backup.
+        codec (str | None): The codec of the backup, if compressed.
+        file_format (str): The format of the backup. { "json", "columnar" }
+
+    Returns:
+        int: The offset of the first line, block or frame.
+    """
+    if codec:
+        with compression.FrameReader(file) as reader:
+            return reader.frame_offset
+
+    if file_format == 'columnar':
+        with open(file, 'rb') as f:
+            columnar.read_header(f)
+            return f.tell()
+
+    return 0
+
+def _structural_chunks(file: str, codec: str | None, file_format: str, range_size: int) -> list[Checksum]:
+    """
+    Splits a backup without checksums on record boundaries, from the frame
+    or block headers, or at the first newline after every range_size bytes.
+
+    Returns:
+        list[Checksum]: The offset and size of every chunk, without checksums.
+    """
+    size = os.path.getsize(file)
+    start = data_start(file, codec, file_format)
+
+    if codec:
+        offsets = [offset for offset, _ in compression.frame_offsets(file)]
+    elif file_format == 'columnar':
+        with open(file, 'rb') as f:
+            f.seek(start)
+            offsets = [offset for offset, _ in columnar.block_offsets(f)]
+    else:
+        offsets = [start]
+
+        with open(file, 'rb') as f:
+            while offsets[-1] + range_size < size:
+                f.seek(offsets[-1] + range_size)
+                f.readline()
+                offsets.append(f.tell())
+
+            offsets = [offset for offset in offsets if offset < size]
+
+    return [
+        (offset, end - offset, None)
+        for offset, end in zip(offsets, offsets[1:] + [size])
+    ]
+
+def plan(file: str, range_size: int = DEFAULT_RANGE_SIZE) -> tuple[dict, list[list[Checksum]], list[str]]:
+    """
+    Splits a backup into byte ranges on record boundaries, to be verified independently.
+    With a checksum sidecar the ranges are made of the checksummed blocks,
+    and bytes the checksums do not account for are reported.
+
+    Args:
+        file (str): The name of the backup.
+        range_size (int): The number of bytes per range.
+
+    Returns:
+        tuple[dict, list[list[Checksum]], list[str]]: The backup's codec, format and checksum
+            algorithm, the chunks of every range, and the problems found.
+    """
+    codec = None
+
+    if compression.is_compressed(file):
+        with compression.FrameReader(file) as reader:
+            codec = reader.codec
+
+    file_format = detect_format(file)
+    target = {'codec': codec, 'file_format': file_format, 'algorithm': None}
+    problems = list()
+
+    if not os.path.exists(file + CHECKSUM_SUFFIX):
+        chunks = _structural_chunks(file, codec, file_format, range_size)
+    else:
+        target['algorithm'], chunks = read_checksums(file)
+        chunks.sort()
+        size = os.path.getsize(file)
+        expected = data_start(file, codec, file_format)
+        gaps = list()
+
+        for offset, length, _ in chunks:
+            if offset > expected:
+                problems.append(f'Bytes {expected} to {offset} have no checksum')
+                gaps.append((expected, offset - expected, None))
+            elif offset < expected:
+                problems.append(f'Checksummed blocks overlap at offset {offset}')
+            expected = max(expected, offset + length)
+
+        if expected > size:
+            problems.append(f'Truncated: the checksums cover {expected} bytes, the file holds {size}')
+        elif expected < size:
+            problems.append(f'{size - expected} bytes after the last checksum')
+            gaps.append((expected, size - expected, None))
+
+        # Unchecksummed bytes are still decoded, as far as they go.
+        chunks = sorted(chunks + gaps)
+
+    ranges, current, current_size = list(), list(), 0
+
+    for chunk in chunks:
+        current.append(chunk)
+        current_size += chunk[1]
+
+        if current_size >= range_size:
+            ranges.append(current)
+            current, current_size = list(), 0
+
+    if current:
+        ranges.append(current)
+
+    return target, ranges, problems
+
+def _decode(data: bytes, codec: str | None, file_format: str) -> int:
+    """
+    Decodes every record of a chunk.
+
+    Returns:
+        int: The number of records.
+    """
+    if codec:
+        return sum(
+            sum(1 for _ in frame_records(raw, file_format))
+            for raw in compression.decode_frames(data, codec)
+        )
+
+    if file_format == 'columnar':
+        return sum(
+            len(columnar.decode_block(kind, count, payload))
+            for kind, count, payload in columnar.read_blocks(io.BytesIO(data))
+        )
+
+    records = parse_lines(data.splitlines())
+
+    for number, record in enumerate(records, 1):
+        if not isinstance(record, dict):
+            raise ValueError(f'line {number} is not a record')
+
+    return len(records)
+
+def verify_range(
+    file: str,
+    codec: str | None,
+    file_format: str,
+    algorithm: str | None,
+    chunks: list[Checksum]
+) -> tuple[int, int, list[str]]:
+    """
+    Verifies a range of a backup: the checksum of every chunk, then every record in it.
+    Ranges are independent, so each can be verified by a different process.
+
+    Args:
+        file (str): The name of the backup.
+        codec (str | None): The codec of the backup, if compressed.
+        file_format (str): The format of the backup. { "json", "columnar" }
+        algorithm (str | None): The checksum algorithm, if the backup has checksums.
+        chunks (list[Checksum]): The offset, size and checksum, if any, of every chunk.
+
+    Returns:
+        tuple[int, int, list[str]]: The records and bytes verified, and the problems found.
+    """
+    records, verified, problems = 0, 0, list()
+
+    with open(file, 'rb') as f:
+        for offset, length, checksum in chunks:
+            f.seek(offset)
+            data = f.read(length)
+
+            if len(data) != length:
+                problems.append(f'Truncated block at offset {offset}: {len(data)} of {length} bytes')
+                continue
+
+            if checksum is not None and digest(algorithm, data) != checksum:
+                problems.append(f'Checksum mismatch in the block at offset {offset}')
+                continue
+
+            try:
+                records += _decode(data, codec, file_format)
+                verified += length
+            except Exception as e:
+                problems.append(f'Corrupt record in the block at offset {offset}: {e}')
+
+    return records, verified, problems
@@ -22,12 +22,35 @@
 __all__ = [
     'Aggregate',
     'Delete',
+    'Inspect',
     'Save',
     'Load',
+    'Reindex',
+    'Sync',
+    'Transform',
+    'Verify',
 ]
 
+import importlib
+from typing import Any
 
-from .aggregate import Aggregate
-from .delete import Delete
-from .load import Load
-from .save import Save
+# Commands are imported on first use, so working on files alone does not
+# pay for the process pools and pipelines of the commands talking to a world.
+_MODULES = {
+    'Aggregate': 'aggregate',
+    'Delete': 'delete',
+    'Inspect': 'inspection',
+    'Load': 'load',
+    'Reindex': 'reindex',
+    'Save': 'save',
+    'Sync': 'sync',
+    'Transform': 'transform',
+    'Verify': 'verify',
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _MODULES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    return getattr(importlib.import_module(f'.{_MODULES[name]}', __name__), name)
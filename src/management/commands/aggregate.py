@@ -18,29 +18,138 @@
 # LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
 # OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
 # WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING, Callable
+
+from common.func import OrderedErrors
+from common.metrics import Metrics, execute_measured
 from management.protocols import Command
 
-import logging
+if TYPE_CHECKING:
+    from korth_spirit import Instance
+
+
+def _execute_child(
+    instance_factory: Callable[[], 'Instance'],
+    command: Command
+) -> tuple[Metrics, Exception | None]:
+    """
+    Executes a command in a process of its own, over its own connection.
+    The SDK keeps its attribute state per process, so children cannot share one.
+
+    Args:
+        instance_factory (Callable[[], Instance]): Creates the instance to enter.
+        command (Command): The command to execute.
+
+    Returns:
+        tuple[Metrics, Exception | None]: The metrics of the command and its failure, if any.
+    """
+    with instance_factory() as instance:
+        if hasattr(command, 'bind'):
+            command.bind(instance)
+
+        return execute_measured(command)
 
 
 class Aggregate:
     def __init__(
         self,
-        *commands: tuple[Command]
+        *commands: tuple[Command],
+        concurrent: bool = False,
+        instance_factory: Callable[[], 'Instance'] = None
     ):
         """
         Initializes the aggregate command.
 
         Args:
             commands (list): The list of commands to aggregate.
+            concurrent (bool): Whether to execute the commands at the same time, each on its own connection.
+            instance_factory (Callable[[], Instance]): Creates the instance of each command when concurrent.
         """
         self._commands = commands
-    
+        self._concurrent = concurrent
+        self._instance_factory = instance_factory
+        self.metrics = Metrics('AGGREGATE')
+
+    def _report(self, index: int, metrics: Metrics, error: Exception | None) -> None:
+        """
+        Adds the metrics of a command to the aggregate's.
+
+        Args:
+            index (int): The index of the command.
+            metrics (Metrics): Its metrics.
+            error (Exception | None): Its failure, if any.
+        """
+        self.metrics.children.append(metrics)
+        self.metrics.records += metrics.records
+        self.metrics.bytes += metrics.bytes
+        self.metrics.failures += metrics.failures
+
+        if error is not None:
+            logging.error(f'{metrics.name} #{index} failed after {metrics.wall_time:.2f}s: {error}')
+        else:
+            logging.info(
+                f'{metrics.name} #{index} took {metrics.wall_time:.2f}s '
+                f'for {metrics.records} records ({metrics.rate:,.0f}/s)'
+            )
+
+    def _execute_concurrently(self):
+        """
+        Executes every command in a process of its own.
+        Every command runs to completion, failures are raised together afterwards.
+
+        Raises:
+            OrderedErrors: If any of the commands failed.
+        """
+        if self._instance_factory is None:
+            raise ValueError('Concurrent execution requires an instance factory.')
+
+        errors = list()
+
+        with ProcessPoolExecutor(max_workers=len(self._commands)) as executor:
+            futures = [
+                executor.submit(_execute_child, self._instance_factory, command)
+                for command in self._commands
+            ]
+
+            for index, (command, future) in enumerate(zip(self._commands, futures)):
+                try:
+                    metrics, error = future.result()
+                except Exception as e:
+                    # The worker itself failed, such as when it could not connect.
+                    metrics, error = Metrics(type(command).__name__, error=str(e)), e
+
+                self._report(index, metrics, error)
+
+                if error is not None:
+                    errors.append((index, error))
+
+        if errors:
+            raise OrderedErrors(errors)
+
     def execute(self):
         """
         Executes all commands in the aggregate.
         """
         logging.info('Bulk executing commands.')
+        self.metrics = Metrics(self.metrics.name)
+        start = time.perf_counter()
+
+        if self._concurrent and len(self._commands) > 1:
+            self._execute_concurrently()
+        else:
+            for index, command in enumerate(self._commands):
+                metrics, error = execute_measured(command)
+                self._report(index, metrics, error)
+
+                if error is not None:
+                    raise error
+
+        # Only once every command succeeded, so a resume still skips the ones that did.
         for command in self._commands:
-            command.execute()
-        logging.info('Finished bulk executing commands.')
+            if hasattr(command, 'clear_checkpoint'):
+                command.clear_checkpoint()
+
+        logging.info(f'Finished bulk executing commands in {time.perf_counter() - start:.2f}s.')
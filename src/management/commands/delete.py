@@ -20,9 +20,8 @@
 # WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 import logging
 
-from korth_spirit.query import QueryEnum
-from korth_spirit.sdk import (aw_delete_all_objects, aw_terrain_delete_all,
-                              aw_world_attributes_reset)
+from common.metrics import Metrics
+from management import sdk
 
 
 class Delete:
@@ -42,7 +41,8 @@ class Delete:
             .replace('ATTRIBUTE', 'WORLD')
 
         self._type = query_type
-        self._query = QueryEnum[_query]
+        self._query = sdk.QueryEnum[_query]
+        self.metrics = Metrics(f'DELETE {query_type}'.upper())
     
     def execute(self):
         """
@@ -50,9 +50,9 @@ class Delete:
         """
         logging.info(f'Deleting {self._type}')
         
-        if self._query == QueryEnum.OBJECT:
-            aw_delete_all_objects()
-        elif self._query == QueryEnum.TERRAIN:
-            aw_terrain_delete_all()
-        elif self._query == QueryEnum.WORLD:
-            aw_world_attributes_reset()
+        if self._query == sdk.QueryEnum.OBJECT:
+            sdk.aw_delete_all_objects()
+        elif self._query == sdk.QueryEnum.TERRAIN:
+            sdk.aw_terrain_delete_all()
+        elif self._query == sdk.QueryEnum.WORLD:
+            sdk.aw_world_attributes_reset()
@@ -18,19 +18,30 @@
 # LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
 # OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
 # WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import logging
 from abc import ABC
+from typing import TYPE_CHECKING, Iterable
 
-from korth_spirit import Instance
-from korth_spirit.query import QueryEnum
+from common.index import Cell, cell_of
+from common.metrics import Metrics
+from common.region import Region
+from common.throttle import RateController
+from management import sdk
+
+if TYPE_CHECKING:
+    from korth_spirit import Instance
 
 
 class FileABC(ABC):
     def __init__(
         self,
-        instance: Instance,
+        instance: 'Instance',
         query_type: str,
         file_name: str = 'backup.json',
-        binary_mode: bool = False
+        binary_mode: bool = False,
+        file_format: str = 'json',
+        region: Region = None,
+        controller: RateController = None
     ):
         """
         Initializes the Save Query command.
@@ -40,6 +51,9 @@ class FileABC(ABC):
             query_type (str): The type of query to perform. { "attributes", "objects", "terrain" }
             file_name (str): The file name.
             binary_mode (bool): Whether or not to save the data in binary mode.
+            file_format (str): The backup format. { "json", "columnar", "tiles" }
+            region (Region): The cells to restrict objects to. Defaults to the whole world.
+            controller (RateController): Paces and retries the SDK calls. Defaults to unpaced retries.
         """
         _query = query_type\
             .upper()\
@@ -48,6 +62,70 @@ class FileABC(ABC):
 
         self._instance = instance
         self._type = query_type
-        self._query = QueryEnum[_query]
+        self._query = sdk.QueryEnum[_query]
         self._file_name = file_name
         self._binary_mode = binary_mode
+
+        # World attributes have no columnar layout and are always kept as json lines.
+        self._file_format = file_format if self._query != sdk.QueryEnum.WORLD else 'json'
+
+        # Tiles are columnar backups holding terrain a page per block, other queries keep their columns.
+        self._tiles = self._file_format == 'tiles' and self._query == sdk.QueryEnum.TERRAIN
+        if self._file_format == 'tiles':
+            self._file_format = 'columnar'
+
+        # Only objects are placed in cells, everything else is world wide.
+        if region is not None and self._query != sdk.QueryEnum.OBJECT:
+            logging.warning(f'Ignoring the region for {query_type}')
+            region = None
+
+        self._region = region
+        self._controller = controller or RateController()
+        self.metrics = Metrics(f'{type(self).__name__} {query_type}'.upper())
+
+    def __getstate__(self) -> dict:
+        # A connection cannot cross into another process, bind one there instead.
+        return {**self.__dict__, '_instance': None}
+
+    def bind(self, instance: 'Instance') -> "FileABC":
+        """
+        Targets another instance, such as a connection opened in a worker process.
+
+        Args:
+            instance (Instance): The instance.
+
+        Returns:
+            FileABC: The current instance.
+        """
+        self._instance = instance
+
+        return self
+
+    def _query_records(self) -> Iterable:
+        """
+        Queries the world, cell by cell when a region is set.
+        Nothing is queried until the records are read, so the queries run on the
+        reading thread, such as the producer stage of Save's pipeline. The whole
+        world arrives from a single call returning every record at once, so only
+        the cells of a region are queried while earlier ones are encoded and written.
+        Every cell's records are read within the call, so failures while reading
+        them are retried too.
+
+        Returns:
+            Iterable: The queried records.
+        """
+        if self._region is None:
+            def _query_world() -> Iterable:
+                yield from self._controller.call(self._instance.query, self._query)
+
+            return _query_world()
+
+        def _query_cell(cell: Cell) -> list:
+            return list(self._instance.query(self._query, x=cell[0], z=cell[1]))
+
+        return (
+            record
+            for cell in self._region.cells()
+            for record in self._controller.call(_query_cell, cell)
+            if cell_of(record.x, record.z) == cell
+        )
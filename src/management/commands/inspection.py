@@ -0,0 +1,154 @@
+# Copyright (c) 2022 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import json
+import logging
+import os
+import sys
+from contextlib import nullcontext
+from typing import Iterable
+
+from common.delta import is_delta
+from common.file import IndexedReader, detect_format, load
+from common.index import read_sidecar
+from common.metrics import Metrics
+from common.region import Region, contains, within
+from common.summary import (DEFAULT_HISTOGRAMS, DEFAULT_TOP, Condition,
+                            Summary, matches)
+
+
+class Inspect:
+    def __init__(
+        self,
+        file_name: str,
+        region: Region = None,
+        where: Iterable[Condition] = (),
+        histograms: Iterable[str] = DEFAULT_HISTOGRAMS,
+        top: int = DEFAULT_TOP,
+        head: int = None,
+        extract: str = None,
+        as_json: bool = False
+    ):
+        """
+        Initializes the Inspect command.
+        Streams over a backup, summarizing and optionally extracting the
+        records matching a region and conditions, without connecting to a world.
+        With an index sidecar, a region only reads its own cells, and a
+        summary without conditions nor histograms is read off the index alone.
+
+        Args:
+            file_name (str): The backup.
+            region (Region): The cells to restrict objects to. Defaults to the whole world.
+            where (Iterable[Condition]): The field and value pairs records must match.
+            histograms (Iterable[str]): The fields to count the values of.
+            top (int): The number of cells and values to report. 0 reports all of them.
+            head (int): The number of matching records to stop after. Defaults to all of them.
+            extract (str): The file to write the matching records to as json lines, "-" for stdout.
+            as_json (bool): Whether to print the summary as json instead of text.
+        """
+        self._file_name = file_name
+        self._region = region
+        self._where = list(where)
+        self._histograms = list(histograms)
+        self._top = top
+        self._head = head
+        self._extract = extract
+        self._as_json = as_json
+        self.report: dict = None
+        self.metrics = Metrics('INSPECT')
+
+    def _records(self) -> Iterable[dict]:
+        """
+        Reads the records of the region, through the index when there is one.
+
+        Yields:
+            dict: The records.
+        """
+        if self._region is not None and (index := read_sidecar(self._file_name)):
+            with IndexedReader(self._file_name, index) as reader:
+                yield from reader.cells(within(self._region, reader.index.cells))
+            return
+
+        for record in load(self._file_name, file_format=detect_format(self._file_name)):
+            if self._region is None or contains(self._region, record):
+                yield record
+
+    def _summarize(self, extract) -> Summary:
+        """
+        Summarizes the matching records, passing each one to extract.
+
+        Args:
+            extract (Callable[[dict], None]): Receives every matching record.
+
+        Returns:
+            Summary: The summary.
+        """
+        summary = Summary(self._histograms)
+
+        for record in self._records():
+            self.metrics.records += 1
+
+            if self._where and not matches(record, self._where):
+                continue
+
+            summary.add(record)
+            extract(record)
+
+            if self._head is not None and summary.records >= self._head:
+                break
+
+        return summary
+
+    def execute(self):
+        """
+        Executes the command.
+
+        Raises:
+            ValueError: If the backup is a delta.
+        """
+        logging.info(f'Inspecting {self._file_name}')
+        self.metrics = Metrics(self.metrics.name)
+        self.metrics.bytes = os.path.getsize(self._file_name)
+
+        if is_delta(self._file_name):
+            raise ValueError(f'{self._file_name} is a delta, inspect the backups it was taken from')
+
+        index = None
+        if self._region is None and not (
+            self._where or self._histograms or self._head is not None or self._extract
+        ):
+            index = read_sidecar(self._file_name)
+
+        if index is not None:
+            logging.info(f'Reading the summary off the index of {self._file_name}')
+            summary = Summary.from_index(index)
+        elif self._extract:
+            output = open(self._extract, 'w', encoding='utf-8') if self._extract != '-' else nullcontext(sys.stdout)
+
+            with output as f:
+                summary = self._summarize(lambda record: f.write(json.dumps(record) + '\n'))
+        else:
+            summary = self._summarize(lambda record: None)
+
+        self.report = summary.as_dict(self._top)
+
+        # The records go to stdout alone when they are extracted there.
+        if self._extract != '-':
+            print(json.dumps(self.report) if self._as_json else summary.format(self._top))
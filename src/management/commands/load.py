@@ -19,55 +19,470 @@
 # OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
 # WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 import logging
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from multiprocessing.util import Finalize
+from typing import TYPE_CHECKING, Callable, Iterable
 
-from common.file import load
-from common.func import on_each
-from korth_spirit.data import ObjectLoadData, TerrainNodeData
-from korth_spirit.query import QueryEnum
-from korth_spirit.sdk import aw_object_load, aw_terrain_load_node
-from korth_spirit.sdk.enums import AttributeEnum
-from korth_spirit.sdk.write_data import write_data
+from common.checkpoint import DEFAULT_EVERY, Checkpointer, checkpoint_file
+from common.codec import codec_for
+from common.delta import is_delta, materialize, read_manifest
+from common.file import IndexedReader, detect_format, load, load_from
+from common.func import OrderedErrors, every_x, on_each_concurrently
+from common.index import Index, Position, read_sidecar
+from common.metrics import Metrics
+from common.pipeline import DEFAULT_BATCH_SIZE
+from common.region import Region, contains, within
+from common.throttle import AIMD, THROTTLED, RateController, classify
+from management import sdk
 
 from .file_abc import FileABC
 
+if TYPE_CHECKING:
+    from korth_spirit import Instance
+    from korth_spirit.query import QueryEnum
+
+
+_controller: RateController = None
+
+
+class BatchFailed(Exception):
+    def __init__(self, loaded: int, error: Exception):
+        """
+        Raised when a record of a batch failed to load.
+
+        Args:
+            loaded (int): The number of records of the batch loaded before the failure.
+            error (Exception): The failure.
+        """
+        self.loaded = loaded
+        self.error = error
+
+        super().__init__(f'{error} (after {loaded} records of the batch)')
+
+    def __reduce__(self):
+        # Lets the error cross back from worker processes.
+        return BatchFailed, (self.loaded, self.error)
+
+
+def _unpaced(func: Callable, *args, idempotent: bool = True):
+    return func(*args)
+
+def load_record(query: 'QueryEnum', data: dict, controller: RateController = None) -> None:
+    """
+    Loads a single record based on the query type.
+    Terrain nodes and attributes are overwritten in place, so retrying them is harmless.
+    Loading an object is not idempotent: a transient failure such as a timeout may
+    still have been applied by the server, so it is only retried when throttled,
+    unless the controller retries unsafe calls.
+
+    Args:
+        query (QueryEnum): The type of record to load.
+        data (dict): The data to load.
+        controller (RateController): Paces and retries the SDK call. Defaults to a single attempt.
+    """
+    call = controller.call if controller is not None else _unpaced
+
+    if query == sdk.QueryEnum.OBJECT:
+        call(sdk.aw_object_load, codec_for(sdk.ObjectLoadData).decode(data), idempotent=False)
+    elif query == sdk.QueryEnum.TERRAIN:
+        call(sdk.aw_terrain_load_node, codec_for(sdk.TerrainNodeData).decode(data))
+    elif query == sdk.QueryEnum.WORLD:
+        try:
+            call(
+                sdk.write_data,
+                sdk.AttributeEnum[data['name']],
+                data['value']
+            )
+        except Exception as e:
+            if 'Failed to set initialization attribute: 451' in str(e):
+                logging.warning(f'Read only attribute {data["name"]}')
+            else:
+                raise e
+
+def load_records(query: 'QueryEnum', batch: list[dict], controller: RateController = None) -> None:
+    """
+    Loads a batch of records of a single type.
+    The data objects of the whole batch are built at once,
+    then sent back to back. Object loads are retried as in load_record.
+
+    Args:
+        query (QueryEnum): The type of records to load.
+        batch (list[dict]): The data to load.
+        controller (RateController): Paces and retries the SDK calls. Defaults to a single attempt.
+
+    Raises:
+        BatchFailed: If a record failed, with the number of records loaded before it.
+    """
+    call = controller.call if controller is not None else _unpaced
+    loaded = 0
+
+    try:
+        if query == sdk.QueryEnum.OBJECT:
+            function, data = sdk.aw_object_load, codec_for(sdk.ObjectLoadData).decode_many(batch)
+        elif query == sdk.QueryEnum.TERRAIN:
+            function, data = sdk.aw_terrain_load_node, codec_for(sdk.TerrainNodeData).decode_many(batch)
+        else:
+            function, data, call = partial(load_record, query, controller=controller), batch, _unpaced
+
+        for each in data:
+            call(function, each, idempotent=query != sdk.QueryEnum.OBJECT)
+            loaded += 1
+    except Exception as e:
+        raise BatchFailed(loaded, e) from e
+
+def _connect_worker(instance_factory: Callable[[], 'Instance'], controller: RateController) -> None:
+    """
+    Logs a worker process into the world.
+    The SDK keeps its attribute state per process, so every worker
+    needs its own connection to have requests in flight concurrently,
+    and adapts its own rate to what the server accepts from it.
+
+    Args:
+        instance_factory (Callable[[], Instance]): Creates an instance to enter.
+        controller (RateController): Paces and retries the worker's SDK calls.
+    """
+    global _controller
+    _controller = controller
+    instance = instance_factory().__enter__()
+
+    Finalize(instance, instance.__exit__, args=(None, None, None), exitpriority=10)
+
+def _load_in_worker(query: 'QueryEnum', batch: list[dict]) -> int:
+    """
+    Loads a batch of records through the worker's controller.
+
+    Args:
+        query (QueryEnum): The type of records to load.
+        batch (list[dict]): The data to load.
+
+    Returns:
+        int: The number of calls the server throttled while loading the batch.
+    """
+    throttled = _controller.throttled if _controller is not None else 0
+    load_records(query, batch, _controller)
+
+    return (_controller.throttled if _controller is not None else 0) - throttled
+
 
 class Load(FileABC):
-    def _load_function(self, data: dict):
+    def __init__(
+        self,
+        instance: 'Instance',
+        query_type: str,
+        file_name: str = 'backup.json',
+        binary_mode: bool = False,
+        file_format: str = 'json',
+        region: Region = None,
+        workers: int = 1,
+        max_pending: int = None,
+        instance_factory: Callable[[], 'Instance'] = None,
+        checkpoint_every: int = DEFAULT_EVERY,
+        resume: bool = False,
+        controller: RateController = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        checkpoint_dir: str = None,
+        keep_checkpoint: bool = False
+    ):
         """
-        Loads the data based on the query type.
+        Initializes the Load Query command.
 
         Args:
-            data (dict): The data to load.
+            instance (Instance): The instance.
+            query_type (str): The type of query to perform. { "attributes", "objects", "terrain" }
+            file_name (str): The file name.
+            binary_mode (bool): Whether or not to load the data in binary mode.
+            file_format (str): The backup format. { "json", "columnar", "tiles" }
+                Backups are read in the format they were written in, detected from their header.
+            region (Region): The cells to restrict objects to. Defaults to the whole world.
+            workers (int): The number of connections loading concurrently.
+            max_pending (int): The most batches in flight. Defaults to twice the workers.
+            instance_factory (Callable[[], Instance]): Creates the instance of each worker.
+            checkpoint_every (int): The number of loaded records between two checkpoints.
+            resume (bool): Whether to continue from the last checkpoint.
+            controller (RateController): Paces and retries the SDK calls, copied into every worker.
+            batch_size (int): The number of records decoded and sent at once.
+            checkpoint_dir (str): The directory to checkpoint the load to. Defaults to no checkpoints.
+            keep_checkpoint (bool): Whether a finished load keeps its checkpoint, marked complete,
+                for the commands it is part of to resume, see clear_checkpoint.
+
+        Raises:
+            ValueError: If resuming without a checkpoint directory.
+        """
+        super().__init__(instance, query_type, file_name, binary_mode, file_format, region, controller)
+
+        if resume and checkpoint_dir is None:
+            raise ValueError('Resuming a load requires a checkpoint directory.')
+
+        self._workers = workers
+        self._max_pending = max_pending or workers * 2
+        self._instance_factory = instance_factory
+        self._checkpoint_every = checkpoint_every
+        self._resume = resume
+        self._checkpoint_dir = checkpoint_dir
+        self._keep_checkpoint = keep_checkpoint
+        self._checkpointer: Checkpointer = None
+        self._start: int = None
+        self.batch_size = batch_size
+        self.window: AIMD = None
+
+    def _acknowledge(self, positions: Iterable[Position]) -> None:
+        """
+        Counts loaded records and marks them loaded in the checkpoints.
+
+        Args:
+            positions (Iterable[Position]): The positions of the records.
+        """
+        for position in positions:
+            self.metrics.records += 1
+
+            if self._checkpointer:
+                self._checkpointer.acknowledge(position)
+
+    def execute_batch(self, batch: list[tuple[Position, dict]]):
+        """
+        Loads a batch of records, acknowledging every record loaded
+        before a failure so a resume continues right after it.
+
+        Args:
+            batch (list[tuple[Position, dict]]): The positions of the data and the data to load.
+        """
+        try:
+            load_records(self._query, [data for _, data in batch], self._controller)
+        except BatchFailed as e:
+            self._acknowledge(position for position, _ in batch[:e.loaded])
+            raise e.error
+
+        self._acknowledge(position for position, _ in batch)
+
+    def _records(self) -> Iterable[dict]:
+        """
+        Reads the records to load.
+        With a region, the index sidecar's cell runs are used to read only the
+        region's records; without a sidecar every record is read and filtered.
+
+        Returns:
+            Iterable[dict]: The records.
+        """
+        if is_delta(self._file_name):
+            return self._delta_records()
+
+        if self._region is None:
+            return load(self._file_name, self._binary_mode, detect_format(self._file_name))
+
+        if (index := read_sidecar(self._file_name)) is None:
+            logging.warning(f'No up to date index for {self._file_name}, scanning the whole file')
+
+            return (
+                record
+                for record in load(self._file_name, self._binary_mode, detect_format(self._file_name))
+                if contains(self._region, record)
+            )
+
+        return self._indexed_records(index)
+
+    def _positioned_records(self) -> Iterable[tuple[Position, dict]]:
+        """
+        Reads the records to load with their positions, so they can be checkpointed
+        when a checkpoint directory is given. Deltas and indexed region reads are not
+        sequential and carry no positions, unless resuming, where a region is read by
+        scanning from the checkpoint. Resuming a backup already loaded reads nothing.
+
+        Raises:
+            ValueError: If resuming the load of a delta.
+
+        Returns:
+            Iterable[tuple[Position, dict]]: The position of every record and the record.
         """
-        if self._query == QueryEnum.OBJECT:
-            aw_object_load(ObjectLoadData(**data))
-        elif self._query == QueryEnum.TERRAIN:
-            aw_terrain_load_node(TerrainNodeData(**data))
-        elif self._query == QueryEnum.WORLD:
+        if is_delta(self._file_name):
+            if self._resume:
+                raise ValueError(f'{self._file_name} is a delta and cannot be resumed')
+
+            self._checkpointer, self._start = None, None
+            return ((None, record) for record in self._records())
+
+        if self._region is not None and not self._resume and (index := read_sidecar(self._file_name)):
+            self._checkpointer, self._start = None, None
+            return ((None, record) for record in self._indexed_records(index))
+
+        self._checkpointer, position = None, None
+
+        if self._checkpoint_dir is not None:
+            self._checkpointer = Checkpointer(
+                self._file_name,
+                self._checkpoint_dir,
+                self._checkpoint_every,
+                self._resume
+            )
+
+            if self._checkpointer.complete:
+                self._start = None
+                return iter(())
+
+            position = self._checkpointer.position
+
+        self._start = position[0] if position else 0
+        records = load_from(self._file_name, detect_format(self._file_name), position)
+
+        if self._region is None:
+            return records
+
+        return (
+            (position, record)
+            for position, record in records
+            if contains(self._region, record)
+        )
+
+    def _delta_records(self) -> Iterable[dict]:
+        """
+        Rebuilds the snapshot a delta was taken from, out of its base and the delta.
+
+        Returns:
+            Iterable[dict]: The records.
+        """
+        manifest = read_manifest(self._file_name)
+        records = materialize(
+            load(manifest['base'], file_format=manifest['base_format']),
+            load(self._file_name),
+            manifest['query_type']
+        )
+
+        if self._region is None:
+            return records
+
+        return (record for record in records if contains(self._region, record))
+
+    def _indexed_records(self, index: Index) -> Iterable[dict]:
+        """
+        Reads the records of the region's cells through the index sidecar.
+
+        Args:
+            index (Index): The index of the backup.
+
+        Yields:
+            dict: The records.
+        """
+        with IndexedReader(self._file_name, index) as reader:
+            yield from reader.cells(within(self._region, reader.index.cells))
+
+    def _bytes_read(self) -> int:
+        """
+        Gets the number of bytes the load reads: the whole base and delta for a delta,
+        and the backup from the record it starts at otherwise. Indexed region reads
+        only seek to the region's cells and are not counted.
+
+        Returns:
+            int: The number of bytes, 0 when not counted.
+        """
+        if is_delta(self._file_name):
+            return os.path.getsize(read_manifest(self._file_name)['base']) + os.path.getsize(self._file_name)
+
+        if self._start is None:
+            return 0
+
+        return os.path.getsize(self._file_name) - self._start
+
+    def _execute_concurrently(self, items: Iterable[tuple[Position, dict]]):
+        """
+        Loads the file over several connections at once, a batch per task.
+        Batches finish in the order they were sent, so every record before
+        the first failure is acknowledged to the checkpoints.
+
+        Every worker paces its own connection, while the batches in flight across
+        all of them adapt together: the window starts at one batch per worker, grows
+        up to max_pending while batches go through, and halves when the server
+        throttles any of them.
+
+        Args:
+            items (Iterable[tuple[Position, dict]]): The records to load, with their positions.
+        """
+        if self._instance_factory is None:
+            raise ValueError('Concurrent loading requires an instance factory.')
+
+        positions: deque = deque()
+        failed = False
+        self.window = AIMD(min(self._workers, self._max_pending), maximum=self._max_pending)
+
+        def _batches():
+            for batch in every_x(list, items, self.batch_size):
+                positions.append([position for position, _ in batch])
+                yield [record for _, record in batch]
+
+        def _settled(index: int, exception: Exception, throttled: int):
+            nonlocal failed
+            batch = positions.popleft()
+
+            if throttled or (exception is not None and classify(getattr(exception, 'error', exception)) == THROTTLED):
+                self.window.congestion()
+            else:
+                self.window.success()
+
+            if not failed:
+                loaded = len(batch) if exception is None else getattr(exception, 'loaded', 0)
+                self._acknowledge(batch[:loaded])
+
+            failed = failed or exception is not None
+
+        with ProcessPoolExecutor(
+            max_workers=self._workers,
+            initializer=_connect_worker,
+            initargs=(self._instance_factory, self._controller)
+        ) as executor:
             try:
-                write_data(
-                    AttributeEnum[data['name']],
-                    data['value']
+                on_each_concurrently(
+                    _batches(),
+                    partial(_load_in_worker, self._query),
+                    executor,
+                    lambda: int(self.window.limit),
+                    on_settled=_settled
                 )
-            except Exception as e:
-                if 'Failed to set initialization attribute: 451' in str(e):
-                    logging.warning(f'Read only attribute {data["name"]}')
-                else:
-                    raise e
-        
-    
+            except OrderedErrors as e:
+                self.metrics.failures = len(e.errors)
+                raise e
+            finally:
+                logging.info(f'Batches in flight: {self.window.limit:.0f} of {self._max_pending}')
+
     def execute(self):
         logging.info(f'Loading {self._type} from {self._file_name}')
-        
-        def _receive(data: dict):
-            data.pop('id', None)
-            data.pop('number', None)
-            self._load_function(data)
-
-        on_each(
-            load(
-                self._file_name,
-                self._binary_mode
-            ),
-            _receive
-        )
+        self.metrics = Metrics(self.metrics.name)
+
+        items = self._positioned_records()
+        self.metrics.bytes = self._bytes_read()
+
+        try:
+            if self._workers > 1:
+                self._execute_concurrently(items)
+            else:
+                for _ in every_x(self.execute_batch, items, self.batch_size):
+                    pass
+        except BaseException as e:
+            if not isinstance(e, OrderedErrors):
+                self.metrics.failures += 1
+
+            if self._checkpointer:
+                self._checkpointer.save()
+                logging.error(
+                    f'Loaded {self._checkpointer.records} records, '
+                    'resume from there with --resume and the same --checkpoint-dir'
+                )
+            raise e
+        finally:
+            if self._workers == 1:
+                logging.info(f'SDK calls: {self._controller}')
+
+        if self._checkpointer and self._keep_checkpoint:
+            self._checkpointer.finish()
+        elif self._checkpointer:
+            self._checkpointer.clear()
+
+    def clear_checkpoint(self) -> None:
+        """
+        Removes the checkpoint of a finished load, kept for the commands it is part of to resume.
+        """
+        if self._checkpoint_dir is None:
+            return
+
+        if os.path.exists(file := checkpoint_file(self._file_name, self._checkpoint_dir)):
+            os.remove(file)
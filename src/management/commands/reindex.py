@@ -0,0 +1,74 @@
+# Copyright (c) 2022 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import logging
+import os
+
+from common.compression import is_compressed
+from common.delta import is_delta
+from common.file import detect_format, load_from
+from common.index import DEFAULT_STRIDE, IndexBuilder
+from common.metrics import Metrics
+
+
+class Reindex:
+    def __init__(
+        self,
+        file_name: str,
+        stride: int = DEFAULT_STRIDE
+    ):
+        """
+        Initializes the Reindex command.
+        Rebuilds the index sidecar of a backup from the backup alone,
+        such as one appended to, without connecting to a world.
+
+        Args:
+            file_name (str): The backup.
+            stride (int): The number of records between two offsets of the index.
+        """
+        self._file_name = file_name
+        self._stride = stride
+        self.metrics = Metrics('REINDEX')
+
+    def execute(self):
+        """
+        Executes the command.
+
+        Raises:
+            ValueError: If the backup is compressed or a delta, and cannot be indexed.
+        """
+        logging.info(f'Indexing {self._file_name}')
+        self.metrics = Metrics(self.metrics.name)
+
+        if is_compressed(self._file_name):
+            raise ValueError(f'{self._file_name} is compressed and cannot be indexed')
+
+        if is_delta(self._file_name):
+            raise ValueError(f'{self._file_name} is a delta and cannot be indexed')
+
+        file_format = detect_format(self._file_name)
+        builder = IndexBuilder(file_format, self._stride)
+
+        for position, record in load_from(self._file_name, file_format):
+            builder.add(position, record)
+
+        builder.index.write_sidecar(self._file_name)
+        self.metrics.records = builder.index.records
+        self.metrics.bytes = os.path.getsize(self._file_name)
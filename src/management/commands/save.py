@@ -18,29 +18,248 @@
 # LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
 # OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
 # WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
-import json
 import logging
-from dataclasses import asdict
+import os
+from typing import TYPE_CHECKING, Iterable
+
+from common.checksum import DEFAULT_ALGORITHM
+from common.checksum import SUFFIX as CHECKSUM_SUFFIX
+from common.codec import encode_many
+from common.compression import codec_for
+from common.columnar import ColumnarWriter, layout_for
+from common.delta import (ADD, CHANGE, DELETE, Differ, encode_operation,
+                          write_manifest)
+from common.file import DEFAULT_BUFFER_SIZE, RecordWriter, detect_format, load
+from common.index import DEFAULT_STRIDE, IndexBuilder
+from common.metrics import Metrics
+from common.pipeline import DEFAULT_MAX_PENDING, pipeline
+from common.region import Region, contains
+from common.throttle import RateController
+from common.tiles import TileWriter
 
-from common.file import append_to
-from common.func import on_each
 from .file_abc import FileABC
 
+if TYPE_CHECKING:
+    from korth_spirit import Instance
+
 
 class Save(FileABC):
+    def __init__(
+        self,
+        instance: 'Instance',
+        query_type: str,
+        file_name: str = 'backup.json',
+        binary_mode: bool = False,
+        file_format: str = 'json',
+        region: Region = None,
+        buffer_size: int = DEFAULT_BUFFER_SIZE,
+        flush_every: int = None,
+        index_stride: int = DEFAULT_STRIDE,
+        base: str = None,
+        compression: str = None,
+        serializers: int = 1,
+        max_pending: int = DEFAULT_MAX_PENDING,
+        controller: RateController = None,
+        checksum: str = DEFAULT_ALGORITHM
+    ):
+        """
+        Initializes the Save Query command.
+
+        Args:
+            instance (Instance): The instance.
+            query_type (str): The type of query to perform. { "attributes", "objects", "terrain" }
+            file_name (str): The file name.
+            binary_mode (bool): Whether or not to save the data in binary mode.
+            file_format (str): The backup format. { "json", "columnar", "tiles" }
+            region (Region): The cells to restrict objects to. Defaults to the whole world.
+            buffer_size (int): The number of bytes to buffer before writing to disk.
+            flush_every (int): The number of records to buffer before writing to disk.
+            index_stride (int): The number of records between two offsets of the index sidecar.
+            base (str): A full backup to save only the differences against.
+            compression (str): The codec to compress with. Defaults to the file extension's.
+            serializers (int): The number of threads encoding records.
+            max_pending (int): The number of record batches queued between two stages.
+            controller (RateController): Paces and retries the queries.
+            checksum (str): The algorithm to checksum every block with, None for no checksums. { "crc32", "blake2b" }
+        """
+        super().__init__(instance, query_type, file_name, binary_mode, file_format, region, controller)
+
+        self._buffer_size = buffer_size
+        self._flush_every = flush_every
+        self._index_stride = index_stride
+        self._base = base
+        self._compression = codec_for(file_name, compression)
+        self._serializers = serializers
+        self._max_pending = max_pending
+        self._checksum = checksum
+        self.stats = list()
+
+    def _open_writer(self) -> RecordWriter | ColumnarWriter:
+        """
+        Opens the writer of the configured backup format.
+
+        Returns:
+            RecordWriter | ColumnarWriter: The writer, a TileWriter for terrain tiles.
+        """
+        if self._tiles:
+            return TileWriter(
+                self._file_name,
+                compression=self._compression,
+                checksum=self._checksum_algorithm()
+            )
+
+        if self._file_format == 'columnar':
+            return ColumnarWriter(
+                self._file_name,
+                layout_for(self._type),
+                compression=self._compression,
+                checksum=self._checksum_algorithm()
+            )
+
+        return RecordWriter(
+            self._file_name,
+            self._binary_mode,
+            self._buffer_size,
+            self._flush_every,
+            self._compression,
+            checksum=self._checksum_algorithm()
+        )
+
+    def _checksum_algorithm(self) -> str | None:
+        """
+        Gets the algorithm of the checksum sidecar.
+        Appending to an existing backup without checksums would leave its earlier
+        blocks unchecksummed, so no checksums are written in that case.
+
+        Returns:
+            str | None: The algorithm, if checksums can be written.
+        """
+        if not self._checksum or os.path.exists(self._file_name + CHECKSUM_SUFFIX):
+            return self._checksum
+
+        if os.path.exists(self._file_name) and os.path.getsize(self._file_name) > 0:
+            logging.warning(f'Appending to {self._file_name} without checksums, none will be written')
+            return None
+
+        return self._checksum
+
+    def _index_builder(self) -> IndexBuilder | None:
+        """
+        Creates the builder of the index sidecar.
+        Appending to an existing backup would leave its earlier records
+        unindexed, so no index is written in that case.
+
+        Returns:
+            IndexBuilder | None: The builder, if an index can be written.
+        """
+        if os.path.exists(self._file_name) and os.path.getsize(self._file_name) > 0:
+            logging.warning(f'Appending to {self._file_name}, no index will be written')
+            return None
+
+        if self._compression:
+            logging.info(f'{self._file_name} is compressed, no index will be written')
+            return None
+
+        return IndexBuilder(self._file_format, self._index_stride)
+
+    def _base_records(self) -> Iterable[dict]:
+        """
+        Reads the base backup, restricted to the region if one is set.
+
+        Returns:
+            Iterable[dict]: The base records.
+        """
+        records = load(self._base, file_format=detect_format(self._base))
+
+        if self._region is None:
+            return records
+
+        return (record for record in records if contains(self._region, record))
+
+    def _execute_delta(self):
+        """
+        Saves only the records added, changed or deleted since the base backup.
+        """
+        logging.info(f'Saving {self._type} changes since {self._base} to {self._file_name}')
+
+        if os.path.exists(self._file_name) and os.path.getsize(self._file_name) > 0:
+            raise FileExistsError(f'Refusing to append a delta to {self._file_name}')
+
+        counts = {ADD: 0, CHANGE: 0, DELETE: 0}
+        self.metrics = Metrics(self.metrics.name)
+
+        with RecordWriter(
+            self._file_name,
+            buffer_size=self._buffer_size,
+            flush_every=self._flush_every,
+            compression=self._compression,
+            checksum=self._checksum_algorithm()
+        ) as writer:
+            for operation, record in Differ(self._type).diff(
+                self._base_records,
+                self._query_records()
+            ):
+                writer.write(encode_operation(operation, record))
+                counts[operation] += 1
+
+        write_manifest(
+            self._file_name,
+            self._base,
+            detect_format(self._base),
+            self._type.lower(),
+            counts
+        )
+        self.metrics.records = sum(counts.values())
+        self.metrics.bytes = os.path.getsize(self._file_name)
+        logging.info(f'Saved {counts} to {self._file_name}')
+
     def execute(self):
+        if self._base:
+            return self._execute_delta()
+
         logging.info(f'Saving {self._type} to {self._file_name}')
+        indexer = self._index_builder()
+        self.metrics = Metrics(self.metrics.name)
+        size = os.path.getsize(self._file_name) if os.path.exists(self._file_name) else 0
+
+        def _serialize(records: list) -> list:
+            if self._file_format == 'columnar':
+                return records
+
+            data = encode_many(records)
+
+            return [each.encode('utf-8') for each in data] if self._binary_mode else data
+
+        # The query, the encoding and the writes each run on their own thread. Region saves
+        # query cell by cell, overlapping the server's latency with the CPU and disk work;
+        # the whole world is queried at once, so its encoding only starts after the query.
+        with self._open_writer() as writer:
+            def _write(records: list, data: list):
+                positions = writer.write_many(data)
+
+                if indexer:
+                    for position, record in zip(positions, records):
+                        indexer.add(position, record)
+
+            self.stats = pipeline(
+                self._query_records(),
+                _serialize,
+                _write,
+                workers=self._serializers,
+                max_pending=self._max_pending,
+                ignore_exceptions=True,
+                names=('query', 'serialize', 'write'),
+                batched=True
+            )
+            self.metrics.records = writer.records_written
 
-        def _receive(data):
-            data = json.dumps(asdict(data), skipkeys=True, default=str)
+        self.metrics.failures = sum(each.failures for each in self.stats)
+        self.metrics.bytes = os.path.getsize(self._file_name) - size
+        logging.info(f'Queries: {self._controller}')
 
-            if self._binary_mode:
-                data = data.encode('utf-8')
+        if indexer:
+            indexer.index.write_sidecar(self._file_name)
 
-            append_to(self._file_name, data)
-        
-        on_each(
-            self._instance.query(self._query),
-            _receive,
-            ignore_exceptions=True
-        ) 
+        if self.metrics.failures:
+            # The records that could be written are kept, but the backup is not complete.
+            raise ValueError(f'{self._file_name} is incomplete: {self.metrics.failures} {self._type} could not be written')
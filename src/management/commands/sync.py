@@ -0,0 +1,130 @@
+# Copyright (c) 2022 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import logging
+from functools import partial
+
+from common.delta import CHANGE, Differ
+from common.func import on_each
+from common.metrics import Metrics
+from common.snapshot import Snapshot
+from common.throttle import RateController
+from management import sdk
+
+from .load import Load, _unpaced, load_record
+
+
+def delete_object(record, controller: RateController = None) -> None:
+    """
+    Deletes a live object.
+
+    Args:
+        record (dict): The object, as a mapping of the fields a query returns.
+        controller (RateController): Paces and retries the SDK call. Defaults to a single attempt.
+    """
+    call = controller.call if controller is not None else _unpaced
+
+    call(sdk.aw_object_delete, sdk.ObjectDeleteData(
+        number=record['number'],
+        x=record['x'],
+        z=record['z']
+    ))
+
+
+class Sync(Load):
+    def __init__(self, *args, dry_run: bool = False, **kwargs):
+        """
+        Initializes the Sync command.
+        Takes the same arguments as the Load command.
+
+        Args:
+            dry_run (bool): Whether to only report the changes instead of sending them.
+        """
+        super().__init__(*args, **kwargs)
+
+        self._dry_run = dry_run
+
+    def plan(self) -> tuple[list, list]:
+        """
+        Diffs the live world against the snapshot, matching records sharing an identity one for one.
+        The live world is read once and kept compact: live objects are held column by column,
+        and only the hashes of live terrain nodes and attributes are kept.
+
+        Returns:
+            tuple[list, list]: The live records to delete and the snapshot records to load.
+        """
+        differ = Differ(self._type)
+
+        if self._query != sdk.QueryEnum.OBJECT:
+            remaining = differ.hash_index(self._query_records())
+            loads = [record for _, record in differ.match(remaining, self._records())]
+
+            if missing := sum(map(len, remaining.values())):
+                logging.warning(f'Leaving {missing} {self._type} missing from the snapshot')
+
+            # Terrain nodes and attributes are overwritten in place.
+            return list(), loads
+
+        live = Snapshot.from_records(self._query_records())
+        remaining: dict[int, list[int]] = dict()
+        loads, changed = list(), set()
+
+        for identity, content in zip(live.identity, live.content):
+            remaining.setdefault(identity, list()).append(content)
+
+        for operation, record in differ.match(remaining, self._records()):
+            loads.append(record)
+
+            if operation == CHANGE:
+                changed.add(differ.identity(record))
+
+        # A changed object is replaced: its only live copy goes before the snapshot's is loaded.
+        # Live objects left unmatched are deleted, one per unmatched hash.
+        deletes: list[int] = list()
+        for index, (identity, content) in enumerate(zip(live.identity, live.content)):
+            if identity in changed:
+                deletes.append(index)
+            elif (contents := remaining.get(identity)) and content in contents:
+                contents.remove(content)
+                deletes.append(index)
+
+        return list(live.records(deletes)), loads
+
+    def execute(self):
+        logging.info(f'Syncing {self._type} to {self._file_name}')
+        self.metrics = Metrics(self.metrics.name)
+        deletes, loads = self.plan()
+        logging.info(f'{len(deletes)} {self._type} to delete, {len(loads)} to load')
+
+        if self._dry_run:
+            return
+
+        def _count(func):
+            def _counted(record):
+                func(record)
+                self.metrics.records += 1
+            return _counted
+
+        try:
+            on_each(deletes, _count(partial(delete_object, controller=self._controller)))
+            on_each(loads, _count(partial(load_record, self._query, controller=self._controller)))
+        except Exception as e:
+            self.metrics.failures += 1
+            raise e
@@ -0,0 +1,158 @@
+# Copyright (c) 2022 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import logging
+import os
+from itertools import islice
+
+from common.checksum import DEFAULT_ALGORITHM
+from common.codec import dumps
+from common.columnar import DEFAULT_BLOCK_SIZE, OBJECTS, ColumnarWriter
+from common.compression import codec_for
+from common.delta import is_delta
+from common.file import DEFAULT_BUFFER_SIZE, RecordWriter, detect_format, load
+from common.index import DEFAULT_STRIDE, IndexBuilder
+from common.metrics import Metrics
+from common.region import Region
+
+
+class Transform:
+    def __init__(
+        self,
+        file_name: str,
+        output: str,
+        translate: tuple[int, int, int] = (0, 0, 0),
+        angle: float = 0.0,
+        pivot: tuple[int, int] = (0, 0),
+        region: Region = None,
+        models: dict[str, str] = None,
+        file_format: str = 'json',
+        binary_mode: bool = False,
+        compression: str = None,
+        checksum: str = DEFAULT_ALGORITHM,
+        index_stride: int = DEFAULT_STRIDE,
+        block_size: int = DEFAULT_BLOCK_SIZE
+    ):
+        """
+        Initializes the Transform command.
+        Streams an objects backup through a transformation a block at a time,
+        without connecting to a world, writing a new backup ready to be loaded.
+
+        Args:
+            file_name (str): The backup to transform.
+            output (str): The backup to write.
+            translate (tuple[int, int, int]): The x, y and z to add to every object.
+            angle (float): The degrees to rotate by about the pivot, in the direction yaw grows in.
+            pivot (tuple[int, int]): The x and z to rotate about.
+            region (Region): The cells of the source backup to keep objects from. Defaults to every cell.
+            models (dict[str, str]): The new name of every model to rename.
+            file_format (str): The format of the new backup. { "json", "columnar" }
+            binary_mode (bool): Whether or not to write the new backup in binary mode.
+            compression (str): The codec to compress with. Defaults to the output extension's.
+            checksum (str): The algorithm to checksum every block with, None for no checksums. { "crc32", "blake2b" }
+            index_stride (int): The number of records between two offsets of the index sidecar.
+            block_size (int): The number of objects transformed at once.
+        """
+        self._file_name = file_name
+        self._output = output
+        self._translate = translate
+        self._angle = angle
+        self._pivot = pivot
+        self._region = region
+        self._models = models or dict()
+        self._file_format = file_format
+        self._binary_mode = binary_mode
+        self._compression = codec_for(output, compression) if output else compression
+        self._checksum = checksum
+        self._index_stride = index_stride
+        self._block_size = block_size
+        self.metrics = Metrics('TRANSFORM')
+
+    def _open_writer(self) -> RecordWriter | ColumnarWriter:
+        """
+        Opens the writer of the configured backup format.
+
+        Returns:
+            RecordWriter | ColumnarWriter: The writer.
+        """
+        if self._file_format == 'columnar':
+            return ColumnarWriter(
+                self._output,
+                OBJECTS,
+                self._block_size,
+                compression=self._compression,
+                checksum=self._checksum
+            )
+
+        return RecordWriter(
+            self._output,
+            self._binary_mode,
+            DEFAULT_BUFFER_SIZE,
+            compression=self._compression,
+            checksum=self._checksum
+        )
+
+    def execute(self):
+        """
+        Executes the command.
+
+        Raises:
+            ValueError: If the backup is a delta, or does not hold objects.
+            FileExistsError: If the new backup already holds records.
+        """
+        # NumPy is only imported once a transform runs, not whenever the offline commands are registered.
+        from common.transform import Transformation
+
+        logging.info(f'Transforming {self._file_name} to {self._output}')
+        self.metrics = Metrics(self.metrics.name)
+
+        if is_delta(self._file_name):
+            raise ValueError(f'{self._file_name} is a delta, transform the backups it was taken from')
+
+        if os.path.exists(self._output) and os.path.getsize(self._output) > 0:
+            raise FileExistsError(f'Refusing to append a transformed backup to {self._output}')
+
+        transformation = Transformation(self._translate, self._angle, self._pivot, self._region, self._models)
+        indexer = None if self._compression else IndexBuilder(self._file_format, self._index_stride)
+        records = load(self._file_name, file_format=detect_format(self._file_name))
+        read = 0
+
+        with self._open_writer() as writer:
+            while block := list(islice(records, self._block_size)):
+                read += len(block)
+                block = transformation.apply(block)
+
+                if self._file_format == 'columnar':
+                    positions = writer.write_many(block)
+                else:
+                    data = [dumps(record) for record in block]
+                    positions = writer.write_many([each.encode('utf-8') for each in data] if self._binary_mode else data)
+
+                if indexer:
+                    for position, record in zip(positions, block):
+                        indexer.add(position, record)
+
+            self.metrics.records = writer.records_written
+
+        if indexer:
+            indexer.index.write_sidecar(self._output)
+
+        self.metrics.bytes = os.path.getsize(self._output) if os.path.exists(self._output) else 0
+        logging.info(f'Transformed {self.metrics.records} of {read} objects to {self._output}')
@@ -0,0 +1,92 @@
+# Copyright (c) 2022 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from common.metrics import Metrics
+from common.verify import DEFAULT_RANGE_SIZE, plan, verify_range
+
+
+class Verify:
+    def __init__(
+        self,
+        file_name: str,
+        workers: int = None,
+        range_size: int = DEFAULT_RANGE_SIZE
+    ):
+        """
+        Initializes the Verify command.
+        Checks the checksums and records of a backup without connecting to a world,
+        splitting it into ranges on record boundaries verified by a pool of processes.
+
+        Args:
+            file_name (str): The backup.
+            workers (int): The number of processes. Defaults to one per core.
+            range_size (int): The number of bytes verified by a process at a time.
+        """
+        self._file_name = file_name
+        self._workers = workers
+        self._range_size = range_size
+        self.problems = list()
+        self.metrics = Metrics('VERIFY')
+
+    def execute(self):
+        """
+        Executes the command.
+
+        Raises:
+            ValueError: If the backup is corrupt.
+        """
+        logging.info(f'Verifying {self._file_name}')
+        self.metrics = Metrics(self.metrics.name)
+
+        target, ranges, self.problems = plan(self._file_name, self._range_size)
+        worker = partial(
+            verify_range,
+            self._file_name,
+            target['codec'],
+            target['file_format'],
+            target['algorithm']
+        )
+
+        if len(ranges) > 1 and self._workers != 1:
+            with ProcessPoolExecutor(max_workers=self._workers or os.cpu_count()) as executor:
+                results = list(executor.map(worker, ranges))
+        else:
+            results = [worker(chunks) for chunks in ranges]
+
+        for records, verified, problems in results:
+            self.metrics.records += records
+            self.metrics.bytes += verified
+            self.problems.extend(problems)
+
+        self.metrics.failures = len(self.problems)
+
+        for problem in self.problems:
+            print(f'{self._file_name}: {problem}')
+
+        checksums = f'{target["algorithm"]} checksums' if target['algorithm'] else 'no checksums'
+        print(f'{self._file_name}: {self.metrics.records} records, {self.metrics.bytes} bytes verified ({checksums}), {len(self.problems)} problems')
+
+        if self.problems:
+            raise ValueError(f'{self._file_name} is corrupt: {len(self.problems)} problems')
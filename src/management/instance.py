@@ -18,11 +18,14 @@
 # LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
 # OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
 # WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
-from korth_spirit import ConfigurableInstance
-from korth_spirit.configuration import JsonConfiguration
+import json
+import os
 
+from management import sdk
+from management.simulator import SimulatedInstance, Simulator
 
-class ReceiverInstance(ConfigurableInstance):
+
+class ReceiverInstance:
     def __init__(
         self,
         config_file: str = 'configuration.json'
@@ -30,11 +33,34 @@ class ReceiverInstance(ConfigurableInstance):
         """
         Initializes the receiver instance.
         Symbolizes the receiver in the Command Design Pattern.
+        A "simulator" section in the configuration file connects to a
+        simulated world instead, and every command of the process calls into it.
 
         Args:
-            invoker (Invoker): The command invoker.
             config_file (str): The configuration file.
         """
-        super().__init__(
-            configuration=JsonConfiguration(config_file),
-        )
+        settings = dict()
+
+        if os.path.exists(config_file):
+            with open(config_file) as f:
+                settings = json.load(f)
+
+        if settings.get('simulator') is not None:
+            simulator = Simulator(**settings['simulator'])
+            sdk.use(simulator)
+            self._instance = SimulatedInstance(simulator)
+        else:
+            self._instance = sdk.ConfigurableInstance(
+                configuration=sdk.JsonConfiguration(config_file),
+            )
+
+    def __enter__(self) -> "ReceiverInstance":
+        self._instance.__enter__()
+
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self._instance.__exit__(exc_type, exc_val, exc_tb)
+
+    def __getattr__(self, name: str):
+        return getattr(self._instance, name)
@@ -18,10 +18,56 @@
 # LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
 # OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
 # WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
-from korth_spirit import Instance
+from functools import partial
+from typing import TYPE_CHECKING
+
+from common.checkpoint import DEFAULT_EVERY
+from common.checksum import DEFAULT_ALGORITHM
+from common.file import DEFAULT_BUFFER_SIZE
+from common.index import DEFAULT_STRIDE
+from common.metrics import Metrics, execute_measured
+from common.pipeline import DEFAULT_BATCH_SIZE
+from common.summary import DEFAULT_HISTOGRAMS, DEFAULT_TOP
+from common.throttle import (AIMD, DEFAULT_MAX_RATE, DEFAULT_RATE,
+                             DEFAULT_RETRIES, RateController)
+from common.verify import DEFAULT_RANGE_SIZE
 
 import management.commands as C
-from management.protocols import Command
+from management.protocols import Command, Sink
+
+if TYPE_CHECKING:
+    from korth_spirit import Instance
+
+
+def _option(args, name: str, default):
+    """
+    Gets an argument, falling back to a default when it is missing or left unset.
+
+    Args:
+        args (dict): The arguments.
+        name (str): The name of the argument.
+        default (Any): The default.
+
+    Returns:
+        Any: The value.
+    """
+    value = getattr(args, name, None)
+
+    return default if value is None else value
+
+def _checksum(args) -> str | None:
+    """
+    Gets the checksum algorithm to write backups with, none meaning no checksums.
+
+    Args:
+        args (dict): The arguments.
+
+    Returns:
+        str | None: The algorithm, if any.
+    """
+    checksum = _option(args, 'checksum', DEFAULT_ALGORITHM)
+
+    return None if checksum == 'none' else checksum
 
 
 class LocalInvoker:
@@ -31,6 +77,8 @@ class LocalInvoker:
         """
         self._history: list[Command] = list()
         self._commands: dict[str, Command] = dict()
+        self._metrics: list[Metrics] = list()
+        self._sinks: list[Sink] = list()
 
     @property
     def history(self) -> list:
@@ -42,6 +90,30 @@ class LocalInvoker:
         """
         return self._history
 
+    @property
+    def metrics(self) -> list[Metrics]:
+        """
+        Gets the metrics of every invocation, failed ones included.
+
+        Returns:
+            list[Metrics]: The metrics, oldest first.
+        """
+        return self._metrics
+
+    def add_sink(self, sink: Sink) -> "LocalInvoker":
+        """
+        Adds a sink to report the metrics to after every invocation.
+
+        Args:
+            sink (Sink): The sink to add.
+
+        Returns:
+            LocalInvoker: The current instance.
+        """
+        self._sinks.append(sink)
+
+        return self
+
     def unregister(self, name: str) -> "LocalInvoker":
         """
         Unregisters a command.
@@ -86,13 +158,80 @@ class LocalInvoker:
         if not command:
             raise KeyError(f"Command '{name}' not found.")
 
-        command.execute()
+        metrics, error = execute_measured(command, name)
+        self._metrics.append(metrics)
+
+        for sink in self._sinks:
+            sink.write(self._metrics)
+
+        if error is not None:
+            raise error
+
         self._history.append(command)
 
         return self
 
     @staticmethod
-    def create_loaded(instance: Instance, args) -> "LocalInvoker":
+    def create_offline(args) -> "LocalInvoker":
+        """
+        Creates a loaded instance of the LocalInvoker class
+        This invoker has preloaded commands working on files alone,
+        which neither connect to a world nor load the SDK.
+
+        Args:
+            args (dict): The arguments.
+
+        Returns:
+            LocalInvoker: Fluent interface.
+        """
+        return LocalInvoker()\
+            .register(
+                "REINDEX",
+                C.Reindex(
+                    getattr(args, 'file', None),
+                    _option(args, 'stride', DEFAULT_STRIDE)
+                )
+            )\
+            .register(
+                "INSPECT",
+                C.Inspect(
+                    getattr(args, 'file', None),
+                    region=getattr(args, 'region', None),
+                    where=getattr(args, 'where', ()),
+                    histograms=_option(args, 'histograms', DEFAULT_HISTOGRAMS),
+                    top=_option(args, 'top', DEFAULT_TOP),
+                    head=getattr(args, 'head', None),
+                    extract=getattr(args, 'extract', None),
+                    as_json=getattr(args, 'json', False)
+                )
+            )\
+            .register(
+                "TRANSFORM",
+                C.Transform(
+                    getattr(args, 'file', None),
+                    getattr(args, 'output', None),
+                    translate=_option(args, 'translate', (0, 0, 0)),
+                    angle=_option(args, 'rotate', 0.0),
+                    pivot=_option(args, 'pivot', (0, 0)),
+                    region=getattr(args, 'region', None),
+                    models=dict(getattr(args, 'rename', ())),
+                    file_format=getattr(args, 'format', 'json'),
+                    binary_mode=getattr(args, 'binary', False),
+                    compression=getattr(args, 'compress', None),
+                    checksum=_checksum(args)
+                )
+            )\
+            .register(
+                "VERIFY",
+                C.Verify(
+                    getattr(args, 'file', None),
+                    workers=getattr(args, 'workers', None),
+                    range_size=_option(args, 'range_size', DEFAULT_RANGE_SIZE)
+                )
+            )
+
+    @staticmethod
+    def create_loaded(instance: 'Instance', args) -> "LocalInvoker":
         """
         Creates a loaded instance of the LocalInvoker class
         This invoker has preloaded commands targetting the instance.
@@ -104,16 +243,88 @@ class LocalInvoker:
         Returns:
             LocalInvoker: Fluent interface.
         """
-        def _l_factory(query_type: str, file_name: str = getattr(args, 'file', None)):
-            return C.Load(instance, query_type, file_name, getattr(args, 'binary', False))
+        # Only commands connecting to a world pay for the SDK and the simulator.
+        from management.instance import ReceiverInstance
+
+        instance_factory = partial(ReceiverInstance, getattr(args, 'config', 'configuration.json'))
+        aggregate = partial(
+            C.Aggregate,
+            concurrent=getattr(args, 'parallel', False),
+            instance_factory=instance_factory
+        )
+
+        def _controller() -> RateController:
+            # Every command adapts its own rate, starting over from the configured one.
+            rate = _option(args, 'rate', DEFAULT_RATE)
+
+            return RateController(
+                AIMD(rate, maximum=_option(args, 'max_rate', DEFAULT_MAX_RATE)) if rate else None,
+                _option(args, 'retries', DEFAULT_RETRIES),
+                retry_unsafe=getattr(args, 'retry_object_loads', False)
+            )
+
+        def _l_factory(
+            query_type: str,
+            file_name: str = getattr(args, 'file', None),
+            command: type = C.Load,
+            **kwargs
+        ):
+            return command(
+                instance,
+                query_type,
+                file_name,
+                getattr(args, 'binary', False),
+                file_format=getattr(args, 'format', 'json'),
+                region=getattr(args, 'region', None),
+                workers=getattr(args, 'workers', 1),
+                max_pending=getattr(args, 'max_pending', None),
+                instance_factory=instance_factory,
+                checkpoint_every=_option(args, 'checkpoint_every', DEFAULT_EVERY),
+                resume=getattr(args, 'resume', False),
+                checkpoint_dir=getattr(args, 'checkpoint_dir', None),
+                controller=_controller(),
+                batch_size=_option(args, 'batch_size', DEFAULT_BATCH_SIZE),
+                **kwargs
+            )
 
-        def _s_factory(query_type: str, file_name: str = getattr(args, 'file', None)):
-            return C.Save(instance, query_type, file_name, getattr(args, 'binary', False))
+        def _y_factory(query_type: str, file_name: str = getattr(args, 'file', None)):
+            return _l_factory(
+                query_type,
+                file_name,
+                C.Sync,
+                dry_run=getattr(args, 'dry_run', False)
+            )
+
+        def _s_factory(
+            query_type: str,
+            file_name: str = getattr(args, 'file', None),
+            base: str = getattr(args, 'base', None)
+        ):
+            return C.Save(
+                instance,
+                query_type,
+                file_name,
+                getattr(args, 'binary', False),
+                file_format=getattr(args, 'format', 'json'),
+                region=getattr(args, 'region', None),
+                buffer_size=_option(args, 'buffer_size', DEFAULT_BUFFER_SIZE),
+                flush_every=getattr(args, 'flush_every', None),
+                base=base,
+                compression=getattr(args, 'compress', None),
+                serializers=getattr(args, 'serializers', 1),
+                controller=_controller(),
+                checksum=_checksum(args)
+            )
+
+        def _base(query_type: str):
+            base = getattr(args, 'base', None)
+            return f"{base}_{query_type}" if base else None
 
         actions: dict[str, callable] = {
             'DELETE': C.Delete,
             'LOAD': _l_factory,
-            'SAVE': _s_factory
+            'SAVE': _s_factory,
+            'SYNC': _y_factory
         }
         items: list[str] = [
             'ATTRIBUTES',
@@ -130,7 +341,7 @@ class LocalInvoker:
         invoker\
             .register(
                 "DELETE ALL",
-                C.Aggregate(
+                aggregate(
                     C.Delete('attributes'),
                     C.Delete('objects'),
                     C.Delete('terrain')
@@ -138,22 +349,32 @@ class LocalInvoker:
             )
 
         if not getattr(args, 'file', None):
-            return
+            return invoker
 
         invoker\
             .register(
                 "LOAD ALL",
-                C.Aggregate(
-                    _l_factory('attributes', f"{args.file}_attributes"),
-                    _l_factory('objects', f"{args.file}_objects"),
-                    _l_factory('terrain', f"{args.file}_terrain")
+                aggregate(
+                    _l_factory('attributes', f"{args.file}_attributes", keep_checkpoint=True),
+                    _l_factory('objects', f"{args.file}_objects", keep_checkpoint=True),
+                    _l_factory('terrain', f"{args.file}_terrain", keep_checkpoint=True)
                 )
             )\
             .register(
                 "SAVE ALL",
-                C.Aggregate(
-                    _s_factory('attributes', f"{args.file}_attributes"),
-                    _s_factory('objects', f"{args.file}_objects"),
-                    _s_factory('terrain', f"{args.file}_terrain")
+                aggregate(
+                    _s_factory('attributes', f"{args.file}_attributes", _base('attributes')),
+                    _s_factory('objects', f"{args.file}_objects", _base('objects')),
+                    _s_factory('terrain', f"{args.file}_terrain", _base('terrain'))
+                )
+            )\
+            .register(
+                "SYNC ALL",
+                aggregate(
+                    _y_factory('attributes', f"{args.file}_attributes"),
+                    _y_factory('objects', f"{args.file}_objects"),
+                    _y_factory('terrain', f"{args.file}_terrain")
                 )
             )
+
+        return invoker
@@ -20,10 +20,13 @@
 # WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
 __all__ = [
+    'BatchCommand',
     'Command',
-    'Invoker'
+    'Invoker',
+    'Sink'
 ]
 
 
-from .command import Command
+from .command import BatchCommand, Command
 from .invoker import Invoker
+from .sink import Sink
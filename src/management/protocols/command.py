@@ -26,3 +26,18 @@ class Command(Protocol):
         Executes the command.
         """
         ...
+
+
+class BatchCommand(Command, Protocol):
+    batch_size: int
+
+    def execute_batch(self, batch: list):
+        """
+        Executes the command on a batch of its records.
+        Commands taking this contract drive their own execute through it,
+        batch_size records at a time, so per record work is done in bulk.
+
+        Args:
+            batch (list): The records.
+        """
+        ...
@@ -21,6 +21,7 @@
 from typing import Protocol
 
 from .command import Command
+from .sink import Sink
 
 
 class Invoker(Protocol):
@@ -31,6 +32,22 @@ class Invoker(Protocol):
         """
         ...
 
+    @property
+    def metrics(self) -> list:
+        """
+        Gets the metrics of every invocation, failed ones included.
+        """
+        ...
+
+    def add_sink(self, sink: Sink) -> "Invoker":
+        """
+        Adds a sink to report the metrics to after every invocation.
+
+        Args:
+            sink: The sink to add.
+        """
+        ...
+
     def unregister(self, name: str) -> "Invoker":
         """
         Unregisters a command.
@@ -0,0 +1,78 @@
+# Copyright (c) 2022 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import importlib
+from types import SimpleNamespace
+from typing import Any
+
+# Where every name the commands use lives in korth_spirit.
+EXPORTS: dict[str, tuple[str, ...]] = {
+    'korth_spirit': ('Instance', 'ConfigurableInstance'),
+    'korth_spirit.configuration': ('JsonConfiguration',),
+    'korth_spirit.data': ('ObjectLoadData', 'TerrainNodeData', 'ObjectDeleteData'),
+    'korth_spirit.query': ('QueryEnum',),
+    'korth_spirit.sdk': (
+        'aw_object_load', 'aw_object_delete', 'aw_terrain_load_node',
+        'aw_delete_all_objects', 'aw_terrain_delete_all', 'aw_world_attributes_reset'
+    ),
+    'korth_spirit.sdk.enums': ('AttributeEnum',),
+    'korth_spirit.sdk.write_data': ('write_data',),
+}
+
+_backend: Any = None
+
+
+def use(backend: Any) -> None:
+    """
+    Replaces the SDK every command calls into for the rest of the process,
+    such as with a simulator.
+
+    Args:
+        backend (Any): An object holding every name of EXPORTS.
+    """
+    global _backend
+
+    _backend = backend
+
+def korth_spirit() -> SimpleNamespace:
+    """
+    Collects the names the commands use from korth_spirit.
+
+    Returns:
+        SimpleNamespace: The SDK.
+    """
+    namespace = SimpleNamespace()
+
+    for module_name, names in EXPORTS.items():
+        module = importlib.import_module(module_name)
+
+        for name in names:
+            setattr(namespace, name, getattr(module, name))
+
+    return namespace
+
+def __getattr__(name: str) -> Any:
+    # The SDK is only imported once something is looked up in it.
+    global _backend
+
+    if _backend is None:
+        _backend = korth_spirit()
+
+    return getattr(_backend, name)
@@ -0,0 +1,492 @@
+# Copyright (c) 2022 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from enum import Enum
+
+from common.index import cell_of
+from common.throttle import THROTTLED, TRANSIENT
+
+DISTRIBUTIONS = ('constant', 'uniform', 'normal', 'lognormal', 'exponential')
+
+
+class QueryEnum(Enum):
+    OBJECT = 1
+    TERRAIN = 2
+    WORLD = 3
+
+
+class _AttributeEnum:
+    def __getitem__(self, name: str) -> str:
+        return name
+
+
+@dataclass
+class CellObjectData:
+    type: int = None
+    id: int = None
+    number: int = None
+    owner: int = None
+    build_timestamp: int = None
+    x: int = None
+    y: int = None
+    z: int = None
+    yaw: int = None
+    tilt: int = None
+    roll: int = None
+    model: str = None
+    description: str = None
+    action: str = None
+
+
+@dataclass
+class ObjectLoadData:
+    owner: int = None
+    build_timestamp: int = None
+    type: int = None
+    x: int = None
+    y: int = None
+    z: int = None
+    yaw: int = None
+    tilt: int = None
+    roll: int = None
+    model: str = None
+    description: str = None
+    action: str = None
+    data: bytes = None
+    callback_reference: str = None
+
+
+@dataclass
+class TerrainNodeData:
+    page_x: int = None
+    page_z: int = None
+    node_x: int = None
+    node_z: int = None
+    node_size: int = None
+    heights: list = field(default_factory=list)
+    textures: list = field(default_factory=list)
+
+
+@dataclass
+class AttributeData:
+    name: str = None
+    value: str = None
+    typed: str = None
+
+
+@dataclass
+class ObjectDeleteData:
+    number: int = None
+    x: int = None
+    z: int = None
+    id: int = 0
+
+
+def synthetic_object(index: int) -> CellObjectData:
+    """
+    Creates an object shaped like the ones a world query returns.
+
+    Args:
+        index (int): The number of the object.
+
+    Returns:
+        CellObjectData: The object.
+    """
+    return CellObjectData(
+        type=1, id=index, number=index, owner=index % 50, build_timestamp=1650000000 + index,
+        x=index * 37 % 200000 - 100000, y=index % 300, z=index * 91 % 200000 - 100000,
+        yaw=index % 3600, tilt=0, roll=0, model=f'wall{index % 40:02}.rwx',
+        description=f'sign {index % 7}', action='create solid off; activate url www.example.com'
+    )
+
+def synthetic_node(index: int) -> TerrainNodeData:
+    """
+    Creates a terrain node of 8x8 cells.
+
+    Args:
+        index (int): The number of the node.
+
+    Returns:
+        TerrainNodeData: The node.
+    """
+    return TerrainNodeData(
+        page_x=index // 64, page_z=index // 64 % 16, node_x=index % 8 * 8, node_z=index // 8 % 8 * 8,
+        node_size=8, heights=[index % 100] * 64, textures=[index % 16] * 64
+    )
+
+
+class SimulatedError(Exception):
+    def __init__(self, call: str, reason: str):
+        """
+        Raised when the simulator fails a call.
+
+        Args:
+            call (str): The name of the SDK function.
+            reason (str): Why it failed. { "error", "rate limited" }
+        """
+        self.call = call
+        self.reason = reason
+
+        super().__init__(f'{call} failed: {reason}')
+
+    def __reduce__(self):
+        # Lets the error cross back from worker processes.
+        return SimulatedError, (self.call, self.reason)
+
+    @property
+    def kind(self) -> str:
+        """
+        Classifies the failure for retries, rate limits being throttling
+        and every other simulated failure being transient.
+
+        Returns:
+            str: The kind of failure. { "throttled", "transient" }
+        """
+        return THROTTLED if self.reason == 'rate limited' else TRANSIENT
+
+
+@dataclass
+class Latency:
+    distribution: str = 'constant'
+    mean: float = 0.0
+    spread: float = 0.0
+
+    def __post_init__(self):
+        if self.distribution not in DISTRIBUTIONS:
+            raise ValueError(f'Unknown latency distribution {self.distribution}.')
+
+    def sample(self, rng: random.Random) -> float:
+        """
+        Draws a round trip time.
+        The spread is the half width of a uniform distribution, the standard
+        deviation of a normal one and the sigma of a lognormal one.
+
+        Args:
+            rng (random.Random): The random number generator.
+
+        Returns:
+            float: The seconds, never negative.
+        """
+        if self.distribution == 'uniform':
+            value = rng.uniform(self.mean - self.spread, self.mean + self.spread)
+        elif self.distribution == 'normal':
+            value = rng.gauss(self.mean, self.spread)
+        elif self.distribution == 'lognormal' and self.mean > 0:
+            # Keeps the mean, while the sigma stretches the tail.
+            value = self.mean * rng.lognormvariate(-self.spread ** 2 / 2, self.spread)
+        elif self.distribution == 'exponential' and self.mean > 0:
+            value = rng.expovariate(1 / self.mean)
+        else:
+            value = self.mean
+
+        return max(value, 0.0)
+
+
+@dataclass
+class CallProfile:
+    latency: Latency = field(default_factory=Latency)
+    rate: float = None
+    throttle: str = 'delay'
+    error_rate: float = 0.0
+
+    @staticmethod
+    def parse(settings: dict) -> "CallProfile":
+        """
+        Creates a profile from its configuration.
+
+        Args:
+            settings (dict): The configuration, with latency as a mapping.
+
+        Returns:
+            CallProfile: The profile.
+        """
+        settings = dict(settings)
+        settings['latency'] = Latency(**settings.get('latency', dict()))
+
+        return CallProfile(**settings)
+
+
+class RateLimiter:
+    def __init__(self, rate: float):
+        """
+        Initializes a token bucket refilling rate tokens per second,
+        holding at most one second worth of them.
+
+        Args:
+            rate (float): The number of calls per second.
+        """
+        self._rate = rate
+        self._tokens = rate
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, wait: bool = True) -> bool:
+        """
+        Takes a token.
+
+        Args:
+            wait (bool): Whether to wait for a token rather than give up.
+
+        Returns:
+            bool: Whether a token was taken.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self._rate, self._tokens + (now - self._updated) * self._rate)
+            self._updated = now
+            self._tokens -= 1
+
+            if self._tokens >= 0:
+                return True
+
+            if not wait:
+                self._tokens += 1
+                return False
+
+            delay = -self._tokens / self._rate
+
+        time.sleep(delay)
+
+        return True
+
+
+class Simulator:
+    # The SDK names the commands look up through management.sdk.
+    QueryEnum = QueryEnum
+    AttributeEnum = _AttributeEnum()
+    ObjectLoadData = ObjectLoadData
+    TerrainNodeData = TerrainNodeData
+    ObjectDeleteData = ObjectDeleteData
+
+    def __init__(
+        self,
+        objects: int = 0,
+        terrain: int = 0,
+        attributes: int = 64,
+        seed: int = None,
+        default: dict = None,
+        calls: dict[str, dict] = None
+    ):
+        """
+        Initializes a simulated world server.
+        Every call waits for a latency drawn from its profile, is held to the
+        profile's rate and fails at its error rate. The world starts out with
+        synthetic records; loaded objects are added to it and deleted objects,
+        synthetic or loaded, are no longer returned by queries.
+
+        Args:
+            objects (int): The number of objects the world starts with.
+            terrain (int): The number of terrain nodes the world starts with.
+            attributes (int): The number of world attributes.
+            seed (int): Seeds the latencies and errors, for reproducible runs.
+            default (dict): The profile of every call, see CallProfile.
+            calls (dict[str, dict]): Profiles of specific calls, such as "aw_object_load" or "query".
+        """
+        self.objects = objects
+        self.terrain = terrain
+        self.attributes = attributes
+        self.loaded: list[ObjectLoadData] = list()
+        self.deleted: set[int] = set()
+        self.calls: dict[str, int] = dict()
+        self.failures: dict[str, int] = dict()
+
+        self._rng = random.Random(seed)
+        self._default = CallProfile.parse(default or dict())
+        self._profiles = {
+            name: CallProfile.parse({**(default or dict()), **settings})
+            for name, settings in (calls or dict()).items()
+        }
+        self._limiters: dict[str, RateLimiter] = dict()
+        self._lock = threading.Lock()
+        self._by_cell: dict = None
+
+    def _call(self, name: str) -> None:
+        """
+        Applies the profile of a call.
+
+        Args:
+            name (str): The name of the SDK function.
+
+        Raises:
+            SimulatedError: If the call is rate limited or fails.
+        """
+        profile = self._profiles.get(name, self._default)
+
+        with self._lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+            latency = profile.latency.sample(self._rng)
+            failed = profile.error_rate > 0 and self._rng.random() < profile.error_rate
+
+            if profile.rate and name not in self._limiters:
+                self._limiters[name] = RateLimiter(profile.rate)
+
+        if profile.rate and not self._limiters[name].acquire(profile.throttle != 'reject'):
+            self._fail(name, 'rate limited')
+
+        if latency:
+            time.sleep(latency)
+
+        if failed:
+            self._fail(name, 'error')
+
+    def _fail(self, name: str, reason: str) -> None:
+        with self._lock:
+            self.failures[name] = self.failures.get(name, 0) + 1
+
+        logging.debug(f'Simulating a failure of {name}: {reason}')
+        raise SimulatedError(name, reason)
+
+    def query(self, query: QueryEnum, x: int = None, z: int = None) -> list:
+        """
+        Queries the world, or a single cell of it.
+
+        Args:
+            query (QueryEnum): The type of records.
+            x (int): The cell's x coordinate.
+            z (int): The cell's z coordinate.
+
+        Returns:
+            list: The records.
+        """
+        self._call('query')
+
+        if query == QueryEnum.TERRAIN:
+            return [synthetic_node(index) for index in range(self.terrain)]
+
+        if query == QueryEnum.WORLD:
+            return [
+                AttributeData(name=f'ATTRIBUTE_{index}', value=str(index), typed='str')
+                for index in range(self.attributes)
+            ]
+
+        if x is None or z is None:
+            return [
+                synthetic_object(index) for index in range(self.objects) if index not in self.deleted
+            ] + [
+                self._loaded_object(index)
+                for index in range(len(self.loaded))
+                if self.objects + index not in self.deleted
+            ]
+
+        if self._by_cell is None:
+            self._by_cell = dict()
+
+            for index in range(self.objects):
+                record = synthetic_object(index)
+                self._by_cell.setdefault(cell_of(record.x, record.z), list()).append(index)
+
+        return [
+            synthetic_object(index) for index in self._by_cell.get((x, z), ()) if index not in self.deleted
+        ] + [
+            self._loaded_object(index)
+            for index, record in enumerate(self.loaded)
+            if cell_of(record.x, record.z) == (x, z) and self.objects + index not in self.deleted
+        ]
+
+    def _loaded_object(self, index: int) -> CellObjectData:
+        """
+        Gets a loaded object as a query returns it, numbered after the synthetic ones.
+
+        Args:
+            index (int): The index of the object in the loaded objects.
+
+        Returns:
+            CellObjectData: The object.
+        """
+        data = self.loaded[index]
+        number = self.objects + index
+
+        return CellObjectData(
+            type=data.type, id=number, number=number, owner=data.owner,
+            build_timestamp=data.build_timestamp, x=data.x, y=data.y, z=data.z,
+            yaw=data.yaw, tilt=data.tilt, roll=data.roll, model=data.model,
+            description=data.description, action=data.action
+        )
+
+    def aw_object_load(self, data: ObjectLoadData) -> int:
+        self._call('aw_object_load')
+        self.loaded.append(data)
+
+        return 0
+
+    def aw_object_delete(self, data: ObjectDeleteData) -> int:
+        self._call('aw_object_delete')
+
+        # Objects are numbered as queries return them, the loaded ones after the synthetic ones.
+        with self._lock:
+            if data.number is None or not 0 <= data.number < self.objects + len(self.loaded) or data.number in self.deleted:
+                return 1
+
+            self.deleted.add(data.number)
+
+        return 0
+
+    def aw_terrain_load_node(self, data: TerrainNodeData) -> int:
+        self._call('aw_terrain_load_node')
+
+        return 0
+
+    def aw_delete_all_objects(self) -> int:
+        self._call('aw_delete_all_objects')
+        self.objects = 0
+        self.loaded.clear()
+        self.deleted.clear()
+        self._by_cell = None
+
+        return 0
+
+    def aw_terrain_delete_all(self) -> int:
+        self._call('aw_terrain_delete_all')
+        self.terrain = 0
+
+        return 0
+
+    def aw_world_attributes_reset(self) -> int:
+        self._call('aw_world_attributes_reset')
+
+        return 0
+
+    def write_data(self, attribute: str, value) -> None:
+        self._call('write_data')
+
+
+class SimulatedInstance:
+    def __init__(self, simulator: Simulator):
+        """
+        Initializes an instance connected to a simulated world.
+
+        Args:
+            simulator (Simulator): The simulator.
+        """
+        self.simulator = simulator
+
+    def __enter__(self) -> "SimulatedInstance":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        pass
+
+    def query(self, query: QueryEnum, x: int = None, z: int = None) -> list:
+        return self.simulator.query(query, x=x, z=z)
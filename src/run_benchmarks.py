@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# Copyright (c) 2021-2022 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+import argparse
+import json
+import sys
+
+from benchmarks import startup, suite
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Runs the offline benchmarks against a simulated world")
+    parser.add_argument(
+        '-s', '--sizes',
+        help="Numbers of records to run every benchmark with",
+        default=suite.DEFAULT_SIZES,
+        type=int,
+        nargs='+'
+    )
+    parser.add_argument(
+        '-k', '--only',
+        help="Benchmarks to run",
+        default=None,
+        choices=list(suite.CASES),
+        nargs='+'
+    )
+    parser.add_argument(
+        '-o', '--output',
+        help="File to write the results to",
+        default='benchmarks.json',
+        type=str
+    )
+    parser.add_argument(
+        '--baseline',
+        help="Earlier results to compare with, failing on regressions",
+        default=None,
+        type=str
+    )
+    parser.add_argument(
+        '--tolerance',
+        help="Fraction of throughput that may be lost, or memory or startup time gained, against the baseline",
+        default=0.2,
+        type=float
+    )
+    parser.add_argument(
+        '--no-memory',
+        help="If specified, peak memory is not measured",
+        default=False,
+        action="store_true"
+    )
+    parser.add_argument(
+        '--startup-runs',
+        help="Number of times to start every command working without a world, 0 to skip",
+        default=startup.DEFAULT_RUNS,
+        type=int
+    )
+    arguments = parser.parse_args()
+
+    report = suite.run(arguments.sizes, arguments.only, not arguments.no_memory)
+
+    if arguments.startup_runs:
+        report['startup'] = startup.run(arguments.startup_runs)
+    suite.write_report(report, arguments.output)
+
+    if arguments.baseline:
+        with open(arguments.baseline) as f:
+            found = suite.regressions(report, json.load(f), arguments.tolerance)
+
+        for each in found:
+            print(f'REGRESSION {each}')
+
+        sys.exit(1 if found else 0)
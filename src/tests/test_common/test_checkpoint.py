@@ -0,0 +1,97 @@
+# Copyright (c) 2022 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import os
+
+import common.checkpoint
+import pytest
+
+
+def test_checkpointer(tmp_path) -> None:
+    """
+    Tests that checkpoints are written every few records and resumed from.
+
+    Args:
+        tmp_path (Path): The temporary directory.
+    """
+    backup = tmp_path / "backup.json"
+    backup.write_text("{}\n" * 10)
+    state = str(tmp_path / "state")
+    file = common.checkpoint.checkpoint_file(str(backup), state)
+
+    checkpointer = common.checkpoint.Checkpointer(str(backup), state, every=2)
+    checkpointer.acknowledge((0, 0))
+    assert not os.path.exists(file)
+
+    checkpointer.acknowledge((3, 0))
+    checkpointer.acknowledge((6, 0))
+
+    resumed = common.checkpoint.Checkpointer(str(backup), state, resume=True)
+    assert (resumed.position, resumed.records) == ((3, 1), 2)
+
+    checkpointer.save()
+    resumed = common.checkpoint.Checkpointer(str(backup), state, resume=True)
+    assert (resumed.position, resumed.records) == ((6, 1), 3)
+
+    resumed.finish()
+    resumed = common.checkpoint.Checkpointer(str(backup), state, resume=True)
+    assert (resumed.complete, resumed.records) == (True, 3)
+
+    resumed.clear()
+    resumed = common.checkpoint.Checkpointer(str(backup), state, resume=True)
+    assert (resumed.complete, resumed.position, resumed.records) == (False, None, 0)
+
+    resumed.finish()
+    common.checkpoint.Checkpointer(str(backup), state)
+    assert not os.path.exists(file)
+    assert sorted(os.listdir(tmp_path)) == ["backup.json", "state"]
+
+def test_checkpointer_detects_changes(tmp_path) -> None:
+    """
+    Tests that a checkpoint is refused once its backup changed.
+
+    Args:
+        tmp_path (Path): The temporary directory.
+    """
+    backup = tmp_path / "backup.json"
+    backup.write_text("{}\n")
+
+    checkpointer = common.checkpoint.Checkpointer(str(backup), str(tmp_path / "state"))
+    checkpointer.acknowledge((0, 0))
+    checkpointer.save()
+    backup.write_text("{}\n{}\n")
+
+    with pytest.raises(ValueError):
+        common.checkpoint.Checkpointer(str(backup), str(tmp_path / "state"), resume=True)
+
+def test_checkpoint_file(tmp_path) -> None:
+    """
+    Tests that backups of the same name in different directories get checkpoints of their own.
+
+    Args:
+        tmp_path (Path): The temporary directory.
+    """
+    state = str(tmp_path / "state")
+    first = common.checkpoint.checkpoint_file(str(tmp_path / "monday" / "backup.json"), state)
+    second = common.checkpoint.checkpoint_file(str(tmp_path / "tuesday" / "backup.json"), state)
+
+    assert first != second
+    assert os.path.dirname(first) == state
+    assert os.path.basename(first).startswith("backup.json.")
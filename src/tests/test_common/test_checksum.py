@@ -0,0 +1,74 @@
+# Copyright (c) 2022 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import pytest
+
+from common.checksum import ChecksumLog, digest, read_checksums
+from common.file import RecordWriter
+
+
+def test_checksum_log(tmp_path) -> None:
+    """
+    Tests that every flush of a backup is checksummed in its sidecar, and that
+    the checksums tile the backup.
+
+    Args:
+        tmp_path (Path): The temporary directory.
+    """
+    file = str(tmp_path / "backup.json")
+
+    with RecordWriter(file, flush_every=10, checksum="blake2b") as writer:
+        for index in range(25):
+            writer.write(f'{{"index": {index}}}')
+
+    algorithm, checksums = read_checksums(file)
+    with open(file, "rb") as f:
+        data = f.read()
+
+    assert algorithm == "blake2b"
+    assert len(checksums) == 3
+    assert checksums[0][0] == 0
+    assert sum(length for _, length, _ in checksums) == len(data)
+
+    for offset, length, checksum in checksums:
+        assert digest(algorithm, data[offset:offset + length]) == checksum
+
+def test_checksum_algorithm(tmp_path) -> None:
+    """
+    Tests that appending to a backup keeps the algorithm of its checksums,
+    and that a new backup starts its sidecar over.
+
+    Args:
+        tmp_path (Path): The temporary directory.
+    """
+    file = tmp_path / "backup.json"
+    file.write_bytes(b"{}\n")
+    ChecksumLog(str(file), "crc32").add(0, b"{}\n")
+
+    with pytest.raises(ValueError):
+        ChecksumLog(str(file), "blake2b").open()
+
+    file.write_bytes(b"")
+    ChecksumLog(str(file), "blake2b").add(0, b"{}\n")
+
+    assert read_checksums(str(file)) == ("blake2b", [(0, 3, digest("blake2b", b"{}\n"))])
+
+    with pytest.raises(ValueError):
+        ChecksumLog(str(file), "md5")
@@ -0,0 +1,91 @@
+# Copyright (c) 2022 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import json
+from dataclasses import asdict, dataclass, field
+from typing import Any, Type
+
+import common.codec
+import pytest
+
+
+@dataclass(frozen=True)
+class Record:
+    type: int
+    model: str
+    heights: list[int]
+    value: Any = None
+    typed: Type = None
+    data: bytes = None
+
+
+@dataclass
+class Loaded:
+    model: str
+    type: int = None
+    heights: list[int] = field(default_factory=list)
+
+
+@pytest.mark.parametrize("record", [
+    Record(1, 'wall01.rwx', [1, 2, 3]),
+    Record(None, 'café "sign" {x}', [], 1.5, int, b'\x00'),
+    Record(True, None, None, {'a': [1]}, str),
+])
+def test_encode_matches_json(record: Record) -> None:
+    """
+    Tests that the compiled encoder writes the same text as asdict + json.dumps.
+
+    Args:
+        record (Record): The record to encode.
+    """
+    assert common.codec.encode(record) == json.dumps(asdict(record), skipkeys=True, default=str)
+
+@pytest.mark.parametrize("line, expected", [
+    ('{"type": 1, "model": "a.rwx", "heights": [1], "id": 5}', Loaded('a.rwx', 1, [1])),
+    ('{"model": "a.rwx"}', Loaded('a.rwx')),
+])
+def test_decode(line: str, expected: Loaded) -> None:
+    """
+    Tests that the compiled decoder ignores unknown keys and applies defaults.
+
+    Args:
+        line (str): The json line to decode.
+        expected (Loaded): The expected data class instance.
+    """
+    assert common.codec.codec_for(Loaded).loads(line) == expected
+
+def test_decode_missing_required() -> None:
+    """
+    Tests that the compiled decoder fails on a missing required field.
+    """
+    with pytest.raises(KeyError):
+        common.codec.codec_for(Loaded).loads('{"type": 1}')
+
+def test_batch_codec() -> None:
+    """
+    Tests that the batch encoder and decoder match the single record ones.
+    """
+    records = [Record(1, 'wall01.rwx', [1, 2, 3]), Record(None, 'café', [], 1.5, int)]
+    lines = common.codec.encode_many(records)
+    codec = common.codec.codec_for(Loaded)
+
+    assert lines == [common.codec.encode(record) for record in records]
+    assert codec.decode_many([json.loads(line) for line in lines]) == [codec.loads(line) for line in lines]
+    assert common.codec.encode_many([records[0], Loaded('a.rwx')])[1] == common.codec.encode(Loaded('a.rwx'))
@@ -0,0 +1,196 @@
+# Copyright (c) 2022 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import common.columnar
+import common.file
+import pytest
+
+OBJECT = {
+    'type': 1, 'id': 2, 'number': 3, 'owner': 4, 'build_timestamp': 1650000000,
+    'x': -1500, 'y': 20, 'z': 99000, 'yaw': 900, 'tilt': 0, 'roll': 0,
+    'model': 'wall01.rwx', 'description': 'café', 'action': '',
+}
+NODE = {
+    'page_x': 0, 'page_z': -1, 'node_x': 4, 'node_z': 8, 'node_size': 2,
+    'heights': [1, -2, 3, 4], 'textures': [7],
+}
+
+
+@pytest.mark.parametrize("layout, records, block_size", [
+    (common.columnar.OBJECTS, [OBJECT] * 5, 2),
+    (common.columnar.OBJECTS, [{**OBJECT, 'x': None, 'model': None}], 10),
+    (common.columnar.TERRAIN, [NODE, {**NODE, 'heights': [], 'textures': None}], 1),
+])
+def test_round_trip(tmp_path, layout: common.columnar.Layout, records: list, block_size: int) -> None:
+    """
+    Tests that records written in columnar blocks load back unchanged.
+
+    Args:
+        tmp_path (Path): The temporary directory.
+        layout (Layout): The layout of the records.
+        records (list): The records to write.
+        block_size (int): The number of records per block.
+    """
+    file = str(tmp_path / "backup.kwb")
+
+    with common.columnar.ColumnarWriter(file, layout, block_size) as writer:
+        for record in records:
+            writer.write(record)
+
+    expected = [
+        {**record, **{name: record[name] or [] for name in layout.lists}}
+        for record in records
+    ]
+    assert list(common.file.load(file, file_format="columnar")) == expected
+
+def test_write_many(tmp_path) -> None:
+    """
+    Tests that a batch of records fills blocks with the same positions as one record at a time.
+
+    Args:
+        tmp_path (Path): The temporary directory.
+    """
+    file = str(tmp_path / "backup.kwb")
+
+    with common.columnar.ColumnarWriter(file, common.columnar.OBJECTS, 4) as writer:
+        positions = writer.write_many([{**OBJECT, 'x': index} for index in range(3)])
+        positions += writer.write_many([{**OBJECT, 'x': index} for index in range(3, 10)])
+
+    loaded = list(common.file.load_from(file, file_format="columnar"))
+    assert [position for position, _ in loaded] == positions
+    assert [record['x'] for _, record in loaded] == list(range(10))
+
+def test_append(tmp_path) -> None:
+    """
+    Tests that appending to an existing backup only writes the header once.
+
+    Args:
+        tmp_path (Path): The temporary directory.
+    """
+    file = str(tmp_path / "backup.kwb")
+
+    for _ in range(2):
+        with common.columnar.ColumnarWriter(file, common.columnar.OBJECTS) as writer:
+            writer.write(OBJECT)
+
+    assert len(list(common.file.load(file, file_format="columnar"))) == 2
+
+def test_rejects_other_files(tmp_path) -> None:
+    """
+    Tests that json lines backups are not mistaken for columnar backups.
+
+    Args:
+        tmp_path (Path): The temporary directory.
+    """
+    file = tmp_path / "backup.json"
+    file.write_text('{"a": 1}\n')
+
+    with pytest.raises(ValueError):
+        list(common.file.load(str(file), file_format="columnar"))
+
+def test_dictionary(tmp_path) -> None:
+    """
+    Tests that repeated strings are written once per block, and load back as shared strings.
+
+    Args:
+        tmp_path (Path): The temporary directory.
+    """
+    records = [{**OBJECT, 'id': index, 'model': f'wall{index % 3}.rwx'} for index in range(100)]
+    plain = common.columnar.encode_block(common.columnar.OBJECTS, records, dictionary=False)
+    encoded = common.columnar.encode_block(common.columnar.OBJECTS, records)
+
+    assert len(encoded) < len(plain)
+    assert encoded[4] == common.columnar.OBJECTS.kind | common.columnar.DICTIONARY
+
+    file = str(tmp_path / "backup.kwb")
+    with common.columnar.ColumnarWriter(file, common.columnar.OBJECTS, 16) as writer:
+        writer.write_many(records + [{**OBJECT, 'model': None}])
+
+    loaded = list(common.file.load(file, file_format="columnar"))
+    assert loaded == records + [{**OBJECT, 'model': None}]
+    assert loaded[0]['model'] is loaded[99]['model']
+
+def test_append_version_1(tmp_path) -> None:
+    """
+    Tests that blocks appended to a version 1 backup are written without a string table.
+
+    Args:
+        tmp_path (Path): The temporary directory.
+    """
+    file = tmp_path / "backup.kwb"
+    file.write_bytes(
+        common.columnar._FILE_HEADER.pack(common.columnar.MAGIC, 1)
+        + common.columnar.encode_block(common.columnar.OBJECTS, [OBJECT], dictionary=False)
+    )
+
+    with common.columnar.ColumnarWriter(str(file), common.columnar.OBJECTS) as writer:
+        writer.write_many([OBJECT] * 10)
+
+    with open(file, "rb") as f:
+        assert common.columnar.read_header(f) == 1
+        assert {kind for kind, _, _ in common.columnar.read_blocks(f)} == {common.columnar.OBJECTS.kind}
+
+    assert list(common.file.load(str(file), file_format="columnar")) == [OBJECT] * 11
+
+@pytest.mark.parametrize("dictionary", [False, True])
+def test_mixed_layout(monkeypatch, dictionary: bool) -> None:
+    """
+    Tests that a layout holding both strings and lists decodes every value into its own field.
+
+    Args:
+        monkeypatch (MonkeyPatch): The monkeypatch fixture.
+        dictionary (bool): Whether strings may be dictionary encoded.
+    """
+    layout = common.columnar.Layout(99, ('x',), ('name',), ('data',))
+    monkeypatch.setitem(common.columnar.LAYOUTS, layout.kind, layout)
+    records = [{'x': 1, 'name': 'wall01.rwx', 'data': [1, 2]}] * 8 + [{'x': None, 'name': None, 'data': []}]
+
+    block = common.columnar.encode_block(layout, records, dictionary=dictionary)
+    _, kind, count, _ = common.columnar._BLOCK_HEADER.unpack_from(block)
+    payload = block[common.columnar._BLOCK_HEADER.size:]
+
+    assert bool(kind & common.columnar.DICTIONARY) == dictionary
+    assert common.columnar.decode_block(kind, count, payload) == records
+
+def test_write_many_refuses_bad_batches(tmp_path) -> None:
+    """
+    Tests that a batch holding a record that cannot be encoded leaves the writer as it was,
+    and that a block failing to encode is dropped rather than failing every later flush.
+
+    Args:
+        tmp_path (Path): The temporary directory.
+    """
+    file = str(tmp_path / "backup.kwb")
+
+    with common.columnar.ColumnarWriter(file, common.columnar.OBJECTS, 4) as writer:
+        writer.write_many([OBJECT] * 3)
+
+        with pytest.raises(TypeError):
+            writer.write_many([OBJECT, {**OBJECT, 'x': 'oops'}, OBJECT])
+        assert writer.records_written == 3
+
+        # Passes the check, but fails to encode once the block fills up.
+        with pytest.raises(UnicodeEncodeError):
+            writer.write({**OBJECT, 'description': '\ud800'})
+        assert writer.records_written == 0
+
+        assert writer.write_many([OBJECT] * 2) == [(writer.offset, 0), (writer.offset, 1)]
+
+    assert list(common.file.load(file, file_format="columnar")) == [OBJECT] * 2
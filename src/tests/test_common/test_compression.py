@@ -0,0 +1,146 @@
+# Copyright (c) 2022 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import common.compression
+import common.file
+import pytest
+from common import columnar
+
+
+@pytest.mark.parametrize("codec", ["gzip", "bz2", "lzma"])
+@pytest.mark.parametrize("binary_mode", [False, True])
+def test_record_writer_round_trip(tmp_path, codec: str, binary_mode: bool) -> None:
+    """
+    Tests that compressed line backups load back like uncompressed ones.
+
+    Args:
+        tmp_path (Path): The temporary directory.
+        codec (str): The codec to compress with.
+        binary_mode (bool): Whether to write in binary mode.
+    """
+    file = str(tmp_path / "backup.json")
+    records = [f'{{"a": {index}, "b": "été"}}' for index in range(500)]
+
+    with common.file.RecordWriter(file, binary_mode, buffer_size=256, compression=codec) as writer:
+        for record in records:
+            writer.write(record.encode("utf-8") if binary_mode else record)
+
+    assert common.compression.is_compressed(file)
+    assert [each["a"] for each in common.file.load(file, binary_mode)] == list(range(500))
+
+@pytest.mark.parametrize("codec", ["gzip", "bz2", "lzma"])
+def test_columnar_round_trip(tmp_path, codec: str) -> None:
+    """
+    Tests that compressed columnar backups are detected and load back.
+
+    Args:
+        tmp_path (Path): The temporary directory.
+        codec (str): The codec to compress with.
+    """
+    file = str(tmp_path / "backup.col")
+    records = [
+        {
+            **dict.fromkeys(columnar.OBJECTS.numbers, 0),
+            "x": index, "z": -index,
+            "model": f"wall{index % 3}.rwx", "description": None, "action": "",
+        }
+        for index in range(100)
+    ]
+
+    with columnar.ColumnarWriter(file, columnar.OBJECTS, block_size=16, compression=codec) as writer:
+        for record in records:
+            writer.write(record)
+
+    assert common.file.detect_format(file) == "columnar"
+    assert list(common.file.load(file, file_format="columnar")) == records
+
+def test_frames_hold_whole_records(tmp_path) -> None:
+    """
+    Tests that every frame decompresses to complete lines on its own.
+
+    Args:
+        tmp_path (Path): The temporary directory.
+    """
+    file = str(tmp_path / "backup.json.kwmz")
+
+    with common.file.RecordWriter(file, buffer_size=100, compression="gzip") as writer:
+        for index in range(50):
+            writer.write(f'{{"a": {index}}}')
+
+    offsets = list(common.compression.frame_offsets(file))
+    assert len(offsets) > 1
+
+    with common.compression.FrameReader(file, offsets[1][0]) as reader:
+        frame = reader.next_frame()
+
+    assert len(frame) == offsets[1][1]
+    assert frame.endswith(b"\n")
+    assert frame.startswith(b'{"a": ')
+
+def test_append_checks_codec(tmp_path) -> None:
+    """
+    Tests that appending resumes the existing frames only with the same codec.
+
+    Args:
+        tmp_path (Path): The temporary directory.
+    """
+    file = str(tmp_path / "backup.json")
+
+    for index in range(2):
+        with common.file.RecordWriter(file, compression="bz2") as writer:
+            writer.write(f'{{"a": {index}}}')
+
+    assert [each["a"] for each in common.file.load(file)] == [0, 1]
+
+    with pytest.raises(ValueError):
+        common.compression.FrameWriter(file, "gzip")
+
+@pytest.mark.parametrize("file, codec, expected", [
+    ("backup.json.kwmz", None, "gzip"),
+    ("backup.col.KWMZ", "bz2", "bz2"),
+    ("backup.json", None, None),
+    ("backup.json", "lzma", "lzma"),
+])
+def test_codec_for(file: str, codec: str, expected: str) -> None:
+    """
+    Tests that the codec comes from the explicit choice, then the extension.
+
+    Args:
+        file (str): The name of the file.
+        codec (str): The codec asked for.
+        expected (str): The codec expected.
+    """
+    assert common.compression.codec_for(file, codec) == expected
+
+@pytest.mark.parametrize("file, codec", [
+    ("backup.json.gz", None),
+    ("backup.col.BZ2", "bz2"),
+    ("backup.json.xz", None),
+])
+def test_codec_for_standard_extensions(file: str, codec: str) -> None:
+    """
+    Tests that backups are not named like the files of standard tools they cannot be read with.
+
+    Args:
+        file (str): The name of the file.
+        codec (str): The codec asked for.
+    """
+    with pytest.raises(ValueError, match="kwmz"):
+        common.compression.codec_for(file, codec)
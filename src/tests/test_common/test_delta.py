@@ -0,0 +1,127 @@
+# Copyright (c) 2022 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import json
+import os
+
+import common.delta
+import pytest
+
+
+def obj(x: int, model: str = 'wall01.rwx', yaw: int = 0) -> dict:
+    return {
+        'type': 1, 'id': x, 'number': x, 'owner': 1, 'build_timestamp': 10,
+        'x': x, 'y': 0, 'z': 0, 'yaw': yaw, 'tilt': 0, 'roll': 0,
+        'model': model, 'description': '', 'action': '',
+    }
+
+BASE = [obj(0), obj(1000), obj(2000), obj(3000)]
+
+
+@pytest.mark.parametrize("live, expected", [
+    (BASE, []),
+    ([{**each, 'id': 99, 'number': 99} for each in BASE], []),
+    (BASE + [obj(4000)], [('add', 4000)]),
+    (BASE[1:], [('delete', 0)]),
+    ([obj(0, yaw=900)] + BASE[1:], [('change', 0)]),
+    ([obj(0, model='wall02.rwx')] + BASE[1:], [('add', 0), ('delete', 0)]),
+])
+def test_diff(live: list, expected: list) -> None:
+    """
+    Tests that records are matched by identity and compared by content.
+
+    Args:
+        live (list): The live records.
+        expected (list): The expected operations and record x coordinates.
+    """
+    operations = common.delta.Differ('objects').diff(lambda: iter(BASE), live)
+
+    assert [(operation, record['x']) for operation, record in operations] == expected
+
+@pytest.mark.parametrize("live", [
+    BASE,
+    [obj(0, yaw=900), obj(2000), obj(5000)],
+    [],
+])
+def test_materialize(live: list) -> None:
+    """
+    Tests that a base and a delta rebuild the live snapshot.
+
+    Args:
+        live (list): The live records.
+    """
+    lines = [
+        json.loads(common.delta.encode_operation(operation, record))
+        for operation, record in common.delta.Differ('objects').diff(lambda: iter(BASE), live)
+    ]
+    materialized = common.delta.materialize(iter(BASE), lines, 'objects')
+
+    assert sorted(each['x'] for each in materialized) == sorted(each['x'] for each in live)
+
+def stacked(description: str) -> dict:
+    return {**obj(0), 'description': description}
+
+@pytest.mark.parametrize("base, live, expected", [
+    ([stacked('a'), stacked('b')], [stacked('a'), stacked('b')], []),
+    ([stacked('a'), stacked('b')], [stacked('b'), stacked('a')], []),
+    ([stacked('a')], [stacked('a'), stacked('a')], [('add', 'a')]),
+    ([stacked('a')], [stacked('b'), stacked('a')], [('add', 'b')]),
+    ([stacked('a'), stacked('a')], [stacked('a')], [('delete', 'a')]),
+    ([stacked('a'), stacked('b')], [stacked('a'), stacked('c')], [('add', 'c'), ('delete', 'b')]),
+    ([stacked('a'), stacked('b')], [stacked('c')], [('add', 'c'), ('delete', 'a'), ('delete', 'b')]),
+    ([stacked('a')], [stacked('b'), stacked('c')], [('change', 'b'), ('add', 'c')]),
+])
+def test_diff_stacked(base: list, live: list, expected: list) -> None:
+    """
+    Tests that records sharing an identity are matched one for one, and that the delta rebuilds the live records.
+
+    Args:
+        base (list): The base records.
+        live (list): The live records.
+        expected (list): The expected operations and record descriptions.
+    """
+    operations = list(common.delta.Differ('objects').diff(lambda: iter(base), live))
+    lines = [json.loads(common.delta.encode_operation(operation, record)) for operation, record in operations]
+    materialized = common.delta.materialize(iter(base), lines, 'objects')
+
+    assert [(operation, record['description']) for operation, record in operations] == expected
+    assert sorted(each['description'] for each in materialized) == sorted(each['description'] for each in live)
+
+def test_manifest(tmp_path) -> None:
+    """
+    Tests that the manifest points at its base relative to the delta.
+
+    Args:
+        tmp_path (Path): The temporary directory.
+    """
+    os.makedirs(tmp_path / "deltas")
+    base, delta = tmp_path / "full_objects", str(tmp_path / "deltas" / "monday_objects")
+    base.write_text('{}\n')
+
+    common.delta.write_manifest(delta, str(base), 'json', 'objects', {'add': 1})
+    manifest = common.delta.read_manifest(delta)
+
+    assert common.delta.is_delta(delta)
+    assert os.path.samefile(manifest['base'], base)
+    assert manifest['counts'] == {'add': 1}
+
+    base.write_text('{}\n{}\n')
+    with pytest.raises(ValueError):
+        common.delta.read_manifest(delta)
@@ -0,0 +1,202 @@
+# Copyright (c) 2022 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import json
+
+import common.columnar
+import common.file
+import pytest
+
+
+@pytest.mark.parametrize("records, binary_mode", [
+    (['{"a": 1}', '{"b": 2}', '{"c": 3}'], False),
+    ([b'{"a": 1}', b'{"b": 2}', b'{"c": 3}'], True),
+])
+def test_record_writer(tmp_path, records: list, binary_mode: bool) -> None:
+    """
+    Tests that the record writer writes every record on its own line.
+
+    Args:
+        tmp_path (Path): The temporary directory.
+        records (list): The records to write.
+        binary_mode (bool): Whether to write in binary mode.
+    """
+    file = str(tmp_path / "backup.json")
+
+    with common.file.RecordWriter(file, binary_mode) as writer:
+        for record in records:
+            writer.write(record)
+
+    assert [
+        list(each.values())[0]
+        for each in common.file.load(file, binary_mode)
+    ] == [1, 2, 3]
+
+@pytest.mark.parametrize("buffer_size, flush_every, expected", [
+    (1024, None, 0),
+    (1024, 2, 2),
+    (1, None, 3),
+])
+def test_record_writer_flushing(tmp_path, buffer_size: int, flush_every: int, expected: int) -> None:
+    """
+    Tests that the record writer only flushes once a threshold is reached.
+
+    Args:
+        tmp_path (Path): The temporary directory.
+        buffer_size (int): The number of bytes to buffer.
+        flush_every (int): The number of records to buffer.
+        expected (int): The number of lines on disk before closing.
+    """
+    file = tmp_path / "backup.json"
+    writer = common.file.RecordWriter(str(file), False, buffer_size, flush_every).open()
+
+    for record in ['{"a": 1}', '{"b": 2}', '{"c": 3}']:
+        writer.write(record)
+
+    assert len(file.read_text().splitlines()) == expected
+
+    writer.close()
+    assert len(file.read_text().splitlines()) == 3
+
+def test_record_writer_closes_on_error(tmp_path) -> None:
+    """
+    Tests that buffered records are written when the writer exits with an error.
+
+    Args:
+        tmp_path (Path): The temporary directory.
+    """
+    file = tmp_path / "backup.json"
+
+    with pytest.raises(RuntimeError):
+        with common.file.RecordWriter(str(file)) as writer:
+            writer.write('{"a": 1}')
+            raise RuntimeError()
+
+    assert file.read_text() == '{"a": 1}\n'
+
+@pytest.mark.parametrize("binary_mode, flush_every, expected", [
+    (False, None, 0),
+    (True, 2, 4),
+])
+def test_record_writer_write_many(tmp_path, binary_mode: bool, flush_every: int, expected: int) -> None:
+    """
+    Tests that a batch of records is written with the same positions as one record at a time.
+
+    Args:
+        tmp_path (Path): The temporary directory.
+        binary_mode (bool): Whether to write in binary mode.
+        flush_every (int): The number of records to buffer.
+        expected (int): The number of lines on disk before closing.
+    """
+    file = tmp_path / "backup.json"
+    records = ['{"a": 1}', '{"b": "é"}', '{"c": 3}', '{"d": 4}', '{"e": 5}']
+    records = [record.encode("utf-8") for record in records] if binary_mode else records
+    writer = common.file.RecordWriter(str(file), binary_mode, flush_every=flush_every).open()
+
+    positions = writer.write_many(records[:4]) + writer.write_many(records[4:]) + writer.write_many([])
+    assert len(file.read_text().splitlines()) == expected
+
+    writer.close()
+    assert [position for position, _ in common.file.load_from(str(file))] == positions
+    assert writer.records_written == 5
+
+@pytest.mark.parametrize("file_format, compression", [
+    ("json", None),
+    ("json", "gzip"),
+    ("columnar", None),
+    ("columnar", "bz2"),
+])
+def test_load_from(tmp_path, file_format: str, compression: str) -> None:
+    """
+    Tests that loading from any record's position continues with the records after it.
+
+    Args:
+        tmp_path (Path): The temporary directory.
+        file_format (str): The format of the file.
+        compression (str): The codec to compress with.
+    """
+    file = str(tmp_path / "backup")
+    records = [
+        {"page_x": index, "page_z": 0, "node_x": 0, "node_z": 0, "node_size": 8, "heights": [index], "textures": []}
+        for index in range(40)
+    ]
+
+    if file_format == "columnar":
+        writer = common.columnar.ColumnarWriter(file, common.columnar.TERRAIN, block_size=7, compression=compression)
+    else:
+        writer = common.file.RecordWriter(file, buffer_size=64, compression=compression)
+
+    with writer:
+        for record in records:
+            writer.write(record if file_format == "columnar" else json.dumps(record))
+
+    loaded = list(common.file.load_from(file, file_format))
+    assert [record for _, record in loaded] == records
+
+    for index, ((offset, skip), _) in enumerate(loaded):
+        assert [
+            record["page_x"]
+            for _, record in common.file.load_from(file, file_format, (offset, skip + 1))
+        ] == list(range(index + 1, 40))
+
+@pytest.mark.parametrize("compression", [None, "gzip"])
+def test_load_refuses_columnar_as_json(tmp_path, compression: str) -> None:
+    """
+    Tests that a columnar backup read as json lines is refused up front.
+
+    Args:
+        tmp_path (Path): The temporary directory.
+        compression (str): The codec to compress with.
+    """
+    file = str(tmp_path / "backup")
+
+    with common.columnar.ColumnarWriter(file, common.columnar.TERRAIN, compression=compression) as writer:
+        writer.write({"page_x": 0, "page_z": 0, "node_x": 0, "node_z": 0, "node_size": 8, "heights": [0], "textures": []})
+
+    with pytest.raises(ValueError, match="columnar"):
+        list(common.file.load(file))
+
+    with pytest.raises(ValueError, match="columnar"):
+        list(common.file.load_from(file))
+
+def test_load_interns_strings(tmp_path) -> None:
+    """
+    Tests that loaded records share their keys and repeated string values,
+    and that a bad line is still reported.
+
+    Args:
+        tmp_path (Path): The temporary directory.
+    """
+    file = tmp_path / "backup.json"
+    file.write_text("".join(
+        json.dumps({"model": f"wall{index % 2}.rwx", "owner": index}) + "\n"
+        for index in range(3000)
+    ))
+    records = list(common.file.load(str(file)))
+
+    assert [record["owner"] for record in records] == list(range(3000))
+    assert records[0]["model"] is records[2998]["model"]
+    assert list(records[0])[0] is list(records[1000])[0]
+
+    with open(file, "a") as f:
+        f.write('{"model": \n')
+
+    with pytest.raises(ValueError):
+        list(common.file.load(str(file)))
@@ -18,10 +18,20 @@
 # LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
 # OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
 # WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+
 import common.func
 import pytest
 
 
+class Inline(Executor):
+    def submit(self, fn, *args, **kwargs) -> Future:
+        future = Future()
+        future.set_result(fn(*args, **kwargs))
+
+        return future
+
+
 @pytest.mark.parametrize("params, expected", [
     ([(1, 2, 3)], [1]),
     ([(1, 2, 3), (4, 5, 6)], [1, 4]),
@@ -86,3 +96,79 @@ def test_every_x(iterable: list, x: int, expected: list) -> None:
             x,
         )
     ) == expected
+
+@pytest.mark.parametrize("iterable, max_pending", [
+    (range(10), 1),
+    (range(100), 4),
+])
+def test_on_each_concurrently(iterable: range, max_pending: int) -> None:
+    """
+    Tests that the on_each_concurrently function calls the callback for every item.
+
+    Args:
+        iterable (range): The iterable to iterate over.
+        max_pending (int): The number of callbacks in flight.
+    """
+    seen: list = list()
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        submitted = common.func.on_each_concurrently(
+            iterable,
+            seen.append,
+            executor,
+            max_pending
+        )
+
+    assert submitted == len(iterable)
+    assert sorted(seen) == list(iterable)
+
+@pytest.mark.parametrize("failing, max_pending, expected", [
+    ({3}, 1, [3]),
+    ({7, 3}, 10, [3, 7]),
+])
+def test_on_each_concurrently_errors(failing: set, max_pending: int, expected: list) -> None:
+    """
+    Tests that the on_each_concurrently function reports failures in item order.
+
+    Args:
+        failing (set): The items that raise an exception.
+        max_pending (int): The number of callbacks in flight.
+        expected (list): The indexes expected to be reported.
+    """
+    def callback(item: int):
+        if item in failing:
+            raise ValueError(item)
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        with pytest.raises(common.func.OrderedErrors) as error:
+            common.func.on_each_concurrently(
+                range(10),
+                callback,
+                executor,
+                max_pending
+            )
+
+    assert [index for index, _ in error.value.errors] == expected
+
+def test_on_each_concurrently_window() -> None:
+    """
+    Tests that a limit given as a function is read before every submission, so
+    the items in flight follow it, and that settled items come with their result.
+    """
+    settled: list = list()
+    in_flight: list = list()
+
+    def callback(item: int) -> int:
+        in_flight.append(item + 1 - len(settled))
+        return item * 2
+
+    common.func.on_each_concurrently(
+        range(10),
+        callback,
+        Inline(),
+        lambda: 4 if len(settled) < 4 else 1,
+        on_settled=lambda index, exception, result: settled.append((index, result))
+    )
+
+    assert settled == [(index, index * 2) for index in range(10)]
+    assert in_flight == [1, 2, 3, 4, 4, 4, 4, 1, 1, 1]
@@ -0,0 +1,112 @@
+# Copyright (c) 2022 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import json
+
+import common.columnar
+import common.file
+import common.index
+import pytest
+
+RECORDS = [
+    {
+        'type': 1, 'id': index, 'number': index, 'owner': 1, 'build_timestamp': 0,
+        'x': (index // 3) * 1000 - 2500, 'y': 0, 'z': 500, 'yaw': 0, 'tilt': 0, 'roll': 0,
+        'model': 'wall01.rwx', 'description': 'é' * (index % 2), 'action': '',
+    }
+    for index in range(50)
+]
+
+
+def write_backup(file: str, file_format: str, stride: int) -> None:
+    """
+    Writes the test records together with their index sidecar.
+
+    Args:
+        file (str): The name of the backup.
+        file_format (str): The backup format.
+        stride (int): The number of records between two offsets.
+    """
+    builder = common.index.IndexBuilder(file_format, stride)
+
+    if file_format == "columnar":
+        writer = common.columnar.ColumnarWriter(file, common.columnar.OBJECTS, 8)
+    else:
+        writer = common.file.RecordWriter(file)
+
+    with writer:
+        for record in RECORDS:
+            data = record if file_format == "columnar" else json.dumps(record, ensure_ascii=False)
+            builder.add(writer.write(data), record)
+
+    builder.index.write_sidecar(file)
+
+@pytest.mark.parametrize("file_format", ["json", "columnar"])
+@pytest.mark.parametrize("start, stop", [(0, None), (7, 8), (16, 33), (49, 100), (60, 70)])
+def test_records(tmp_path, file_format: str, start: int, stop: int) -> None:
+    """
+    Tests that a record range is read straight from its indexed position.
+
+    Args:
+        tmp_path (Path): The temporary directory.
+        file_format (str): The backup format.
+        start (int): The number of the first record.
+        stop (int): The number of the record to stop before.
+    """
+    file = str(tmp_path / "backup")
+    write_backup(file, file_format, 5)
+
+    with common.file.IndexedReader(file) as reader:
+        assert len(reader) == len(RECORDS)
+        assert list(reader.records(start, stop)) == RECORDS[start:stop]
+
+@pytest.mark.parametrize("file_format", ["json", "columnar"])
+@pytest.mark.parametrize("cells", [[(-3, 0)], [(0, 0), (-1, 0)], [(100, 100)]])
+def test_cells(tmp_path, file_format: str, cells: list) -> None:
+    """
+    Tests that only the records of the requested cells are read.
+
+    Args:
+        tmp_path (Path): The temporary directory.
+        file_format (str): The backup format.
+        cells (list): The cells to read.
+    """
+    file = str(tmp_path / "backup")
+    write_backup(file, file_format, 5)
+
+    with common.file.IndexedReader(file) as reader:
+        assert list(reader.cells(cells)) == [
+            record for record in RECORDS
+            if common.index.cell_of(record['x'], record['z']) in cells
+        ]
+
+def test_bounds(tmp_path) -> None:
+    """
+    Tests that the index keeps the bounding box of every stride.
+
+    Args:
+        tmp_path (Path): The temporary directory.
+    """
+    file = str(tmp_path / "backup")
+    write_backup(file, "json", 25)
+    index = common.index.Index.read(file + common.index.SUFFIX)
+
+    assert index.bounds == [-2500, 500, 13500, 500]
+    assert index.stride_bounds == [[-2500, 500, 5500, 500], [5500, 500, 13500, 500]]
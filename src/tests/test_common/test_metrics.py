@@ -0,0 +1,107 @@
+# Copyright (c) 2022 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import json
+
+import common.metrics
+import pytest
+
+
+class Counting:
+    def __init__(self, records: int, fail: bool = False):
+        self.metrics = common.metrics.Metrics("COUNTING")
+        self._records = records
+        self._fail = fail
+
+    def execute(self):
+        self.metrics.records += self._records
+        self.metrics.bytes += self._records * 10
+
+        if self._fail:
+            self.metrics.failures += 1
+            raise RuntimeError("failed")
+
+
+@pytest.mark.parametrize("fail", [False, True])
+def test_execute_measured(fail: bool) -> None:
+    """
+    Tests that commands are measured and their counters collected, even when they fail.
+
+    Args:
+        fail (bool): Whether the command fails.
+    """
+    metrics, error = common.metrics.execute_measured(Counting(5, fail), "COUNT")
+
+    assert metrics.name == "COUNT"
+    assert (metrics.records, metrics.bytes, metrics.failures) == (5, 50, int(fail))
+    assert metrics.wall_time > 0
+    assert (error is not None) == fail
+    assert (metrics.error == "RuntimeError: failed") == fail
+
+def test_command_without_metrics() -> None:
+    """
+    Tests that commands keeping no metrics are still timed.
+    """
+    class Plain:
+        def execute(self):
+            pass
+
+    metrics, error = common.metrics.execute_measured(Plain())
+
+    assert (metrics.name, metrics.records, error) == ("Plain", 0, None)
+
+def test_json_report(tmp_path) -> None:
+    """
+    Tests that the report holds every invocation with its nested commands.
+
+    Args:
+        tmp_path (Path): The temporary directory.
+    """
+    file = str(tmp_path / "report.json")
+    child = common.metrics.Metrics("SAVE TERRAIN", wall_time=2.0, records=10)
+    parent = common.metrics.Metrics("SAVE ALL", wall_time=4.0, records=10, children=[child])
+
+    common.metrics.JsonReport(file).write([parent])
+
+    with open(file) as f:
+        report = json.load(f)
+
+    assert report["commands"][0]["name"] == "SAVE ALL"
+    assert report["commands"][0]["children"][0]["rate"] == 5.0
+
+def test_prometheus_textfile(tmp_path) -> None:
+    """
+    Tests that every command, nested ones included, is exported with its labels.
+
+    Args:
+        tmp_path (Path): The temporary directory.
+    """
+    file = tmp_path / "metrics.prom"
+    child = common.metrics.Metrics("SAVE TERRAIN", records=10, error="Error")
+    older = common.metrics.Metrics("SAVE ALL", records=1)
+    parent = common.metrics.Metrics("SAVE ALL", records=10, children=[child])
+
+    common.metrics.PrometheusTextfile(str(file)).write([older, parent])
+    lines = file.read_text().splitlines()
+
+    assert 'world_management_records{command="SAVE ALL"} 10' in lines
+    assert 'world_management_records{command="SAVE TERRAIN",parent="SAVE ALL"} 10' in lines
+    assert 'world_management_success{command="SAVE TERRAIN",parent="SAVE ALL"} 0' in lines
+    assert 'world_management_records{command="SAVE ALL"} 1' not in lines
@@ -0,0 +1,179 @@
+# Copyright (c) 2022 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import threading
+
+import common.columnar
+import common.file
+import common.pipeline
+import pytest
+
+OBJECT = {
+    'type': 1, 'id': 2, 'number': 3, 'owner': 4, 'build_timestamp': 1650000000,
+    'x': 0, 'y': 20, 'z': 99000, 'yaw': 900, 'tilt': 0, 'roll': 0,
+    'model': 'wall01.rwx', 'description': '', 'action': '',
+}
+
+
+@pytest.mark.parametrize("count, workers, batch_size", [
+    (0, 1, 4),
+    (10, 1, 4),
+    (1000, 4, 7),
+])
+def test_pipeline_keeps_order(count: int, workers: int, batch_size: int) -> None:
+    """
+    Tests that the sink receives every transformed item in the original order.
+
+    Args:
+        count (int): The number of items.
+        workers (int): The number of transform threads.
+        batch_size (int): The number of items per batch.
+    """
+    received = list()
+
+    stats = common.pipeline.pipeline(
+        range(count),
+        lambda each: each * 2,
+        lambda each, value: received.append((each, value)),
+        workers=workers,
+        batch_size=batch_size,
+        max_pending=2
+    )
+
+    assert received == [(each, each * 2) for each in range(count)]
+    assert stats[0].items == stats[-1].items == count
+    assert sum(each.items for each in stats[1:-1]) == count
+
+def test_pipeline_ignores_exceptions() -> None:
+    """
+    Tests that failing items are skipped when exceptions are ignored.
+    """
+    received = list()
+
+    stats = common.pipeline.pipeline(
+        range(10),
+        lambda each: 1 / (each % 5),
+        lambda each, value: received.append(each),
+        ignore_exceptions=True
+    )
+
+    assert received == [1, 2, 3, 4, 6, 7, 8, 9]
+    assert sum(each.failures for each in stats) == 2
+
+def test_pipeline_batched() -> None:
+    """
+    Tests that batched stages receive whole batches, and that a failing batch
+    is retried one item at a time to only skip the failing items.
+    """
+    received, sizes = list(), list()
+
+    def _sink(items: list, values: list) -> None:
+        sizes.append(len(items))
+        received.extend(values)
+
+    stats = common.pipeline.pipeline(
+        range(10),
+        lambda batch: [1 / (each % 5) for each in batch],
+        _sink,
+        batch_size=4,
+        ignore_exceptions=True,
+        batched=True
+    )
+
+    assert received == [1 / (each % 5) for each in (1, 2, 3, 4, 6, 7, 8, 9)]
+    assert sizes == [3, 3, 2]
+    assert sum(each.failures for each in stats) == 2
+
+@pytest.mark.parametrize("stage", ["produce", "transform", "sink"])
+def test_pipeline_raises(stage: str) -> None:
+    """
+    Tests that a failure in any stage stops the pipeline and is raised.
+
+    Args:
+        stage (str): The stage to fail in.
+    """
+    def _items():
+        for each in range(10_000):
+            if stage == "produce" and each == 500:
+                raise RuntimeError(stage)
+            yield each
+
+    def _fail_at(name):
+        def _callback(each, *args):
+            if stage == name and each == 500:
+                raise RuntimeError(stage)
+        return _callback
+
+    with pytest.raises(RuntimeError, match=stage):
+        common.pipeline.pipeline(
+            _items(),
+            _fail_at("transform"),
+            _fail_at("sink"),
+            workers=2,
+            batch_size=10,
+            max_pending=2
+        )
+
+def test_pipeline_overlaps_stages() -> None:
+    """
+    Tests that the producer keeps producing while the sink is busy with an earlier item.
+    The sink holds the first item until the producer reaches a later one, which only
+    happens if the stages run at the same time.
+    """
+    reached = threading.Event()
+
+    def _items():
+        for each in range(20):
+            if each == 2:
+                reached.set()
+            yield each
+
+    def _sink(each, value):
+        if each == 0:
+            assert reached.wait(timeout=10)
+
+    stats = common.pipeline.pipeline(_items(), lambda each: each, _sink, batch_size=1, max_pending=1)
+
+    assert [each.items for each in stats] == [20, 20, 20]
+
+def test_pipeline_skips_bad_columnar_records(tmp_path) -> None:
+    """
+    Tests that a record a columnar writer cannot encode is the only one skipped,
+    and that the records of its batch are written once.
+
+    Args:
+        tmp_path (Path): The temporary directory.
+    """
+    file = str(tmp_path / "backup.kwb")
+    records = [{**OBJECT, 'x': 'oops' if index == 5 else index} for index in range(10)]
+
+    with common.columnar.ColumnarWriter(file, common.columnar.OBJECTS, 4) as writer:
+        stats = common.pipeline.pipeline(
+            records,
+            lambda batch: batch,
+            lambda batch, values: writer.write_many(values),
+            batch_size=3,
+            ignore_exceptions=True,
+            batched=True
+        )
+
+    assert stats[-1].failures == 1
+    assert writer.records_written == 9
+    assert [each['x'] for each in common.file.load(file, file_format="columnar")] == [0, 1, 2, 3, 4, 6, 7, 8, 9]
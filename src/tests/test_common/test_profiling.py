@@ -0,0 +1,114 @@
+# Copyright (c) 2022 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import pstats
+import threading
+import time
+
+import common.profiling
+import pytest
+
+
+def busy(seconds: float) -> int:
+    end = time.perf_counter() + seconds
+    count = 0
+
+    while time.perf_counter() < end:
+        count += 1
+
+    return count
+
+def allocate() -> list:
+    return [bytearray(1024) for _ in range(1000)]
+
+
+def test_profiler(tmp_path) -> None:
+    """
+    Tests that the deterministic profiler reports the functions called.
+
+    Args:
+        tmp_path (Path): The temporary directory.
+    """
+    file = tmp_path / "profile.txt"
+
+    with common.profiling.profiled(str(file)):
+        busy(0.01)
+
+    assert "busy" in file.read_text()
+    assert (tmp_path / "profile.txt.prof").exists()
+
+def test_sampling_profiler(tmp_path) -> None:
+    """
+    Tests that the sampling profiler sees the function the time is spent in.
+
+    Args:
+        tmp_path (Path): The temporary directory.
+    """
+    file = tmp_path / "profile.txt"
+
+    with common.profiling.SamplingProfiler(str(file), interval=0.001) as profiler:
+        busy(0.2)
+
+    assert profiler.samples > 0
+    assert "busy" in [name for _, _, name in profiler.cumulative]
+    assert "busy" in file.read_text()
+
+def test_memory_tracer(tmp_path) -> None:
+    """
+    Tests that the tracer reports the allocation sites still holding memory.
+
+    Args:
+        tmp_path (Path): The temporary directory.
+    """
+    file = tmp_path / "memory.txt"
+
+    with common.profiling.profiled(trace_memory=str(file)):
+        kept = allocate()
+
+    assert len(kept) == 1000
+    assert "bytearray(1024)" in file.read_text()
+
+def test_profiler_threads(tmp_path) -> None:
+    """
+    Tests that the deterministic profiler reports the functions called on threads started while profiling.
+
+    Args:
+        tmp_path (Path): The temporary directory.
+    """
+    file = tmp_path / "profile.txt"
+
+    with common.profiling.profiled(str(file)):
+        thread = threading.Thread(target=allocate)
+        thread.start()
+        thread.join()
+
+    assert "allocate" in file.read_text()
+    assert "allocate" in [name for _, _, name in pstats.Stats(str(file) + ".prof").stats]
+
+def test_interval_requires_profile(tmp_path) -> None:
+    """
+    Tests that sampling without a profile to write is rejected rather than ignored.
+
+    Args:
+        tmp_path (Path): The temporary directory.
+    """
+    with pytest.raises(ValueError):
+        with common.profiling.profiled(trace_memory=str(tmp_path / "memory.txt"), interval=0.01):
+            pass
@@ -0,0 +1,91 @@
+# Copyright (c) 2022 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import argparse
+
+import common.region
+import pytest
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("0,0,1,1", {(0, 0), (0, 1), (1, 0), (1, 1)}),
+    ("1,-1,0,-1", {(0, -1), (1, -1)}),
+])
+def test_rectangle(text: str, expected: set) -> None:
+    """
+    Tests that a rectangle covers every cell between its corners.
+
+    Args:
+        text (str): The command line argument.
+        expected (set): The expected cells.
+    """
+    region = common.region.parse_rectangle(text)
+
+    assert set(region.cells()) == expected
+    assert all(region.contains_cell(cell) for cell in expected)
+
+@pytest.mark.parametrize("text, expected", [
+    ("5,5,0", {(5, 5)}),
+    ("0,0,1", {(-1, 0), (0, -1), (0, 0), (0, 1), (1, 0)}),
+])
+def test_circle(text: str, expected: set) -> None:
+    """
+    Tests that a circle covers the cells within its radius.
+
+    Args:
+        text (str): The command line argument.
+        expected (set): The expected cells.
+    """
+    region = common.region.parse_circle(text)
+
+    assert set(region.cells()) == expected
+    assert not region.contains_cell((1, 1))
+
+@pytest.mark.parametrize("record, expected", [
+    ({'x': 999, 'z': 0}, True),
+    ({'x': 1000, 'z': 0}, False),
+    ({'x': -1, 'z': 0}, False),
+    ({'name': 'AW_WORLD_NAME'}, False),
+])
+def test_contains(record: dict, expected: bool) -> None:
+    """
+    Tests that records are matched by the cell they lie in.
+
+    Args:
+        record (dict): The record.
+        expected (bool): Whether the record is inside cell (0, 0).
+    """
+    assert common.region.contains(common.region.Rectangle(0, 0, 0, 0), record) == expected
+
+@pytest.mark.parametrize("parse, text", [
+    (common.region.parse_rectangle, "1,2,3"),
+    (common.region.parse_rectangle, "a,b,c,d"),
+    (common.region.parse_circle, "0,0,-1"),
+])
+def test_invalid(parse, text: str) -> None:
+    """
+    Tests that malformed regions are rejected as argument errors.
+
+    Args:
+        parse (Callable): The parser.
+        text (str): The command line argument.
+    """
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse(text)
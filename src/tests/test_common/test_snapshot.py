@@ -0,0 +1,134 @@
+# Copyright (c) 2022 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import json
+import random
+
+import common.snapshot
+import pytest
+from common.delta import ADD, CHANGE, DELETE, Differ
+from common.region import Rectangle
+
+OBJECTS = [
+    {
+        'type': 1, 'id': index, 'number': index, 'owner': index % 4, 'build_timestamp': 1650000000,
+        'x': index * 400 - 2000, 'y': 0, 'z': 10, 'yaw': 0, 'tilt': 0, 'roll': 0,
+        'model': f'wall{index % 3}.rwx', 'description': None if index % 5 else 'sign', 'action': '',
+    }
+    for index in range(20)
+]
+
+
+@pytest.fixture(params=["numpy", "array"])
+def vectorised(request, monkeypatch) -> None:
+    """
+    Runs a test with NumPy, if installed, and with the plain loops used without it.
+    """
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(common.snapshot, "numpy", None)
+
+def test_round_trip(tmp_path) -> None:
+    """
+    Tests that a snapshot streamed from a backup rebuilds the same objects, sharing their strings.
+
+    Args:
+        tmp_path (Path): The temporary directory.
+    """
+    file = tmp_path / "backup.json"
+    file.write_text("".join(json.dumps(record) + "\n" for record in OBJECTS))
+    snapshot = common.snapshot.Snapshot.from_file(str(file))
+
+    assert len(snapshot) == len(OBJECTS)
+    assert list(snapshot) == OBJECTS
+    assert len(snapshot.table) == 5
+    assert snapshot.nbytes < 100 * len(OBJECTS)
+
+def test_region_and_cells(vectorised) -> None:
+    """
+    Tests region masks and grouping by cell.
+    """
+    snapshot = common.snapshot.Snapshot.from_records(OBJECTS + [{**OBJECTS[0], 'x': None}])
+    mask = snapshot.region_mask(Rectangle(0, 0, 1, 0))
+    groups = snapshot.group_by_cell()
+
+    assert [index for index, inside in enumerate(mask) if inside] == [5, 6, 7, 8, 9]
+    assert {cell: [int(index) for index in group] for cell, group in groups.items() if cell[0] < 0} == {
+        (-2, 0): [0, 1, 2],
+        (-1, 0): [3, 4],
+    }
+    assert sum(len(group) for group in groups.values()) == len(OBJECTS)
+
+def test_diff(vectorised) -> None:
+    """
+    Tests that comparing snapshots finds what a delta would.
+    """
+    live = [dict(record) for record in OBJECTS[2:]] + [{**OBJECTS[0], 'x': 99000}]
+    live[0]['yaw'] = 900
+    base = common.snapshot.Snapshot.from_records(OBJECTS)
+    added, changed, deleted = common.snapshot.Snapshot.from_records(live).diff(base)
+    expected = list(Differ('objects').diff(lambda: OBJECTS, live))
+
+    assert [live[index] for index in added] == [record for operation, record in expected if operation == ADD]
+    assert [live[index] for index in changed] == [record for operation, record in expected if operation == CHANGE]
+    assert [OBJECTS[index] for index in deleted] == [record for operation, record in expected if operation == DELETE]
+
+def stacked(description: str, index: int = 0) -> dict:
+    return {**OBJECTS[index], 'description': description}
+
+def shuffled(seed: int) -> tuple[list, list]:
+    generator = random.Random(seed)
+    pick = lambda: stacked(generator.choice('abc'), generator.choice((0, 1, 2)))
+
+    return [pick() for _ in range(5)], [pick() for _ in range(6)]
+
+@pytest.mark.parametrize("base, live", [
+    ([stacked('a'), stacked('b')], [stacked('b'), stacked('a')]),
+    ([stacked('a')], [stacked('a'), stacked('a')]),
+    ([stacked('a')], [stacked('b'), stacked('a')]),
+    ([stacked('a'), stacked('a')], [stacked('a')]),
+    ([stacked('a'), stacked('b')], [stacked('a'), stacked('c')]),
+    ([stacked('a'), stacked('b')], [stacked('c')]),
+    ([stacked('a'), stacked('a', 1)], [stacked('b'), stacked('c'), stacked('a', 1), stacked('b', 2)]),
+    ([], [stacked('a')]),
+    ([stacked('a')], []),
+    *(shuffled(seed) for seed in range(5)),
+])
+def test_diff_duplicates(vectorised, base: list, live: list) -> None:
+    """
+    Tests that objects sharing an identity are matched one for one, as a delta would.
+
+    Args:
+        base (list): The base objects.
+        live (list): The live objects.
+    """
+    added, changed, deleted = common.snapshot.Snapshot.from_records(live).diff(
+        common.snapshot.Snapshot.from_records(base)
+    )
+    positions = {id(record): index for records in (base, live) for index, record in enumerate(records)}
+    expected = {ADD: [], CHANGE: [], DELETE: []}
+
+    for operation, record in Differ('objects').diff(lambda: iter(base), live):
+        expected[operation].append(positions[id(record)])
+
+    assert [int(index) for index in added] == sorted(expected[ADD])
+    assert [int(index) for index in changed] == sorted(expected[CHANGE])
+    assert [int(index) for index in deleted] == sorted(expected[DELETE])
@@ -0,0 +1,89 @@
+# Copyright (c) 2022 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import argparse
+
+import common.index
+import common.summary
+import pytest
+
+RECORDS = [
+    {"x": 0, "z": 0, "model": "wall01.rwx", "owner": 1},
+    {"x": 1500, "z": -200, "model": "wall01.rwx", "owner": 2},
+    {"x": 1600, "z": -300, "model": "sign.rwx", "owner": 1},
+    {"name": "ATTRIBUTE_1", "value": "1"},
+]
+
+
+def test_summary() -> None:
+    """
+    Tests that records are counted, bounded and histogrammed.
+    """
+    summary = common.summary.Summary()
+
+    for record in RECORDS:
+        summary.add(record)
+
+    assert summary.as_dict(top=1) == {
+        "records": 4,
+        "bounds": [0, -300, 1600, 0],
+        "cells": 2,
+        "top_cells": [[1, -1, 2]],
+        "histograms": {"model": [["wall01.rwx", 2]], "owner": [[1, 2]]},
+    }
+    assert "model    2 distinct" in summary.format()
+
+def test_summary_from_index() -> None:
+    """
+    Tests that an index summarizes a backup the same way as reading it, without histograms.
+    """
+    builder = common.index.IndexBuilder()
+    summary = common.summary.Summary(histograms=())
+
+    for offset, record in enumerate(RECORDS):
+        builder.add((offset, 0), record)
+        summary.add(record)
+
+    assert common.summary.Summary.from_index(builder.index).as_dict() == summary.as_dict()
+
+@pytest.mark.parametrize("conditions, expected", [
+    ([], 4),
+    ([("owner", "1")], 2),
+    ([("owner", "1"), ("model", "sign.rwx")], 1),
+    ([("name", "missing")], 0),
+])
+def test_matches(conditions: list, expected: int) -> None:
+    """
+    Tests that records must meet every condition, compared as text.
+
+    Args:
+        conditions (list): The conditions.
+        expected (int): The number of matching records.
+    """
+    assert sum(common.summary.matches(record, conditions) for record in RECORDS) == expected
+
+def test_parse_condition() -> None:
+    """
+    Tests that conditions are parsed from field=value, the value possibly holding =.
+    """
+    assert common.summary.parse_condition("action=create a=b") == ("action", "create a=b")
+
+    with pytest.raises(argparse.ArgumentTypeError):
+        common.summary.parse_condition("owner")
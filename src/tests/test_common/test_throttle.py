@@ -0,0 +1,128 @@
+# Copyright (c) 2022 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import common.throttle
+import pytest
+from common.throttle import AIMD, PERMANENT, THROTTLED, TRANSIENT
+
+
+class Flaky:
+    def __init__(self, failures: list):
+        self.failures = list(failures)
+        self.calls = 0
+
+    def __call__(self, value: int) -> int:
+        self.calls += 1
+
+        if self.failures:
+            raise self.failures.pop(0)
+
+        return value
+
+
+@pytest.mark.parametrize("exception, kind", [
+    (TimeoutError(), TRANSIENT),
+    (Exception("Connection reset"), TRANSIENT),
+    (Exception("aw_object_load failed: rate limited"), THROTTLED),
+    (Exception("Failed to set initialization attribute: 451"), PERMANENT),
+])
+def test_classify(exception: Exception, kind: str) -> None:
+    """
+    Tests that failures are classified from their type and message.
+
+    Args:
+        exception (Exception): The failure.
+        kind (str): The expected kind.
+    """
+    assert common.throttle.classify(exception) == kind
+
+def test_aimd() -> None:
+    """
+    Tests that the limit doubles until congestion, halves once per cooldown
+    and grows additively afterwards.
+    """
+    aimd = AIMD(initial=10, maximum=100, increase=10, cooldown=60)
+
+    for _ in range(10):
+        aimd.success()
+    assert aimd.limit == 20
+
+    aimd.congestion()
+    aimd.congestion()
+    assert aimd.limit == 10
+
+    for _ in range(10):
+        aimd.success()
+    assert 15 < aimd.limit < 20
+
+    for _ in range(1000):
+        aimd.success()
+    assert aimd.limit == 100
+
+def test_rate_controller_retries() -> None:
+    """
+    Tests that throttled and transient failures are retried and slow the rate down,
+    while permanent failures and exhausted retries are raised.
+    """
+    controller = common.throttle.RateController(AIMD(initial=1000), retries=2, base_delay=0.001)
+    func = Flaky([Exception("rate limited"), TimeoutError()])
+
+    assert controller.call(func, 1) == 1
+    assert (func.calls, controller.retried, controller.throttled) == (3, 2, 1)
+    assert controller.rate.limit < 1000
+
+    func = Flaky([ValueError("bad record")])
+    with pytest.raises(ValueError):
+        controller.call(func, 1)
+    assert func.calls == 1
+
+    func = Flaky([TimeoutError()] * 3)
+    with pytest.raises(TimeoutError):
+        controller.call(func, 1)
+    assert func.calls == 3
+
+def test_unsafe_calls() -> None:
+    """
+    Tests that calls which are not idempotent are only retried when throttled, unless asked to.
+    """
+    controller = common.throttle.RateController(retries=2, base_delay=0.001)
+    func = Flaky([Exception("rate limited"), TimeoutError()])
+
+    with pytest.raises(TimeoutError):
+        controller.call(func, 1, idempotent=False)
+    assert func.calls == 2
+
+    controller = common.throttle.RateController(retries=2, base_delay=0.001, retry_unsafe=True)
+    func = Flaky([Exception("rate limited"), TimeoutError()])
+
+    assert controller.call(func, 1, idempotent=False) == 1
+    assert func.calls == 3
+
+def test_backoff() -> None:
+    """
+    Tests that backoffs are jittered below an exponentially growing, capped bound.
+    """
+    controller = common.throttle.RateController(base_delay=1, max_delay=4, seed=0)
+
+    for attempt in range(6):
+        delays = [controller.backoff(attempt) for _ in range(100)]
+
+        assert all(0 <= delay <= min(4, 2 ** attempt) for delay in delays)
+        assert len(set(delays)) > 1
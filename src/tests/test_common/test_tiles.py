@@ -0,0 +1,101 @@
+# Copyright (c) 2022 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import common.columnar
+import common.file
+import common.tiles
+import pytest
+
+
+def node(page_x: int, node_x: int, node_z: int, size: int, heights: list, textures: list) -> dict:
+    return {
+        'page_x': page_x, 'page_z': 0, 'node_x': node_x, 'node_z': node_z, 'node_size': size,
+        'heights': heights, 'textures': textures,
+    }
+
+DENSE = [node(0, 0, 0, 2, [1, -2, 300, 4], [7, 8, 9, 10]), node(0, 4, 2, 1, [70000], [1])]
+FLAT = [node(1, 0, 0, 2, [5] * 4, [3] * 4), node(1, 2, 0, 2, [5] * 4, [3] * 4)]
+OVERLAPPING = [node(2, 0, 0, 2, [1] * 4, [1] * 4), node(2, 1, 1, 2, [2] * 4, [2] * 4)]
+
+
+@pytest.mark.parametrize("nodes, flat", [(DENSE, False), (FLAT, True)])
+def test_page_round_trip(nodes: list, flat: bool) -> None:
+    """
+    Tests that the nodes of a page encoded as tiles decode back unchanged.
+
+    Args:
+        nodes (list): The nodes of the page.
+        flat (bool): Whether the page is stored without tiles.
+    """
+    block = common.tiles.encode_page(nodes)
+    magic, kind, count, size = common.columnar._BLOCK_HEADER.unpack_from(block)
+    payload = block[common.columnar._BLOCK_HEADER.size:]
+
+    assert (magic, kind, count, size) == (common.columnar.BLOCK_MAGIC, common.columnar.TILES, len(nodes), len(payload))
+    assert common.tiles.decode_page(count, payload) == nodes
+    assert (size == common.tiles._PAGE_HEADER.size + 6 * len(nodes)) == flat
+
+@pytest.mark.parametrize("nodes", [
+    OVERLAPPING,
+    [node(3, 127, 0, 2, [1] * 4, [1] * 4)],
+    [node(3, 0, 0, 2, [1] * 4, [])],
+])
+def test_untileable_pages(nodes: list) -> None:
+    """
+    Tests that pages whose nodes overlap, leave the page or miss cells are not tiled.
+
+    Args:
+        nodes (list): The nodes of the page.
+    """
+    assert common.tiles.encode_page(nodes) is None
+
+def test_writer(tmp_path) -> None:
+    """
+    Tests that terrain written as tiles loads back in order, with the pages listed by the page index.
+
+    Args:
+        tmp_path (Path): The temporary directory.
+    """
+    file = str(tmp_path / "backup.kwb")
+    nodes = DENSE + FLAT + OVERLAPPING
+
+    with common.tiles.TileWriter(file) as writer:
+        writer.write_many(nodes)
+
+    assert list(common.file.load(file, file_format="columnar")) == nodes
+
+    with open(file, "rb") as f:
+        common.columnar.read_header(f)
+        assert [(page, count, flat) for _, page, count, flat in common.tiles.pages(f)] == [
+            ((0, 0), 2, False), ((1, 0), 2, True)
+        ]
+
+def test_writer_rejects_older_files(tmp_path) -> None:
+    """
+    Tests that tiles are not appended to a backup written before they existed.
+
+    Args:
+        tmp_path (Path): The temporary directory.
+    """
+    file = tmp_path / "backup.kwb"
+    file.write_bytes(common.columnar._FILE_HEADER.pack(common.columnar.MAGIC, 2))
+
+    with pytest.raises(ValueError):
+        common.tiles.TileWriter(str(file)).open()
@@ -0,0 +1,130 @@
+# Copyright (c) 2022 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import argparse
+
+import common.transform
+import pytest
+from common.region import Rectangle, contains
+
+OBJECT = {
+    'type': 1, 'id': 1, 'number': 1, 'owner': 4, 'build_timestamp': 1650000000,
+    'x': 1500, 'y': 20, 'z': -500, 'yaw': 3000, 'tilt': 0, 'roll': 0,
+    'model': 'wall01.rwx', 'description': '', 'action': '',
+}
+
+
+@pytest.mark.parametrize("vectorised", [True, False])
+def test_apply(monkeypatch, vectorised: bool) -> None:
+    """
+    Tests that objects are clipped, renamed, rotated and translated, with and without NumPy.
+
+    Args:
+        monkeypatch (MonkeyPatch): Hides NumPy.
+        vectorised (bool): Whether to use NumPy.
+    """
+    if vectorised:
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(common.transform, "numpy", None)
+
+    transformation = common.transform.Transformation(
+        translate=(10, 1, -10),
+        angle=90,
+        pivot=(1000, 0),
+        region=Rectangle(0, -1, 1, 0),
+        models={'wall01.rwx': 'wall02.rwx'}
+    )
+    records = transformation.apply([dict(OBJECT), {**OBJECT, 'x': 5000}, {**OBJECT, 'model': 'pp01.rwx'}])
+
+    assert records == [
+        {**OBJECT, 'x': 510, 'y': 21, 'z': -510, 'yaw': 300, 'model': 'wall02.rwx'},
+        {**OBJECT, 'x': 510, 'y': 21, 'z': -510, 'yaw': 300, 'model': 'pp01.rwx'},
+    ]
+
+@pytest.mark.parametrize("vectorised", [True, False])
+def test_apply_keeps_missing_fields(monkeypatch, vectorised: bool) -> None:
+    """
+    Tests that an object without a y or a yaw is moved without one.
+
+    Args:
+        monkeypatch (MonkeyPatch): Hides NumPy.
+        vectorised (bool): Whether to use NumPy.
+    """
+    if vectorised:
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(common.transform, "numpy", None)
+
+    records = common.transform.Transformation(translate=(10, 1, -10), angle=90, pivot=(1000, 0)).apply([
+        {'x': 1500, 'z': -500, 'model': 'wall01.rwx'},
+        {'x': 1500, 'y': None, 'z': -500, 'yaw': None},
+        dict(OBJECT),
+    ])
+
+    assert records == [
+        {'x': 510, 'z': -510, 'model': 'wall01.rwx'},
+        {'x': 510, 'y': None, 'z': -510, 'yaw': None},
+        {**OBJECT, 'x': 510, 'y': 21, 'z': -510, 'yaw': 300},
+    ]
+
+@pytest.mark.parametrize("vectorised", [True, False])
+def test_clip(monkeypatch, vectorised: bool) -> None:
+    """
+    Tests that clipping keeps the objects of the region's cells, on either side of 0.
+
+    Args:
+        monkeypatch (MonkeyPatch): Hides NumPy.
+        vectorised (bool): Whether to use NumPy.
+    """
+    if vectorised:
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(common.transform, "numpy", None)
+
+    records = [{'x': x, 'z': z} for x in range(-2500, 2500, 700) for z in range(-1500, 1500, 900)]
+    region = Rectangle(-1, -1, 0, 0)
+    kept = common.transform.Transformation(region=region).apply([dict(record) for record in records])
+
+    assert kept == [record for record in records if contains(region, record)]
+    assert 0 < len(kept) < len(records)
+
+def test_apply_rejects_other_records() -> None:
+    """
+    Tests that records without coordinates, such as terrain, are refused.
+    """
+    with pytest.raises(ValueError):
+        common.transform.Transformation(translate=(1, 0, 0)).apply([{'page_x': 0, 'page_z': 0}])
+
+def test_parse() -> None:
+    """
+    Tests the command line arguments of a transformation.
+    """
+    assert common.transform.parse_translation("1,-2,3") == (1, -2, 3)
+    assert common.transform.parse_point("5,6") == (5, 6)
+    assert common.transform.parse_rename("a.rwx=b=c.rwx") == ("a.rwx", "b=c.rwx")
+
+    for parse, text in [
+        (common.transform.parse_translation, "1,2"),
+        (common.transform.parse_point, "a,b"),
+        (common.transform.parse_rename, "a.rwx"),
+    ]:
+        with pytest.raises(argparse.ArgumentTypeError):
+            parse(text)
@@ -0,0 +1,108 @@
+# Copyright (c) 2022 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import json
+
+import pytest
+
+from common.file import IndexedReader, RecordWriter
+from common.index import IndexBuilder
+from common.region import Rectangle
+from management.commands import Inspect
+
+
+def _write_backup(file: str, indexed: bool) -> None:
+    builder = IndexBuilder()
+
+    with RecordWriter(file) as writer:
+        for index in range(100):
+            record = {"x": index * 300, "z": 0, "model": f"wall{index % 3}.rwx", "owner": index % 4}
+            builder.add(writer.write(json.dumps(record)), record)
+
+    if indexed:
+        builder.index.write_sidecar(file)
+
+def test_inspect_region(tmp_path, capsys) -> None:
+    """
+    Tests that a region reads the same records through the index as by scanning the backup.
+
+    Args:
+        tmp_path (Path): The temporary directory.
+        capsys (CaptureFixture): Captures the printed summary.
+    """
+    reports = list()
+
+    for indexed in (False, True):
+        file = str(tmp_path / f"backup_{indexed}.json")
+        _write_backup(file, indexed)
+        command = Inspect(file, region=Rectangle(2, 0, 4, 0), where=[("owner", "1")], as_json=True)
+        command.execute()
+        reports.append(command.report)
+
+        assert json.loads(capsys.readouterr().out) == command.report
+
+    assert reports[0] == reports[1]
+    assert reports[0]["records"] == 2
+    assert reports[0]["bounds"] == [2700, 0, 3900, 0]
+
+def test_inspect_extract(tmp_path, capsys) -> None:
+    """
+    Tests that matching records are extracted up to the head, and that
+    a summary without histograms is read off the index.
+
+    Args:
+        tmp_path (Path): The temporary directory.
+        capsys (CaptureFixture): Captures the extracted records.
+    """
+    file = str(tmp_path / "backup.json")
+    _write_backup(file, indexed=True)
+
+    Inspect(file, where=[("model", "wall2.rwx")], head=3, extract="-").execute()
+    assert [json.loads(line)["x"] for line in capsys.readouterr().out.splitlines()] == [600, 1500, 2400]
+
+    command = Inspect(file, histograms=())
+    command.execute()
+    assert command.metrics.records == 0
+    assert command.report["records"] == 100
+
+def test_inspect_stale_index(tmp_path) -> None:
+    """
+    Tests that a backup appended to after being indexed is read in full, not off its index.
+
+    Args:
+        tmp_path (Path): The temporary directory.
+    """
+    file = str(tmp_path / "backup.json")
+    _write_backup(file, indexed=True)
+
+    with RecordWriter(file) as writer:
+        writer.write(json.dumps({"x": 5000, "z": 0, "model": "wall0.rwx", "owner": 1}))
+
+    command = Inspect(file, histograms=())
+    command.execute()
+    assert command.metrics.records == 101
+    assert command.report["records"] == 101
+
+    command = Inspect(file, region=Rectangle(5, 0, 5, 0))
+    command.execute()
+    assert command.report["records"] == 4
+
+    with pytest.raises(ValueError):
+        IndexedReader(file)
@@ -0,0 +1,133 @@
+# Copyright (c) 2022 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import argparse
+import subprocess
+import sys
+
+import pytest
+from common.index import SUFFIX, Index
+from common.metrics import Metrics
+from management.commands import Aggregate
+from management.invoker import LocalInvoker
+
+
+class Counting:
+    def __init__(self, name: str, records: int, fail: bool = False):
+        self.metrics = Metrics(name)
+        self._records = records
+        self._fail = fail
+
+    def execute(self):
+        self.metrics = Metrics(self.metrics.name, records=self._records)
+
+        if self._fail:
+            raise RuntimeError(self.metrics.name)
+
+
+class Collecting:
+    def __init__(self):
+        self.reports = list()
+
+    def write(self, metrics: list) -> None:
+        self.reports.append([each.name for each in metrics])
+
+
+def test_invoke_reports_metrics() -> None:
+    """
+    Tests that every invocation, failed ones included, is reported to the sinks.
+    """
+    sink = Collecting()
+    invoker = LocalInvoker()\
+        .register("SAVE OBJECTS", Counting("SAVE OBJECTS", 3))\
+        .register("LOAD OBJECTS", Counting("LOAD OBJECTS", 0, fail=True))\
+        .add_sink(sink)
+
+    invoker.invoke("SAVE OBJECTS")
+
+    with pytest.raises(RuntimeError):
+        invoker.invoke("LOAD OBJECTS")
+
+    assert sink.reports == [["SAVE OBJECTS"], ["SAVE OBJECTS", "LOAD OBJECTS"]]
+    assert [each.records for each in invoker.metrics] == [3, 0]
+    assert invoker.metrics[1].error == "RuntimeError: LOAD OBJECTS"
+    assert len(invoker.history) == 1
+
+def test_aggregate_children_metrics() -> None:
+    """
+    Tests that an aggregate reports the metrics of each of its commands.
+    """
+    invoker = LocalInvoker().register("SAVE ALL", Aggregate(
+        Counting("SAVE OBJECTS", 3),
+        Counting("SAVE TERRAIN", 4)
+    ))
+
+    invoker.invoke("SAVE ALL")
+    metrics = invoker.metrics[0]
+
+    assert (metrics.name, metrics.records) == ("SAVE ALL", 7)
+    assert [(each.name, each.records) for each in metrics.children] == [
+        ("SAVE OBJECTS", 3),
+        ("SAVE TERRAIN", 4),
+    ]
+
+def test_offline_reindex(tmp_path) -> None:
+    """
+    Tests that an offline invoker rebuilds the index a save wrote, without the SDK.
+
+    Args:
+        tmp_path (Path): The temporary directory.
+    """
+    file = tmp_path / "backup.json"
+    lines = [f'{{"x": {index * 700}, "z": 0, "model": "wall.rwx"}}' for index in range(10)]
+    file.write_text("\n".join(lines) + "\n")
+
+    args = argparse.Namespace(file=str(file), stride=4)
+    LocalInvoker.create_offline(args).invoke("REINDEX")
+    index = Index.read(str(file) + SUFFIX)
+
+    assert (index.records, index.stride, len(index.offsets)) == (10, 4, 3)
+    assert sorted(index.cells) == [(x, 0) for x in range(7)]
+
+def test_offline_startup(tmp_path) -> None:
+    """
+    Tests that the command line runs offline commands without loading the SDK or any world command.
+
+    Args:
+        tmp_path (Path): The temporary directory.
+    """
+    file = tmp_path / "backup.json"
+    file.write_text('{"x": 0, "z": 0}\n')
+    code = (
+        "import sys, cli\n"
+        f"sys.argv = ['cli', 'reindex', {str(file)!r}]\n"
+        "cli.main()\n"
+        "print(' '.join(sys.modules))"
+    )
+    completed = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    modules = completed.stdout.split()
+
+    assert (tmp_path / ("backup.json" + SUFFIX)).exists()
+    assert "management.commands.reindex" in modules
+    assert not [
+        name for name in modules
+        if name.startswith(("korth_spirit", "management.instance", "management.simulator"))
+        or name in ("management.commands.load", "management.commands.aggregate")
+    ]
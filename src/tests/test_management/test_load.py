@@ -0,0 +1,243 @@
+# Copyright (c) 2022 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import argparse
+import json
+import os
+from functools import partial
+
+import pytest
+from common.checkpoint import Checkpoint, checkpoint_file
+from common.file import RecordWriter
+from management import sdk
+from management.commands import Load, Save
+from management.instance import ReceiverInstance
+from management.invoker import LocalInvoker
+from common.throttle import AIMD, RateController
+from management.simulator import (SimulatedError, SimulatedInstance,
+                                  Simulator)
+
+
+class Failing(Simulator):
+    def __init__(self, fail_at: int = None):
+        super().__init__()
+        self._fail_at = fail_at
+
+    def aw_object_load(self, data) -> int:
+        if len(self.loaded) == self._fail_at:
+            raise SimulatedError("aw_object_load", "error")
+
+        return super().aw_object_load(data)
+
+
+@pytest.mark.parametrize("compression", [None, "gzip"])
+def test_resume(tmp_path, compression: str) -> None:
+    """
+    Tests that an interrupted load resumes right after the last loaded record.
+
+    Args:
+        tmp_path (Path): The temporary directory.
+        compression (str): The codec the backup is compressed with.
+    """
+    file, state = str(tmp_path / "backup.json"), str(tmp_path / "state")
+
+    with RecordWriter(file, buffer_size=256, compression=compression) as writer:
+        for index in range(100):
+            writer.write(json.dumps({"x": index, "z": 0, "model": "wall.rwx"}))
+
+    first = Failing(fail_at=37)
+    sdk.use(first)
+
+    with pytest.raises(SimulatedError):
+        Load(
+            SimulatedInstance(first),
+            "objects",
+            file,
+            checkpoint_every=10,
+            controller=RateController(retries=0),
+            checkpoint_dir=state
+        ).execute()
+
+    assert Checkpoint.read(checkpoint_file(file, state)).records == 37
+
+    second = Simulator()
+    sdk.use(second)
+    resumed = Load(SimulatedInstance(second), "objects", file, resume=True, checkpoint_dir=state)
+    resumed.execute()
+
+    assert [each.x for each in first.loaded + second.loaded] == list(range(100))
+    assert 0 < resumed.metrics.bytes < os.path.getsize(file)
+    assert os.listdir(state) == []
+
+def test_no_checkpoints(tmp_path) -> None:
+    """
+    Tests that a load only checkpoints when given a directory to, and only resumes from one.
+
+    Args:
+        tmp_path (Path): The temporary directory.
+    """
+    file = str(tmp_path / "backup.json")
+
+    with RecordWriter(file) as writer:
+        for index in range(10):
+            writer.write(json.dumps({"x": index, "z": 0, "model": "wall.rwx"}))
+
+    simulator = Simulator()
+    sdk.use(simulator)
+    command = Load(SimulatedInstance(simulator), "objects", file)
+    command.execute()
+
+    assert len(simulator.loaded) == 10
+    assert command.metrics.bytes == os.path.getsize(file)
+    assert os.listdir(tmp_path) == ["backup.json"]
+
+    with pytest.raises(ValueError):
+        Load(SimulatedInstance(simulator), "objects", file, resume=True)
+
+
+def test_resume_all(tmp_path) -> None:
+    """
+    Tests that resuming LOAD ALL skips the parts already loaded, continues the interrupted
+    one and loads the parts never started from the start.
+
+    Args:
+        tmp_path (Path): The temporary directory.
+    """
+    file, state = str(tmp_path / "backup"), str(tmp_path / "state")
+    parts = {
+        "attributes": [{"name": f"ATTRIBUTE_{index}", "value": str(index)} for index in range(5)],
+        "objects": [{"x": index, "z": 0, "model": "wall.rwx"} for index in range(100)],
+        "terrain": [{"page_x": 0, "page_z": 0, "node_x": index, "node_z": 0, "node_size": 1,
+                     "heights": [0], "textures": [0]} for index in range(8)],
+    }
+
+    for query_type, records in parts.items():
+        with RecordWriter(f"{file}_{query_type}") as writer:
+            for record in records:
+                writer.write(json.dumps(record))
+
+    def _load_all(simulator: Simulator, resume: bool) -> None:
+        sdk.use(simulator)
+        args = argparse.Namespace(file=file, resume=resume, checkpoint_dir=state, checkpoint_every=10, retries=0)
+        LocalInvoker.create_loaded(SimulatedInstance(simulator), args).invoke("LOAD ALL")
+
+    first = Failing(fail_at=37)
+    with pytest.raises(SimulatedError):
+        _load_all(first, resume=False)
+
+    assert Checkpoint.read(checkpoint_file(f"{file}_attributes", state)).complete
+
+    second = Simulator()
+    _load_all(second, resume=True)
+
+    assert (first.calls["write_data"], second.calls.get("write_data", 0)) == (5, 0)
+    assert [each.x for each in first.loaded + second.loaded] == list(range(100))
+    assert (first.calls.get("aw_terrain_load_node", 0), second.calls["aw_terrain_load_node"]) == (0, 8)
+    assert os.listdir(state) == []
+
+def test_throttled_load(tmp_path) -> None:
+    """
+    Tests that a load against a throttling, flaky server retries until every record is loaded
+    when asked to retry transient object load failures, and only retries throttling otherwise.
+
+    Args:
+        tmp_path (Path): The temporary directory.
+    """
+    file = str(tmp_path / "backup.json")
+
+    with RecordWriter(file) as writer:
+        for index in range(200):
+            writer.write(json.dumps({"x": index, "z": 0, "model": "wall.rwx"}))
+
+    simulator = Simulator(seed=1, calls={
+        "aw_object_load": {"rate": 2000, "throttle": "reject", "error_rate": 0.05}
+    })
+    sdk.use(simulator)
+    controller = RateController(AIMD(initial=4000), retries=10, base_delay=0.001, max_delay=0.01)
+
+    with pytest.raises(SimulatedError):
+        Load(SimulatedInstance(simulator), "objects", file, controller=controller).execute()
+    assert 0 < len(simulator.loaded) < 200
+
+    simulator = Simulator(seed=1, calls={
+        "aw_object_load": {"rate": 2000, "throttle": "reject", "error_rate": 0.05}
+    })
+    sdk.use(simulator)
+    controller = RateController(AIMD(initial=4000), retries=10, base_delay=0.001, max_delay=0.01, retry_unsafe=True)
+
+    command = Load(SimulatedInstance(simulator), "objects", file, controller=controller)
+    command.execute()
+
+    assert [each.x for each in simulator.loaded] == list(range(200))
+    assert command.metrics.bytes == os.path.getsize(file)
+    assert controller.retried > 0
+    assert simulator.failures
+
+def test_concurrent_window(tmp_path) -> None:
+    """
+    Tests that a concurrent load against a throttling server loads every record
+    and keeps fewer batches in flight than it may.
+
+    Args:
+        tmp_path (Path): The temporary directory.
+    """
+    file, config = str(tmp_path / "backup.json"), str(tmp_path / "configuration.json")
+
+    with RecordWriter(file) as writer:
+        for index in range(300):
+            writer.write(json.dumps({"x": index, "z": 0, "model": "wall.rwx"}))
+
+    with open(config, "w") as f:
+        json.dump({"simulator": {"seed": 1, "calls": {"aw_object_load": {"rate": 100, "throttle": "reject"}}}}, f)
+
+    simulator = Simulator()
+    sdk.use(simulator)
+    command = Load(
+        SimulatedInstance(simulator),
+        "objects",
+        file,
+        workers=2,
+        max_pending=16,
+        instance_factory=partial(ReceiverInstance, config),
+        controller=RateController(AIMD(initial=4000), retries=50, base_delay=0.001, max_delay=0.01),
+        batch_size=10
+    )
+    command.execute()
+
+    assert command.metrics.records == 300
+    assert command.window.limit < 16
+
+def test_load_detects_format(tmp_path) -> None:
+    """
+    Tests that a columnar backup loads whatever format was asked for.
+
+    Args:
+        tmp_path (Path): The temporary directory.
+    """
+    file = str(tmp_path / "backup.kwb")
+    source = Simulator(objects=50)
+    sdk.use(source)
+    Save(SimulatedInstance(source), "objects", file, file_format="columnar").execute()
+
+    simulator = Simulator()
+    sdk.use(simulator)
+    Load(SimulatedInstance(simulator), "objects", file).execute()
+
+    assert len(simulator.loaded) == 50
@@ -0,0 +1,219 @@
+# Copyright (c) 2022 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import json
+import random
+import threading
+import time
+
+import management.commands.save
+import pytest
+from common.codec import encode_many
+from common.index import cell_of
+from common.region import Rectangle
+from common.throttle import RateController
+from management import sdk
+from management.commands import Load, Save
+from management.instance import ReceiverInstance
+from management.simulator import (Latency, RateLimiter, SimulatedError,
+                                  SimulatedInstance, Simulator)
+
+
+@pytest.mark.parametrize("distribution", ["constant", "uniform", "normal", "lognormal", "exponential"])
+def test_latency(distribution: str) -> None:
+    """
+    Tests that every distribution keeps its mean and never goes negative.
+
+    Args:
+        distribution (str): The distribution.
+    """
+    latency = Latency(distribution, mean=0.01, spread=0.005)
+    rng = random.Random(1)
+    samples = [latency.sample(rng) for _ in range(20_000)]
+
+    assert min(samples) >= 0
+    assert sum(samples) / len(samples) == pytest.approx(0.01, rel=0.05)
+
+def test_rate_limiter() -> None:
+    """
+    Tests that the limiter allows a second worth of calls, then rejects or delays.
+    """
+    limiter = RateLimiter(100)
+
+    assert all(limiter.acquire(wait=False) for _ in range(100))
+    assert not limiter.acquire(wait=False)
+
+    start = time.monotonic()
+    for _ in range(5):
+        limiter.acquire()
+
+    assert time.monotonic() - start >= 0.03
+
+def test_error_rate() -> None:
+    """
+    Tests that calls fail at the configured rate, reproducibly with a seed.
+    """
+    def _failures():
+        simulator = Simulator(seed=7, calls={"aw_object_load": {"error_rate": 0.2}})
+        failed = list()
+
+        for index in range(1000):
+            try:
+                simulator.aw_object_load(Simulator.ObjectLoadData(x=index, z=0))
+            except SimulatedError as e:
+                failed.append(index)
+                assert e.reason == "error"
+
+        simulator.aw_terrain_load_node(Simulator.TerrainNodeData())
+        return failed, simulator
+
+    failed, simulator = _failures()
+
+    assert 150 < len(failed) < 250
+    assert failed == _failures()[0]
+    assert simulator.failures == {"aw_object_load": len(failed)}
+    assert len(simulator.loaded) == 1000 - len(failed)
+
+def test_save_and_load(tmp_path) -> None:
+    """
+    Tests that a world saved from the simulator loads back into an empty one.
+
+    Args:
+        tmp_path (Path): The temporary directory.
+    """
+    config = tmp_path / "configuration.json"
+    config.write_text(json.dumps({"simulator": {"objects": 500}}))
+    file = str(tmp_path / "backup.json")
+
+    with ReceiverInstance(str(config)) as instance:
+        Save(instance, "objects", file).execute()
+
+        simulator = instance.simulator
+        simulator.aw_delete_all_objects()
+        Load(instance, "objects", file).execute()
+
+        assert simulator.calls["aw_object_load"] == 500
+        assert [
+            (each.x, each.z, each.model)
+            for each in instance.query(sdk.QueryEnum.OBJECT)
+        ] == [
+            (each["x"], each["z"], each["model"])
+            for each in map(json.loads, open(file))
+        ]
+
+def test_save_queries_in_pipeline(tmp_path) -> None:
+    """
+    Tests that a whole world save queries the world on the pipeline's query stage.
+
+    Args:
+        tmp_path (Path): The temporary directory.
+    """
+    threads = list()
+
+    class Recording(Simulator):
+        def query(self, query, x: int = None, z: int = None) -> list:
+            threads.append(threading.current_thread().name)
+            return super().query(query, x=x, z=z)
+
+    simulator = Recording(objects=10)
+    sdk.use(simulator)
+    Save(SimulatedInstance(simulator), "objects", str(tmp_path / "backup.json")).execute()
+
+    assert threads == ["query"]
+
+def test_save_incomplete(tmp_path, monkeypatch) -> None:
+    """
+    Tests that a save writing every record but one keeps them and still fails.
+
+    Args:
+        tmp_path (Path): The temporary directory.
+        monkeypatch (MonkeyPatch): Breaks the encoding of a record.
+    """
+    file = str(tmp_path / "backup.json")
+    simulator = Simulator(objects=100)
+    sdk.use(simulator)
+
+    def _encode_many(records: list) -> list:
+        if any(each.number == 7 for each in records):
+            raise ValueError("unencodable")
+
+        return encode_many(records)
+
+    monkeypatch.setattr(management.commands.save, "encode_many", _encode_many)
+    command = Save(SimulatedInstance(simulator), "objects", file)
+
+    with pytest.raises(ValueError, match="incomplete"):
+        command.execute()
+
+    assert command.metrics.failures == 1
+    assert sum(1 for _ in open(file)) == 99
+
+def test_delete() -> None:
+    """
+    Tests that deleted objects, synthetic or loaded, are no longer queried.
+    """
+    simulator = Simulator(objects=10)
+    simulator.aw_object_load(Simulator.ObjectLoadData(x=5, z=5, model="loaded.rwx"))
+    deleted = [each for each in simulator.query(Simulator.QueryEnum.OBJECT) if each.number in (3, 10)]
+
+    for each in deleted:
+        assert simulator.aw_object_delete(Simulator.ObjectDeleteData(number=each.number, x=each.x, z=each.z)) == 0
+
+    assert simulator.aw_object_delete(Simulator.ObjectDeleteData(number=3)) != 0
+    assert [each.number for each in simulator.query(Simulator.QueryEnum.OBJECT)] == [0, 1, 2, 4, 5, 6, 7, 8, 9]
+    assert deleted[0].number not in [
+        each.number for each in simulator.query(Simulator.QueryEnum.OBJECT, *cell_of(deleted[0].x, deleted[0].z))
+    ]
+
+def test_region_query_retried(tmp_path) -> None:
+    """
+    Tests that a cell query failing while its records are read is retried, without saving records twice.
+
+    Args:
+        tmp_path (Path): The temporary directory.
+    """
+    class Lazy(Simulator):
+        failed = set()
+
+        def query(self, query, x=None, z=None):
+            records = super().query(query, x=x, z=z)
+
+            for record in records:
+                if (x, z) not in self.failed:
+                    self.failed.add((x, z))
+                    raise SimulatedError("query", "error")
+                yield record
+
+    simulator = Lazy(objects=5000)
+    sdk.use(simulator)
+    region = Rectangle(-100, -100, -95, -90)
+    file = str(tmp_path / "backup.json")
+
+    Save(
+        SimulatedInstance(simulator), "objects", file, region=region,
+        controller=RateController(retries=1, base_delay=0.001)
+    ).execute()
+
+    expected = sorted(
+        each.number for each in Simulator(objects=5000).query(Simulator.QueryEnum.OBJECT)
+        if region.contains_cell(cell_of(each.x, each.z))
+    )
+    assert simulator.failed
+    assert sorted(each["number"] for each in map(json.loads, open(file))) == expected
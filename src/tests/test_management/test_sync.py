@@ -0,0 +1,167 @@
+# Copyright (c) 2022 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from dataclasses import asdict
+
+import pytest
+from management import sdk
+from management.commands import Save, Sync
+from management.simulator import (SimulatedInstance, Simulator,
+                                  synthetic_node, synthetic_object)
+
+OBJECTS = 20
+
+
+def copy(index: int, **changes) -> Simulator.ObjectLoadData:
+    fields = {**asdict(synthetic_object(index)), **changes}
+
+    return Simulator.ObjectLoadData(**{
+        name: fields[name] for name in ('owner', 'build_timestamp', 'type', 'x', 'y', 'z',
+                                        'yaw', 'tilt', 'roll', 'model', 'description', 'action')
+    })
+
+def delete(simulator: Simulator, number: int) -> None:
+    record = next(each for each in simulator.query(Simulator.QueryEnum.OBJECT) if each.number == number)
+    simulator.aw_object_delete(Simulator.ObjectDeleteData(number=number, x=record.x, z=record.z))
+
+def world(simulator: Simulator) -> list:
+    return sorted(
+        (each.x, each.z, each.model, each.yaw, each.description)
+        for each in simulator.query(Simulator.QueryEnum.OBJECT)
+    )
+
+@pytest.fixture
+def simulator() -> Simulator:
+    simulator = Simulator(objects=OBJECTS)
+    sdk.use(simulator)
+
+    return simulator
+
+def snapshot(simulator: Simulator, tmp_path) -> str:
+    file = str(tmp_path / "snapshot.json")
+    Save(SimulatedInstance(simulator), "objects", file).execute()
+
+    return file
+
+
+@pytest.mark.parametrize("stacked", [0, 1, 2])
+@pytest.mark.parametrize("edit, deletes, loads", [
+    (lambda simulator: None, 0, 0),
+    (lambda simulator: delete(simulator, 3), 0, 1),
+    (lambda simulator: simulator.aw_object_load(copy(3)), 1, 0),
+    (lambda simulator: simulator.aw_object_load(copy(7, x=5)), 1, 0),
+    (lambda simulator: (delete(simulator, 5), simulator.aw_object_load(copy(5, yaw=1234))), 1, 1),
+])
+def test_plan(simulator: Simulator, tmp_path, stacked: int, edit, deletes: int, loads: int) -> None:
+    """
+    Tests that a sync against an edited world plans one operation per edit, and makes the world match the snapshot.
+    Objects stacked on object 3 in the snapshot are matched one for one.
+
+    Args:
+        simulator (Simulator): The simulated world.
+        tmp_path (Path): The temporary directory.
+        stacked (int): The number of copies of object 3 stacked on it.
+        edit (Callable[[Simulator], None]): Edits the world after the snapshot was taken.
+        deletes (int): The expected number of objects to delete.
+        loads (int): The expected number of objects to load.
+    """
+    for description in range(stacked):
+        simulator.aw_object_load(copy(3, description=f'copy {description % 2}'))
+
+    file = snapshot(simulator, tmp_path)
+    expected = world(simulator)
+    edit(simulator)
+
+    command = Sync(SimulatedInstance(simulator), "objects", file)
+    planned = command.plan()
+
+    assert (len(planned[0]), len(planned[1])) == (deletes, loads)
+
+    command.execute()
+    assert world(simulator) == expected
+    assert Sync(SimulatedInstance(simulator), "objects", file).plan() == ([], [])
+
+def test_duplicates(simulator: Simulator, tmp_path) -> None:
+    """
+    Tests that surplus live copies of a stacked object are deleted, and missing copies loaded.
+
+    Args:
+        simulator (Simulator): The simulated world.
+        tmp_path (Path): The temporary directory.
+    """
+    simulator.aw_object_load(copy(3))
+    file = snapshot(simulator, tmp_path)
+    expected = world(simulator)
+
+    for _ in range(2):
+        simulator.aw_object_load(copy(3))
+
+    deletes, loads = Sync(SimulatedInstance(simulator), "objects", file).plan()
+    assert [(each['x'], each['model']) for each in deletes] == [(synthetic_object(3).x, synthetic_object(3).model)] * 2
+    assert loads == []
+
+    delete(simulator, 3)
+    delete(simulator, OBJECTS)
+    delete(simulator, OBJECTS + 1)
+    deletes, loads = Sync(SimulatedInstance(simulator), "objects", file).plan()
+    assert (len(deletes), len(loads)) == (0, 1)
+
+    Sync(SimulatedInstance(simulator), "objects", file).execute()
+    assert world(simulator) == expected
+
+def test_dry_run(simulator: Simulator, tmp_path) -> None:
+    """
+    Tests that a dry run plans the sync without calling the world.
+
+    Args:
+        simulator (Simulator): The simulated world.
+        tmp_path (Path): The temporary directory.
+    """
+    file = snapshot(simulator, tmp_path)
+    delete(simulator, 3)
+    simulator.aw_object_load(copy(4, yaw=1))
+    calls = dict(simulator.calls)
+
+    Sync(SimulatedInstance(simulator), "objects", file, dry_run=True).execute()
+
+    assert {name: count for name, count in simulator.calls.items() if name != "query"} == {
+        name: count for name, count in calls.items() if name != "query"
+    }
+    assert len(world(simulator)) == OBJECTS
+
+def test_terrain(tmp_path) -> None:
+    """
+    Tests that terrain nodes missing from the world or changed are loaded, and extra nodes left in place.
+
+    Args:
+        tmp_path (Path): The temporary directory.
+    """
+    simulator = Simulator(terrain=128)
+    sdk.use(simulator)
+    file = str(tmp_path / "terrain.json")
+    Save(SimulatedInstance(simulator), "terrain", file).execute()
+
+    simulator.terrain = 64
+    assert [each['node_x'] for each in Sync(SimulatedInstance(simulator), "terrain", file).plan()[1]] == [
+        each.node_x for each in map(synthetic_node, range(64, 128))
+    ]
+
+    simulator.terrain = 192
+    assert Sync(SimulatedInstance(simulator), "terrain", file).plan() == ([], [])
@@ -0,0 +1,82 @@
+# Copyright (c) 2022 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import json
+
+import pytest
+
+from common.file import IndexedReader, detect_format, load
+from common.region import Rectangle
+from management.commands import Transform, Verify
+
+OBJECTS = [
+    {
+        'type': 1, 'id': index, 'number': index, 'owner': index % 4, 'build_timestamp': 1650000000,
+        'x': index * 100, 'y': 0, 'z': 0, 'yaw': 0, 'tilt': 0, 'roll': 0,
+        'model': f'wall{index % 3}.rwx', 'description': '', 'action': '',
+    }
+    for index in range(50)
+]
+
+
+@pytest.mark.parametrize("file_format, output", [
+    ("json", "moved.json"),
+    ("columnar", "moved.kwb"),
+    ("json", "moved.json.kwmz"),
+])
+def test_transform(tmp_path, file_format: str, output: str) -> None:
+    """
+    Tests that a transformed backup holds the moved objects, and can be verified and read back.
+
+    Args:
+        tmp_path (Path): The temporary directory.
+        file_format (str): The format of the new backup.
+        output (str): The name of the new backup.
+    """
+    file = tmp_path / "backup.json"
+    file.write_text("".join(json.dumps(record) + "\n" for record in OBJECTS))
+    output = str(tmp_path / output)
+    command = Transform(
+        str(file),
+        output,
+        translate=(100000, 0, 0),
+        region=Rectangle(0, 0, 2, 0),
+        models={'wall0.rwx': 'wall9.rwx'},
+        file_format=file_format,
+        block_size=8
+    )
+    command.execute()
+    expected = [
+        {**record, 'x': record['x'] + 100000, 'model': record['model'].replace('wall0', 'wall9')}
+        for record in OBJECTS[:30]
+    ]
+
+    assert command.metrics.records == 30
+    assert detect_format(output) == file_format
+    assert list(load(output, file_format=file_format)) == expected
+
+    Verify(output, workers=1).execute()
+
+    if not output.endswith(".kwmz"):
+        with IndexedReader(output) as reader:
+            assert list(reader.cells([(100, 0)])) == expected[:10]
+
+    with pytest.raises(FileExistsError):
+        command.execute()
@@ -0,0 +1,106 @@
+# Copyright (c) 2022 Johnathan P. Irvin
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+import json
+import os
+
+import pytest
+
+from common.checksum import SUFFIX
+from common.columnar import ColumnarWriter, layout_for
+from common.file import RecordWriter
+from management.commands import Verify
+
+
+def _write_backup(file: str, file_format: str, compression: str = None, checksum: str = "crc32") -> None:
+    records = [
+        {"type": 1, "id": index, "number": index, "owner": index % 4, "build_timestamp": index,
+         "x": index, "y": 0, "z": index * 10, "yaw": 0, "tilt": 0, "roll": 0,
+         "model": f"wall{index % 3}.rwx", "description": "", "action": ""}
+        for index in range(500)
+    ]
+
+    if file_format == "columnar":
+        with ColumnarWriter(file, layout_for("objects"), block_size=64, compression=compression, checksum=checksum) as writer:
+            writer.write_many(records)
+        return
+
+    with RecordWriter(file, flush_every=64, compression=compression, checksum=checksum) as writer:
+        for record in records:
+            writer.write(json.dumps(record))
+
+@pytest.mark.parametrize("file_format, compression", [
+    ("json", None),
+    ("columnar", None),
+    ("json", "gzip"),
+    ("columnar", "gzip"),
+])
+def test_verify(tmp_path, capsys, file_format: str, compression: str) -> None:
+    """
+    Tests that every record of a backup is verified, across several ranges and processes.
+
+    Args:
+        tmp_path (Path): The temporary directory.
+        capsys (CaptureFixture): Captures the printed report.
+        file_format (str): The backup format.
+        compression (str): The codec, if any.
+    """
+    file = str(tmp_path / "backup")
+    _write_backup(file, file_format, compression)
+    command = Verify(file, workers=2, range_size=2048)
+    command.execute()
+
+    assert command.metrics.records == 500
+    assert command.problems == []
+    assert "crc32 checksums" in capsys.readouterr().out
+
+@pytest.mark.parametrize("file_format", ["json", "columnar"])
+def test_verify_corrupt(tmp_path, file_format: str) -> None:
+    """
+    Tests that a flipped byte and a truncation are found, with and without checksums.
+
+    Args:
+        tmp_path (Path): The temporary directory.
+        file_format (str): The backup format.
+    """
+    file = str(tmp_path / "backup")
+    _write_backup(file, file_format)
+
+    with open(file, "r+b") as f:
+        f.seek(os.path.getsize(file) // 2)
+        byte = f.read(1)
+        f.seek(-1, os.SEEK_CUR)
+        f.write(bytes([byte[0] ^ 0x01]))
+
+    command = Verify(file, workers=1)
+    with pytest.raises(ValueError):
+        command.execute()
+
+    assert len(command.problems) == 1
+    assert "Checksum mismatch" in command.problems[0]
+
+    os.truncate(file, os.path.getsize(file) - 5)
+    os.remove(file + SUFFIX)
+    command = Verify(file, workers=1)
+
+    with pytest.raises(ValueError):
+        command.execute()
+
+    assert command.problems